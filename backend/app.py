@@ -1,12 +1,166 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from database import get_db_connection, get_db_cursor
+from cache import response_cache, get_dataset_version, pin_dataset_version, CacheEntry, CACHE_ENABLED
+from metrics import current_route, query_log, record_request, render_metrics, METRICS_ENABLED
+from serialization import configure_json
+from warmup import start_warmup, warmup_status
+from tracking import open_game, frame_range_params, event_window_params
+from compression import compress, negotiate, set_encoded_body, should_compress, COMPRESSION_MIN_SIZE
+from export import (
+    export_available, events_schema, events_batch, id_dictionary, table_from_rows, dictionary_encode_strings,
+    stream_export, EXPORT_BATCH_SIZE, MIMETYPES, EXTENSIONS,
+)
+from functools import wraps
+import json
+import os
+import time
+from database import get_db_connection, get_db_cursor, get_pool_stats, stream_rows, stream_batches, STREAM_BATCH_SIZE
+from queries import (
+    encode_cursor, page_params, season_param, events_query, players_query, heatmap_params, heatmap_query, heatmap_bins,
+    timeline_params, timeline_points, TIMELINE_QUERY, PERIOD_SECONDS, REGULATION_PERIODS, search_params, search_query_params, SEARCH_QUERY,
+    leaderboard_params, leaderboard_query, leaderboard_rows, matchup_query, matchup_pairs, MATCHUPS_QUERY,
+    export_params, export_events_query, EXPORT_EVENT_COLUMNS, EXPORT_DICTIONARIES, EXPORT_TABLES,
+    build_game_info, TEAMS_QUERY, PLAYER_SUMMARY_QUERY, PLAYER_EVENTS_QUERY, PLAYER_GAMES_QUERY,
+    TEAMS_STATS_QUERY, TEAM_SUMMARY_QUERY, TEAM_EVENTS_QUERY, TEAM_GAMES_QUERY, TEAM_AVERAGES_QUERY,
+    GAMES_QUERY, GAMES_SELECT, GAME_EVENTS_QUERY, GAME_ORDER_BY, GAME_LAST_EVENT, GAME_BY_DATE_AND_TEAM,
+    batch_params, batch_statements, group_batch_rows, batch_results,
+    TEAM_EXISTS_QUERY, PLAYER_EXISTS_QUERY, GAME_POSSESSIONS_QUERY, GAME_SHOT_CHAINS_QUERY,
+    TEAM_POSSESSIONS_QUERY, TEAM_POSSESSION_GAMES_QUERY, TEAM_ASSISTS_QUERY, PLAYER_ASSISTS_QUERY, PLAYER_SHOT_CHAINS_QUERY,
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Next.js frontend
+configure_json(app)  # orjson when installed (JSON_SERIALIZER), dates per JSON_DATES
 
-# Configuration
-MAX_LIMIT = 2000    # Don't let users request too much data//default is 2000
+# Data backend: "postgres" (default) or "memory" to answer every route from an
+# in-process columnar copy of play_by_play (loaded from MEMORY_STORE_CSV or Postgres)
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'postgres')
+memory_store = None
+if DATA_BACKEND == 'memory':
+    from columnar import load_store_from_env
+    memory_store = load_store_from_env()
+    pin_dataset_version(memory_store.version)  # The data can't change under us
+
+
+# Detail endpoints can stream their events as newline-delimited JSON when asked with
+# ?stream=1 or "Accept: application/x-ndjson" (first line: summary, then one event per
+# line, last line: the count)
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream():
+    """True when the client asked for an NDJSON stream"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(header, rows, count_key):
+    """Stream header, every row, then {count_key: n} as NDJSON, flushing once per batch"""
+    def dumps(obj):
+        return app.json.dumps(obj, separators=(',', ':')) + '\n'
+
+    def generate():
+        yield dumps(header)
+        count = 0
+        batch = []
+        try:
+            for row in rows:
+                batch.append(dumps(row))
+                count += 1
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield ''.join(batch)
+                    batch = []
+        except Exception as e:
+            # Headers are already sent, so the best we can do is stop and log
+            print(f"Error streaming rows: {e}")
+            yield ''.join(batch)
+            return
+        batch.append(dumps({count_key: count}))
+        yield ''.join(batch)
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+# Request instrumentation: wall time and payload size per route template, and the
+# route is made visible to database.py so every SQL statement is attributed to it
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.route_token = current_route.set(request.url_rule.rule if request.url_rule else '<unmatched>')
+
+@app.after_request
+def record_request_metrics(response):
+    if METRICS_ENABLED and 'request_started' in g:
+        size = None if response.is_streamed else response.calculate_content_length()
+        record_request(current_route.get(), request.method, response.status_code,
+                       time.perf_counter() - g.request_started, size)
+    return response
+
+@app.teardown_request
+def reset_request_route(exc):
+    if 'route_token' in g:
+        current_route.reset(g.route_token)
+
+
+# Compression: gzip, br or zstd (whichever the client prefers and is installed) for text
+# bodies over COMPRESSION_MIN_SIZE. Registered after the metrics hook so it runs first and
+# the recorded payload size is what went over the wire. Cached responses arrive here
+# already encoded from the copy kept in the cache.
+@app.after_request
+def compress_response(response):
+    if should_compress(response):
+        encoding = negotiate(request.accept_encodings)
+        if encoding:
+            set_encoded_body(response, compress(response.get_data(), encoding), encoding)
+    return response
+
+
+# Response cache
+def request_body_key():
+    """The JSON body of a read-only POST (e.g. /api/batch) with sorted keys, so equal bodies share a cache entry"""
+    if request.method != 'POST':
+        return None
+    return json.dumps(request.get_json(silent=True), sort_keys=True, separators=(',', ':'))
+
+
+def cached_response(view):
+    """
+    Serve repeat requests from the in-process response cache and answer If-None-Match with 304
+    The key is route + sorted query args (+ the canonical JSON body of a POST) + dataset version,
+    so a reload invalidates everything
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not CACHE_ENABLED or wants_stream():
+            return view(*args, **kwargs)
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), request_body_key(), get_dataset_version())
+        entry = response_cache.get(key)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response  # Only successful, complete bodies are cached
+            entry = CacheEntry(response.get_data(), response.mimetype)
+            response_cache.set(key, entry)
+
+        # Compressed once per entry and encoding, then replayed like the plain body
+        encoding = negotiate(request.accept_encodings) if len(entry.body) >= COMPRESSION_MIN_SIZE else None
+        etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+        
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)  # Client already has this exact body
+            response.set_etag(etag)
+            if encoding:
+                response.vary.add('Accept-Encoding')
+        else:
+            response = Response(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            if encoding:
+                if encoding not in entry.encoded:
+                    response_cache.add_encoding(key, entry, encoding, compress(entry.body, encoding))
+                set_encoded_body(response, entry.encoded[encoding], encoding)
+        response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, the ETag makes that cheap
+        return response
+    return wrapper
 
 
 # Endpoints
@@ -16,24 +170,75 @@ def home():
     """Health check endpoint"""
     return jsonify({"message": "NHL Stats API is running!"})
 
+# Readiness probe: 503 until this worker has warmed its caches (see warmup.py)
+@app.route('/api/ready', methods=['GET'])
+def get_readiness():
+    """Report whether this worker is warmed up and ready for traffic"""
+    status = warmup_status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# Connection pool statistics for this worker
+@app.route('/api/pool/stats', methods=['GET'])
+def get_pool_statistics():
+    """Get connection pool usage (in use, idle, wait time) for this worker process"""
+    return jsonify(get_pool_stats()), 200
+
+# Response cache statistics for this worker
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_statistics():
+    """Get response cache hit/miss/eviction counters for this worker process"""
+    return jsonify(response_cache.stats()), 200
+
+# Prometheus scrape endpoint for this worker
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request/query/payload/pool-wait histograms plus pool and cache gauges in Prometheus text format"""
+    pool = get_pool_stats()
+    cache = response_cache.stats()
+    gauges = {
+        "db_pool_connections_in_use": ("Connections currently borrowed", pool.get("in_use", 0)),
+        "db_pool_connections_idle": ("Connections waiting in the pool", pool.get("idle", 0)),
+        "db_pool_waits_total": ("Acquisitions that had to wait for a connection", pool.get("waits", 0)),
+        "response_cache_hits_total": ("Response cache hits", cache["hits"]),
+        "response_cache_misses_total": ("Response cache misses", cache["misses"]),
+        "response_cache_bytes": ("Bytes held by the response cache", cache["bytes"]),
+    }
+    return Response(render_metrics(gauges), mimetype='text/plain; version=0.0.4')
+
+# Per-statement totals and the slow query log (with EXPLAIN ANALYZE plans)
+@app.route('/api/metrics/queries', methods=['GET'])
+def get_query_metrics():
+    """Get every SQL statement this worker ran, most total time first, plus recent slow queries"""
+    return jsonify(query_log.snapshot()), 200
+
+def events_page_response(events, limit, offset):
+    """One page of /api/events"""
+    return jsonify({
+        "data": events, #returns the events to the client
+        "count": len(events), #returns the number of events to the client
+        "limit": limit, #returns the limit to the client
+        "offset": offset, #returns the offset to the client
+        "next_cursor": encode_cursor(events[-1]) if len(events) == limit else None #token for the next page (None on the last page)
+    }), 200
+
 #get events by team, player, event type, limit, and offset
 @app.route('/api/events', methods=['GET'])
+@cached_response
 def get_events():
-    """Get play-by-play events with optional filters"""
+    """
+    Get play-by-play events with optional filters
+    Pass the returned next_cursor as ?cursor= to get the next page; offset still works but gets slower the deeper you go
+    ?season= limits the feed to one season (one partition of play_by_play_events)
+    Order: newest game_date first, then period, clock and id; rows with no date, period
+    or clock come after all dated ones (both for cursor and offset pages)
+    """
     
     # Step 1: Validate inputs
     try:
-        limit = int(request.args.get('limit', 2000))
-        offset = int(request.args.get('offset', 0))
-    except ValueError:
-        return jsonify({"error": "limit and offset must be numbers"}), 400
-    
-    # Check limits
-    if limit < 1 or limit > MAX_LIMIT:
-        return jsonify({"error": f"limit must be between 1 and {MAX_LIMIT}"}), 400
-    
-    if offset < 0:
-        return jsonify({"error": "offset cannot be negative"}), 400
+        limit, offset, cursor_params = page_params(request.args)
+        season = season_param(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Get filter parameters
     team = request.args.get('team')
@@ -42,37 +247,18 @@ def get_events():
     
     # Step 2: Try to get data, handle errors
     try:
+        if memory_store is not None:
+            events = memory_store.events(team, player, event_type, limit, offset, cursor_params, season)
+            return events_page_response(events, limit, offset)
+        
         with get_db_connection() as conn: #connect to the database
             with get_db_cursor(conn) as cur: #get a cursor to the database
-                # Build query
-                query = "SELECT * FROM play_by_play WHERE 1=1" #the 1=1 is a boolean operator that is always true (makes it easier to add filters)
-                params = [] #params is a list of parameters to the query
-                
-                if team:
-                    query += " AND team_name = %s" #adds a filter for the team name
-                    params.append(team) #adds the team name to the list of parameters
-                
-                if player:
-                    query += " AND player_name = %s" #adds a filter for the player name
-                    params.append(player) #adds the player name to the list of parameters
-                
-                if event_type:
-                    query += " AND event = %s" #adds a filter for the event type
-                    params.append(event_type) #adds the event type to the list of parameters
-                
-                query += " ORDER BY game_date DESC, period, clock_seconds DESC LIMIT %s OFFSET %s"
-                params.extend([limit, offset]) #adds the limit and offset to the list of parameters
-                
+                query, params = events_query(team, player, event_type, cursor_params, limit, offset, season)
                 cur.execute(query, params)
                 events = cur.fetchall() #fetches all the events from the database
         
         # Step 3: Return successful response
-        return jsonify({
-            "data": events, #returns the events to the client
-            "count": len(events), #returns the number of events to the client
-            "limit": limit, #returns the limit to the client
-            "offset": offset #returns the offset to the client
-        }), 200
+        return events_page_response(events, limit, offset)
     
     except Exception as e: #handles errors
         # Step 4: Handle errors gracefully
@@ -81,12 +267,16 @@ def get_events():
 
 #get teams
 @app.route('/api/teams', methods=['GET'])
+@cached_response
 def get_teams():
     """Get list of all teams"""
     try:
+        if memory_store is not None:
+            return jsonify({"teams": memory_store.teams()}), 200
+        
         with get_db_connection() as conn: #connect to the database
             with get_db_cursor(conn) as cur: #get a cursor to the database
-                cur.execute("SELECT DISTINCT team_name FROM play_by_play ORDER BY team_name") #executes the query to get the list of all teams
+                cur.execute(TEAMS_QUERY) #executes the query to get the list of all teams
                 teams = [row['team_name'] for row in cur.fetchall()] #fetches all the teams from the database
         
         return jsonify({"teams": teams}), 200 #returns the teams to the client
@@ -97,41 +287,20 @@ def get_teams():
 
 # Get all players with their stats
 @app.route('/api/players', methods=['GET'])
+@cached_response
 def get_players():
     """Get list of all players with their team and stats"""
     try:
         team_filter = request.args.get('team')
         
+        if memory_store is not None:
+            players = memory_store.players(team_filter)
+            return jsonify({"players": players, "count": len(players)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
-                query = """
-                    SELECT 
-                        player_name,
-                        team_name,
-                        COUNT(DISTINCT game_date) as games_played,
-                        
-                        -- Goals (Shot that is successful = true)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
-                        
-                        -- Successful Plays (passes)
-                        SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as successful_plays,
-                        
-                        -- Shots (unsuccessful, event_successful = false)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots
-                        
-                    FROM play_by_play
-                    WHERE player_name IS NOT NULL
-                """
-                
-                params = []
-                if team_filter:
-                    query += " AND team_name = %s"
-                    params.append(team_filter)
-                
-                query += """
-                    GROUP BY player_name, team_name
-                    ORDER BY player_name ASC
-                """
+                # Per-game totals are precomputed at ingest (see lib/aggregates.py)
+                query, params = players_query(team_filter)
                 
                 cur.execute(query, params)
                 players = cur.fetchall()
@@ -147,104 +316,38 @@ def get_players():
 
 # Get detailed stats for a specific player
 @app.route('/api/players/<player_name>', methods=['GET'])
+@cached_response
 def get_player_detail(player_name):
     """Get detailed statistics and all events for a specific player"""
     try:
+        if memory_store is not None:
+            summary, events, games = memory_store.player_detail(player_name)
+            if not summary:
+                return jsonify({"error": "Player not found"}), 404
+            if wants_stream():
+                return ndjson_response({"player": summary, "games": games}, iter(events), "events_count")
+            return jsonify({"player": summary, "events": events, "games": games, "events_count": len(events)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
                 # Get player summary stats
-                summary_query = """
-                    SELECT 
-                        player_name,
-                        team_name,
-                        COUNT(DISTINCT game_date) as games_played,
-                        COUNT(*) as total_events,
-                        
-                        -- Goals
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
-                        
-                        -- Shots on goal (unsuccessful)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
-                        
-                        -- Successful passes
-                        SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as successful_passes,
-                        
-                        -- Incomplete passes
-                        SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END) as incomplete_passes,
-                        
-                        -- Other events
-                        SUM(CASE WHEN event = 'Faceoff Win' THEN 1 ELSE 0 END) as faceoff_wins,
-                        SUM(CASE WHEN event = 'Puck Recovery' THEN 1 ELSE 0 END) as puck_recoveries,
-                        SUM(CASE WHEN event = 'Takeaway' THEN 1 ELSE 0 END) as takeaways,
-                        SUM(CASE WHEN event = 'Zone Entry' THEN 1 ELSE 0 END) as zone_entries,
-                        SUM(CASE WHEN event = 'Dump In/Out' THEN 1 ELSE 0 END) as dump_ins_outs,
-                        SUM(CASE WHEN event = 'Penalty Taken' THEN 1 ELSE 0 END) as penalties
-                        
-                    FROM play_by_play
-                    WHERE player_name = %s
-                    GROUP BY player_name, team_name
-                """
-                
-                cur.execute(summary_query, (player_name,))
+                cur.execute(PLAYER_SUMMARY_QUERY, (player_name,))
                 summary = cur.fetchone()
                 
                 if not summary:
                     return jsonify({"error": "Player not found"}), 404
                 
-                # Get all events for this player
-                events_query = """
-                    SELECT 
-                        period,
-                        clock_seconds,
-                        event,
-                        event_successful,
-                        x_coord,
-                        y_coord,
-                        opp_team_name,
-                        event_type,
-                        player_name_2,
-                        x_coord_2,
-                        y_coord_2
-                    FROM play_by_play
-                    WHERE player_name = %s 
-                    AND x_coord IS NOT NULL 
-                    AND event IN ('Shot', 'Play')
-                    ORDER BY game_date DESC
-                """
-
-                cur.execute(events_query, (player_name,))
-                events = cur.fetchall()
+                # Get game-by-game breakdown (one precomputed row per game)
+                cur.execute(PLAYER_GAMES_QUERY, (player_name,))
+                games = cur.fetchall()
                 
-                # Get game-by-game breakdown
-                games_query = """
-                    WITH final_scores AS (
-                        SELECT DISTINCT ON (game_date, opp_team_name)
-                            game_date,
-                            opp_team_name,
-                            goals_for,
-                            goals_against
-                        FROM play_by_play
-                        WHERE player_name = %s
-                        ORDER BY game_date, opp_team_name, period DESC, clock_seconds ASC
-                    )
-                    SELECT 
-                        p.game_date,
-                        p.opp_team_name,
-                        COUNT(*) as total_events,
-                        SUM(CASE WHEN p.event = 'Shot' AND p.event_successful = true THEN 1 ELSE 0 END) as goals,
-                        SUM(CASE WHEN p.event = 'Shot' AND p.event_successful = false THEN 1 ELSE 0 END) as shots,
-                        SUM(CASE WHEN p.event = 'Play' AND p.event_successful = true THEN 1 ELSE 0 END) as passes,
-                        fs.goals_for as score_for,
-                        fs.goals_against as score_against
-                    FROM play_by_play p
-                    JOIN final_scores fs ON p.game_date = fs.game_date AND p.opp_team_name = fs.opp_team_name
-                    WHERE p.player_name = %s
-                    GROUP BY p.game_date, p.opp_team_name, fs.goals_for, fs.goals_against
-                    ORDER BY p.game_date DESC
-                """
+                if wants_stream():
+                    # Events come straight off a server-side cursor instead of a list in memory
+                    return ndjson_response({"player": summary, "games": games}, stream_rows(PLAYER_EVENTS_QUERY, (player_name,)), "events_count")
                 
-                cur.execute(games_query, (player_name, player_name))
-                games = cur.fetchall()
+                # Get all events for this player
+                cur.execute(PLAYER_EVENTS_QUERY, (player_name,))
+                events = cur.fetchall()
         
         return jsonify({
             "player": summary,
@@ -259,32 +362,17 @@ def get_player_detail(player_name):
 
 # Get all teams with their stats
 @app.route('/api/teams/stats', methods=['GET'])
+@cached_response
 def get_teams_stats():
     """Get list of all teams with their aggregated stats"""
     try:
+        if memory_store is not None:
+            teams = memory_store.teams_stats()
+            return jsonify({"teams": teams, "count": len(teams)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
-                query = """
-                    SELECT 
-                        team_name,
-                        COUNT(DISTINCT game_date) as games_played,
-                        
-                        -- Goals (Shot that is successful = true)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
-                        
-                        -- Shots on goal (unsuccessful)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
-                        
-                        -- Successful Plays (passes)
-                        SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as passes
-                        
-                    FROM play_by_play
-                    WHERE team_name IS NOT NULL
-                    GROUP BY team_name
-                    ORDER BY team_name ASC
-                """
-                
-                cur.execute(query)
+                cur.execute(TEAMS_STATS_QUERY)
                 teams = cur.fetchall()
         
         return jsonify({
@@ -298,102 +386,38 @@ def get_teams_stats():
 
 # Get detailed stats for a specific team
 @app.route('/api/teams/<team_name>', methods=['GET'])
+@cached_response
 def get_team_detail(team_name):
     """Get detailed statistics and all events for a specific team"""
     try:
+        if memory_store is not None:
+            summary, events, games = memory_store.team_detail(team_name)
+            if not summary:
+                return jsonify({"error": "Team not found"}), 404
+            if wants_stream():
+                return ndjson_response({"team": summary, "games": games}, iter(events), "events_count")
+            return jsonify({"team": summary, "events": events, "games": games, "events_count": len(events)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
                 # Get team summary stats
-                summary_query = """
-                    SELECT 
-                        team_name,
-                        COUNT(DISTINCT game_date) as games_played,
-                        COUNT(*) as total_events,
-                        
-                        -- Goals
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
-                        
-                        -- Shots on goal (unsuccessful)
-                        SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
-                        
-                        -- Successful passes
-                        SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as passes,
-                        
-                        -- Other events
-                        SUM(CASE WHEN event = 'Faceoff Win' THEN 1 ELSE 0 END) as faceoff_wins,
-                        SUM(CASE WHEN event = 'Puck Recovery' THEN 1 ELSE 0 END) as puck_recoveries,
-                        SUM(CASE WHEN event = 'Takeaway' THEN 1 ELSE 0 END) as takeaways,
-                        SUM(CASE WHEN event = 'Zone Entry' THEN 1 ELSE 0 END) as zone_entries,
-                        SUM(CASE WHEN event = 'Dump In/Out' THEN 1 ELSE 0 END) as dump_ins_outs,
-                        SUM(CASE WHEN event = 'Penalty Taken' THEN 1 ELSE 0 END) as penalties
-
-                        
-                    FROM play_by_play
-                    WHERE team_name = %s
-                    GROUP BY team_name
-                """
-                
-                cur.execute(summary_query, (team_name,))
+                cur.execute(TEAM_SUMMARY_QUERY, (team_name,))
                 summary = cur.fetchone()
                 
                 if not summary:
                     return jsonify({"error": "Team not found"}), 404
                 
-                # Get events with coordinates for the shot chart
-                events_query = """
-                    SELECT 
-                        period,
-                        clock_seconds,
-                        event,
-                        event_successful,
-                        x_coord,
-                        y_coord,
-                        player_name,
-                        opp_team_name,
-                        event_type,
-                        player_name_2,
-                        x_coord_2,
-                        y_coord_2
-                    FROM play_by_play
-                    WHERE team_name = %s 
-                    AND x_coord IS NOT NULL 
-                    AND event IN ('Shot', 'Play')
-                    ORDER BY game_date DESC
-                """
-                
-                cur.execute(events_query, (team_name,))
-                events = cur.fetchall()
+                # Get game-by-game breakdown (one precomputed row per game)
+                cur.execute(TEAM_GAMES_QUERY, (team_name,))
+                games = cur.fetchall()
                 
-                # Get game-by-game breakdown
-                games_query = """
-                    WITH final_scores AS (
-                        SELECT DISTINCT ON (game_date, opp_team_name)
-                            game_date,
-                            opp_team_name,
-                            goals_for,
-                            goals_against
-                        FROM play_by_play
-                        WHERE team_name = %s
-                        ORDER BY game_date, opp_team_name, period DESC, clock_seconds ASC
-                    )
-                    SELECT 
-                        p.game_date,
-                        p.opp_team_name,
-                        COUNT(*) as total_events,
-                        SUM(CASE WHEN p.event = 'Shot' AND p.event_successful = true THEN 1 ELSE 0 END) as goals,
-                        SUM(CASE WHEN p.event = 'Shot' AND p.event_successful = false THEN 1 ELSE 0 END) as shots,
-                        SUM(CASE WHEN p.event = 'Play' AND p.event_successful = true THEN 1 ELSE 0 END) as passes,
-                        fs.goals_for as score_for,
-                        fs.goals_against as score_against
-                    FROM play_by_play p
-                    JOIN final_scores fs ON p.game_date = fs.game_date AND p.opp_team_name = fs.opp_team_name
-                    WHERE p.team_name = %s
-                    GROUP BY p.game_date, p.opp_team_name, fs.goals_for, fs.goals_against
-                    ORDER BY p.game_date DESC
-                """
+                if wants_stream():
+                    # Events come straight off a server-side cursor instead of a list in memory
+                    return ndjson_response({"team": summary, "games": games}, stream_rows(TEAM_EVENTS_QUERY, (team_name,)), "events_count")
                 
-                cur.execute(games_query, (team_name, team_name))
-                games = cur.fetchall()
+                # Get events with coordinates for the shot chart
+                cur.execute(TEAM_EVENTS_QUERY, (team_name,))
+                events = cur.fetchall()
         
         return jsonify({
             "team": summary,
@@ -408,46 +432,16 @@ def get_team_detail(team_name):
 
 # Get team averages for comparison
 @app.route('/api/teams/<team_name>/averages', methods=['GET'])
+@cached_response
 def get_team_averages(team_name):
     """Get average stats for a team (for player comparison)"""
     try:
+        if memory_store is not None:
+            return jsonify(memory_store.team_averages(team_name)), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
-                query = """
-                    SELECT 
-                        COUNT(DISTINCT player_name) as total_players,
-                        AVG(goals_per_player) as avg_goals,
-                        AVG(shots_per_player) as avg_shots,
-                        AVG(shooting_pct) as avg_shooting_pct,
-                        AVG(pass_completion_pct) as avg_pass_completion_pct
-                    FROM (
-                        SELECT 
-                            player_name,
-                            SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals_per_player,
-                            SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots_per_player,
-                            CASE 
-                                WHEN (SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) + 
-                                      SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END)) > 0
-                                THEN (SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END)::float / 
-                                     (SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) + 
-                                      SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END))) * 100
-                                ELSE 0
-                            END as shooting_pct,
-                            CASE 
-                                WHEN (SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) + 
-                                      SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END)) > 0
-                                THEN (SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END)::float / 
-                                     (SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) + 
-                                      SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END))) * 100
-                                ELSE 0
-                            END as pass_completion_pct
-                        FROM play_by_play
-                        WHERE team_name = %s AND player_name IS NOT NULL
-                        GROUP BY player_name
-                    ) player_stats
-                """
-                
-                cur.execute(query, (team_name,))
+                cur.execute(TEAM_AVERAGES_QUERY, (team_name,))
                 result = cur.fetchone()
                 
                 if not result:
@@ -461,34 +455,18 @@ def get_team_averages(team_name):
 
 # Get all games with final scores
 @app.route('/api/games', methods=['GET'])
+@cached_response
 def get_games():
     """Get list of all games with final scores"""
     try:
+        if memory_store is not None:
+            games = memory_store.games()
+            return jsonify({"games": games, "count": len(games)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
-                query = """
-                    WITH final_scores AS (
-                        SELECT DISTINCT ON (game_date, team_name, opp_team_name)
-                            game_date,
-                            team_name,
-                            opp_team_name,
-                            goals_for,
-                            goals_against
-                        FROM play_by_play
-                        WHERE venue = 'home'
-                        ORDER BY game_date, team_name, opp_team_name, period DESC, clock_seconds ASC
-                    )
-                    SELECT 
-                        game_date,
-                        team_name,
-                        opp_team_name,
-                        goals_for,
-                        goals_against
-                    FROM final_scores
-                    ORDER BY game_date DESC
-                """
-                
-                cur.execute(query)
+                # Final scores are precomputed per game at ingest (see lib/normalize.py)
+                cur.execute(GAMES_QUERY)
                 games = cur.fetchall()
         
         return jsonify({
@@ -502,62 +480,45 @@ def get_games():
 
 # Get detailed play-by-play for a specific game
 @app.route('/api/games/<game_date>/<team_name>', methods=['GET'])
+@cached_response
 def get_game_detail(game_date, team_name):
     """Get all play-by-play events for a specific game"""
     try:
+        if memory_store is not None:
+            events = memory_store.game_events(game_date, team_name)
+            if not events:
+                return jsonify({"error": "Game not found"}), 404
+            game_info = build_game_info(events[0], events[-1], team_name)
+            if wants_stream():
+                return ndjson_response({"game": game_info}, iter(events), "count")
+            return jsonify({"game": game_info, "events": events, "count": len(events)}), 200
+        
         with get_db_connection() as conn:
             with get_db_cursor(conn) as cur:
-                # Get all events for this game
-                query = """
-                    SELECT
-                        id,
-                        game_date,
-                        season_year,
-                        team_name,
-                        opp_team_name,
-                        venue,
-                        period,
-                        clock_seconds,
-                        situation_type,
-                        goals_for,
-                        goals_against,
-                        player_name,
-                        event,
-                        event_successful,
-                        x_coord,
-                        y_coord,
-                        event_type,
-                        player_name_2,
-                        x_coord_2,
-                        y_coord_2,
-                        event_detail_1,
-                        event_detail_2,
-                        event_detail_3
-                    FROM play_by_play
-                    WHERE game_date = %s 
-                    AND (team_name = %s OR opp_team_name = %s)
-                    ORDER BY period ASC, clock_seconds DESC
-                """
+                # Get all events for this game (one range read on idx_game_events)
+                query = GAME_EVENTS_QUERY.format(game_id=GAME_BY_DATE_AND_TEAM)
+                params = (game_date, team_name)
                 
-                cur.execute(query, (game_date, team_name, team_name))
+                if wants_stream():
+                    # Only the first and last events are needed up front for the game info
+                    cur.execute(query + GAME_ORDER_BY + " LIMIT 1", params)
+                    first_event = cur.fetchone()
+                    
+                    if not first_event:
+                        return jsonify({"error": "Game not found"}), 404
+                    
+                    cur.execute(query + GAME_LAST_EVENT, params)
+                    game_info = build_game_info(first_event, cur.fetchone(), team_name)
+                    
+                    return ndjson_response({"game": game_info}, stream_rows(query + GAME_ORDER_BY, params), "count")
+                
+                cur.execute(query + GAME_ORDER_BY, params)
                 events = cur.fetchall()
                 
                 if not events:
                     return jsonify({"error": "Game not found"}), 404
                 
-                # Get game info from first event
-                game_info = {
-                    "game_date": events[0]['game_date'],
-                    "team_name": events[0]['team_name'] if events[0]['team_name'] == team_name else events[0]['opp_team_name'],
-                    "opp_team_name": events[0]['opp_team_name'] if events[0]['team_name'] == team_name else events[0]['team_name'],
-                    "venue": events[0]['venue'],
-                    "season_year": events[0]['season_year']
-                }
-                
-                # Get final score
-                final_event = events[-1]  # Last event has final score
-                game_info['goals_for'] = final_event['goals_for']
-                game_info['goals_against'] = final_event['goals_against']
+                game_info = build_game_info(events[0], events[-1], team_name)  # Last event has final score
         
         return jsonify({
             "game": game_info,
@@ -569,6 +530,615 @@ def get_game_detail(game_date, team_name):
         print(f"Error fetching game detail: {e}")
         return jsonify({"error": "Failed to fetch game details"}), 500
 
+# Get a game by its id: summary row from the games table plus its play-by-play
+@app.route('/api/games/<int:game_id>', methods=['GET'])
+@cached_response
+def get_game_by_id(game_id):
+    """Get a game's teams, final score, period count and event range, plus all its events"""
+    try:
+        if memory_store is not None:
+            game, events = memory_store.game(game_id)
+            if game is None:
+                return jsonify({"error": "Game not found"}), 404
+            if wants_stream():
+                return ndjson_response({"game": game}, iter(events), "count")
+            return jsonify({"game": game, "events": events, "count": len(events)}), 200
+        
+        with get_db_connection() as conn:
+            with get_db_cursor(conn) as cur:
+                cur.execute(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,))
+                game = cur.fetchone()
+                
+                if not game:
+                    return jsonify({"error": "Game not found"}), 404
+                
+                query = GAME_EVENTS_QUERY.format(game_id="%s") + GAME_ORDER_BY
+                if wants_stream():
+                    return ndjson_response({"game": game}, stream_rows(query, (game_id,)), "count")
+                
+                cur.execute(query, (game_id,))
+                events = cur.fetchall()
+        
+        return jsonify({
+            "game": game,
+            "events": events,
+            "count": len(events)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch game details"}), 500
+
+# Get a game's possessions (precomputed at ingest, see chains.py)
+@app.route('/api/games/<int:game_id>/possessions', methods=['GET'])
+@cached_response
+def get_game_possessions(game_id):
+    """Get every possession of a game in order: team, clock range, events, passes, shots"""
+    try:
+        if memory_store is not None:
+            game, possessions = memory_store.game_possessions(game_id)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,))
+                    game = cur.fetchone()
+                    cur.execute(GAME_POSSESSIONS_QUERY, (game_id,))
+                    possessions = cur.fetchall()
+        
+        if game is None:
+            return jsonify({"error": "Game not found"}), 404
+        
+        return jsonify({
+            "game": game,
+            "possessions": possessions,
+            "count": len(possessions)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching possessions for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch possessions"}), 500
+
+# Get a game's shots with their assist and zone-entry chains
+@app.route('/api/games/<int:game_id>/assists', methods=['GET'])
+@cached_response
+def get_game_shot_chains(game_id):
+    """Get every shot of a game with its primary / secondary assist and zone entry"""
+    try:
+        if memory_store is not None:
+            game, shots = memory_store.game_shot_chains(game_id)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,))
+                    game = cur.fetchone()
+                    cur.execute(GAME_SHOT_CHAINS_QUERY, (game_id,))
+                    shots = cur.fetchall()
+        
+        if game is None:
+            return jsonify({"error": "Game not found"}), 404
+        
+        return jsonify({
+            "game": game,
+            "shots": shots,
+            "count": len(shots)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching shot chains for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch shot chains"}), 500
+
+# Get a game's flow in fixed clock buckets instead of every event
+@app.route('/api/games/<int:game_id>/timeline', methods=['GET'])
+@cached_response
+def get_game_timeline(game_id):
+    """
+    Get per-team events, shots, goals, possession share and running score per clock bucket
+    bucket sets the bucket size in seconds (default 60); an overtime's buckets count down
+    from its own length (period_seconds on each point)
+    """
+    try:
+        bucket = timeline_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            game = memory_store.game_row(game_id)
+            rows = memory_store.timeline(game_id, bucket)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,))
+                    game = cur.fetchone()
+                    cur.execute(TIMELINE_QUERY, {"game_id": game_id, "bucket": bucket, "period_seconds": PERIOD_SECONDS,
+                                                 "regulation_periods": REGULATION_PERIODS})
+                    rows = cur.fetchall()
+        
+        if game is None:
+            return jsonify({"error": "Game not found"}), 404
+        
+        points = timeline_points(rows, bucket)
+        return jsonify({
+            "game": game,
+            "bucket_seconds": bucket,
+            "points": points,
+            "count": len(points)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching timeline for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch game timeline"}), 500
+
+# Broadcast tracking frames (lib/load_tracking.py), read as slices of memory-mapped columns.
+# Not response-cached: a slice is already cheap, and tracking loads don't bump the dataset version.
+@app.route('/api/games/<int:game_id>/tracking', methods=['GET'])
+def get_game_tracking(game_id):
+    """Get what tracking data a game has: teams, frame count and the clock range covered in each period"""
+    try:
+        game = open_game(game_id)
+        if game is None:
+            return jsonify({"error": "No tracking data for this game"}), 404
+        return jsonify(game.summary()), 200
+    
+    except Exception as e:
+        print(f"Error fetching tracking for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch tracking data"}), 500
+
+@app.route('/api/games/<int:game_id>/tracking/frames', methods=['GET'])
+def get_tracking_frames(game_id):
+    """
+    Get a range of frames: period with clock_from / clock_to (seconds left, counting down),
+    or frame_from / frame_to (frame numbers in game order). Columnar: one array per frame column,
+    positions[i] rows frames.row_start[i] up to the next frame's row_start
+    """
+    try:
+        period, clock_from, clock_to, frame_from, frame_to, limit = frame_range_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        game = open_game(game_id)
+        if game is None:
+            return jsonify({"error": "No tracking data for this game"}), 404
+        
+        if period is not None:
+            start, stop = game.clock_range(period, clock_from, clock_to)
+        else:
+            start, stop = frame_from, (frame_to + 1 if frame_to is not None else game.frame_count)
+        return jsonify({"game_id": game_id, **game.frames(start, stop, limit)}), 200
+    
+    except Exception as e:
+        print(f"Error fetching tracking frames for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch tracking frames"}), 500
+
+@app.route('/api/games/<int:game_id>/tracking/events/<int:event_id>', methods=['GET'])
+def get_event_frames(game_id, event_id):
+    """Get the frames from before seconds ahead of a play-by-play event to after seconds past it"""
+    try:
+        before, after, limit = event_window_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        game = open_game(game_id)
+        if game is None:
+            return jsonify({"error": "No tracking data for this game"}), 404
+        
+        window = game.event_range(event_id, before, after)
+        if window is None:
+            return jsonify({"error": "Event not found in this game"}), 404
+        return jsonify({"game_id": game_id, "event_id": event_id, **game.frames(*window, limit)}), 200
+    
+    except Exception as e:
+        print(f"Error fetching frames for event {event_id}: {e}")
+        return jsonify({"error": "Failed to fetch event frames"}), 500
+
+# Get a team's possession totals, overall and per game
+@app.route('/api/teams/<team_name>/possessions', methods=['GET'])
+@cached_response
+def get_team_possessions(team_name):
+    """Get possession totals for a team plus a per-game breakdown"""
+    try:
+        if memory_store is not None:
+            summary, games = memory_store.team_possessions(team_name)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(TEAM_POSSESSIONS_QUERY, (team_name,))
+                    summary = cur.fetchone()
+                    cur.execute(TEAM_POSSESSION_GAMES_QUERY, (team_name,))
+                    games = cur.fetchall()
+        
+        if not summary:
+            return jsonify({"error": "Team not found"}), 404
+        
+        return jsonify({
+            "team": summary,
+            "games": games
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching team possessions: {e}")
+        return jsonify({"error": "Failed to fetch team possessions"}), 500
+
+# Get primary and secondary assists for every player of a team
+@app.route('/api/teams/<team_name>/assists', methods=['GET'])
+@cached_response
+def get_team_assists(team_name):
+    """Get assist counts per player for a team"""
+    try:
+        if memory_store is not None:
+            players = memory_store.team_assists(team_name)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(TEAM_EXISTS_QUERY, (team_name,))
+                    players = None
+                    if cur.fetchone():
+                        cur.execute(TEAM_ASSISTS_QUERY, (team_name, team_name))
+                        players = cur.fetchall()
+        
+        if players is None:
+            return jsonify({"error": "Team not found"}), 404
+        
+        return jsonify({
+            "team_name": team_name,
+            "players": players,
+            "count": len(players)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching team assists: {e}")
+        return jsonify({"error": "Failed to fetch team assists"}), 500
+
+# Get a player's assist totals and every shot they took or set up
+@app.route('/api/players/<player_name>/assists', methods=['GET'])
+@cached_response
+def get_player_assists(player_name):
+    """Get assist and shot-chain totals for a player plus the chains themselves"""
+    try:
+        if memory_store is not None:
+            summary, shots = memory_store.player_assists(player_name)
+        else:
+            params = {"player_name": player_name}
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(PLAYER_EXISTS_QUERY, (player_name,))
+                    summary, shots = None, []
+                    if cur.fetchone():
+                        cur.execute(PLAYER_ASSISTS_QUERY, params)
+                        summary = cur.fetchone()
+                        cur.execute(PLAYER_SHOT_CHAINS_QUERY, params)
+                        shots = cur.fetchall()
+        
+        if summary is None:
+            return jsonify({"error": "Player not found"}), 404
+        
+        return jsonify({
+            "player_name": player_name,
+            "summary": summary,
+            "shots": shots,
+            "count": len(shots)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching player assists: {e}")
+        return jsonify({"error": "Failed to fetch player assists"}), 500
+
+
+# Get one page of a player leaderboard, overall or for one situation / strength / period
+@app.route('/api/leaderboards/<stat>', methods=['GET'])
+@cached_response
+def get_leaderboard(stat):
+    """
+    Get the top players for a stat (goals, shots, shot_attempts, successful_passes, pass_completion_pct,
+    takeaways, faceoff_wins)
+    split (all, situation, strength, period) with value (e.g. 5 on 4, power_play, 2), min_games, limit, offset
+    """
+    try:
+        split, split_value, min_games, limit, offset = leaderboard_params(stat, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            rows = memory_store.leaderboard(stat, split, split_value, min_games, limit, offset)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    # Precomputed at ingest (see lib/leaderboards.py), read in index order
+                    query, params = leaderboard_query(stat, split, split_value, min_games, limit, offset)
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+        
+        leaders = leaderboard_rows(rows, offset)
+        return jsonify({
+            "stat": stat,
+            "split": split,
+            "value": split_value,
+            "min_games": min_games,
+            "leaders": leaders,
+            "count": len(leaders),
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + limit if len(leaders) == limit else None
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching leaderboard: {e}")
+        return jsonify({"error": "Failed to fetch leaderboard"}), 500
+
+# Get the whole head-to-head matrix (every team against every opponent)
+@app.route('/api/matchups', methods=['GET'])
+@cached_response
+def get_matchups():
+    """Get per-matchup totals for every team and opponent, precomputed at ingest"""
+    try:
+        if memory_store is not None:
+            matchups = memory_store.matchups()
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(MATCHUPS_QUERY)
+                    matchups = cur.fetchall()
+        
+        return jsonify({
+            "teams": sorted({row['team_name'] for row in matchups} | {row['opp_team_name'] for row in matchups}),
+            "matchups": matchups,
+            "count": len(matchups)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching matchups: {e}")
+        return jsonify({"error": "Failed to fetch matchups"}), 500
+
+# Compare a team with one opponent (opponent=...) or with every team it has played
+@app.route('/api/teams/<team_name>/matchups', methods=['GET'])
+@cached_response
+def get_team_matchups(team_name):
+    """Get the team's totals against each opponent next to that opponent's totals against the team"""
+    opponent = request.args.get('opponent')
+    try:
+        if memory_store is not None:
+            rows = memory_store.matchups(team_name, opponent)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    # Primary key lookups on team_matchup_stats (see lib/matchups.py)
+                    query, params = matchup_query(team_name, opponent)
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+        
+        if not rows:
+            return jsonify({"error": "No matchups found"}), 404
+        
+        matchups = matchup_pairs(rows, team_name)
+        return jsonify({
+            "team_name": team_name,
+            "matchups": matchups,
+            "count": len(matchups)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching team matchups: {e}")
+        return jsonify({"error": "Failed to fetch team matchups"}), 500
+
+# Bulk export as Arrow IPC stream or Parquet (one streamed request instead of paging /api/events)
+def export_response(export_format, name, schema, batches):
+    """Stream batches in export_format as a download named <name>.<extension>"""
+    response = Response(stream_export(export_format, schema, batches), mimetype=MIMETYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{EXTENSIONS[export_format]}"'
+    return response
+
+def sql_event_batches(query, params, dictionaries):
+    """Record batches of exported events, one per server-side cursor fetch"""
+    schema = events_schema(EXPORT_EVENT_COLUMNS)
+    for rows in stream_batches(query, params, EXPORT_BATCH_SIZE):
+        yield events_batch(rows, EXPORT_EVENT_COLUMNS, schema, dictionaries)
+
+@app.route('/api/export/events', methods=['GET'])
+def export_events():
+    """
+    Stream play_by_play rows as Arrow (format=arrow, default) or Parquet (format=parquet)
+    Filters like /api/events: team, player, event, season, plus date_from / date_to (YYYY-MM-DD)
+    """
+    if not export_available():
+        return jsonify({"error": "Export needs pyarrow installed on the server"}), 501
+    
+    try:
+        export_format, filters = export_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            table = memory_store.export_events(filters)
+            return export_response(export_format, "events", table.schema, table.to_batches(max_chunksize=EXPORT_BATCH_SIZE))
+        
+        # Dimension ids index straight into these, so text columns are never decoded row by row
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                dictionaries = {}
+                for dictionary, query in EXPORT_DICTIONARIES.items():
+                    cur.execute(query)
+                    dictionaries[dictionary] = id_dictionary(cur.fetchall())
+        
+        query, params = export_events_query(filters)
+        return export_response(export_format, "events", events_schema(EXPORT_EVENT_COLUMNS),
+                               sql_event_batches(query, params, dictionaries))
+    
+    except Exception as e:
+        print(f"Error exporting events: {e}")
+        return jsonify({"error": "Failed to export events"}), 500
+
+@app.route('/api/export/<table_name>', methods=['GET'])
+def export_table(table_name):
+    """Download a whole aggregate table (games, player_game_stats, team_game_stats, possessions, shot_chains, player_split_stats)"""
+    if not export_available():
+        return jsonify({"error": "Export needs pyarrow installed on the server"}), 501
+    
+    if table_name not in EXPORT_TABLES:
+        return jsonify({"error": f"table must be events or one of: {', '.join(EXPORT_TABLES)}"}), 404
+    
+    try:
+        export_format, _ = export_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            import pyarrow as pa
+            table = dictionary_encode_strings(pa.Table.from_pandas(memory_store.export_table(table_name), preserve_index=False))
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(EXPORT_TABLES[table_name])
+                    table = table_from_rows(cur.fetchall(), [column.name for column in cur.description])
+        
+        return export_response(export_format, table_name, table.schema, table.to_batches(max_chunksize=EXPORT_BATCH_SIZE))
+    
+    except Exception as e:
+        print(f"Error exporting {table_name}: {e}")
+        return jsonify({"error": "Failed to export table"}), 500
+
+
+# Search players and teams by name (autocomplete)
+@app.route('/api/search', methods=['GET'])
+@cached_response
+def search_names():
+    """
+    Get the top players and teams matching q, by name prefix, word prefix, substring, then fuzzy match
+    type limits results to player or team, limit sets how many (default 8)
+    """
+    try:
+        q, kind, limit = search_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if not q:
+            results = []
+        elif memory_store is not None:
+            results = memory_store.search(q, kind, limit)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    cur.execute(SEARCH_QUERY, search_query_params(q, kind, limit))
+                    results = cur.fetchall()
+        
+        return jsonify({
+            "query": q,
+            "results": results,
+            "count": len(results)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error searching names: {e}")
+        return jsonify({"error": "Failed to search"}), 500
+
+
+# Get a 2D histogram of event locations for rink charts
+@app.route('/api/heatmap', methods=['GET'])
+@cached_response
+def get_heatmap():
+    """
+    Get event counts and success rates binned over the 200x85 rink
+    Filters: team, player, event, period, season, situation_type. bin sets the bin size, vectors=1 adds average x2/y2 vectors
+    """
+    try:
+        bin_size, x_bins, y_bins, filters, vectors = heatmap_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            rows = memory_store.heatmap(filters, bin_size, x_bins, y_bins)
+        else:
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    # One grouped pass: bin index per event, clamped onto the rink
+                    query, params = heatmap_query(filters, bin_size, x_bins, y_bins)
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+        
+        bins = heatmap_bins(rows, vectors)
+        return jsonify({
+            "bin_size": bin_size,
+            "x_bins": x_bins,
+            "y_bins": y_bins,
+            "total": sum(b['count'] for b in bins),
+            "bins": bins,
+            "count": len(bins)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error fetching heatmap: {e}")
+        return jsonify({"error": "Failed to fetch heatmap"}), 500
+
+
+# Answer several player/team sub-queries in one request (one page load, one DB session)
+def memory_batch_rows(subqueries):
+    """The {section: {name: [rows]}} batch_results expects, from the memory store"""
+    rows = {}
+    average_teams = set()
+    for sub in subqueries.values():
+        kind, name, include = sub['type'], sub['name'], sub['include']
+        if kind == 'team_averages' or 'averages' in include:
+            average_teams.add(name)
+        if kind == 'team_averages':
+            continue
+        
+        detail = memory_store.player_detail if kind == 'player' else memory_store.team_detail
+        summary, events, games = detail(name)
+        rows.setdefault(f"{kind}_summary", {})[name] = [summary] if summary else []
+        rows.setdefault(f"{kind}_games", {})[name] = games
+        rows.setdefault(f"{kind}_events", {})[name] = events
+        if summary and 'team_averages' in include:
+            average_teams.add(summary['team_name'])
+    
+    rows['team_averages'] = {team: [memory_store.team_averages(team)] for team in average_teams}
+    return rows
+
+@app.route('/api/batch', methods=['POST'])
+@cached_response
+def post_batch():
+    """
+    Run several player, team and team_averages sub-queries in one request
+    Body: {"queries": {key: {"type": "player", "name": ..., "include": ["games", "events", "team_averages"]}}}
+    Results (and per-key errors, e.g. a 404) come back under the same keys
+    Read-only, so it is response-cached like the GETs, keyed by the canonical body
+    """
+    try:
+        subqueries = batch_params(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if memory_store is not None:
+            rows = memory_batch_rows(subqueries)
+        else:
+            rows = {}
+            with get_db_connection() as conn:
+                with get_db_cursor(conn) as cur:
+                    # One statement per section however many names it covers
+                    for section, query, params in batch_statements(subqueries):
+                        cur.execute(query, params)
+                        rows[section] = group_batch_rows(cur.fetchall())
+        
+        results, errors = batch_results(subqueries, rows)
+        return jsonify({
+            "results": results,
+            "errors": errors,
+            "count": len(results)
+        }), 200
+    
+    except Exception as e:
+        print(f"Error running batch: {e}")
+        return jsonify({"error": "Failed to run batch"}), 500
+
 
 if __name__ == '__main__':
+    # The reloader runs the app in a child process; only that one serves, so only it warms up
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup(app)
     app.run(debug=True, port=5000)
\ No newline at end of file
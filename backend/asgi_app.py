@@ -0,0 +1,574 @@
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from database import POOL_MIN_SIZE, POOL_TIMEOUT, POOL_MAX_AGE, STREAM_BATCH_SIZE
+from queries import (
+    encode_cursor, page_params, season_param, events_query, players_query, heatmap_params, heatmap_query, heatmap_bins,
+    timeline_params, timeline_points, TIMELINE_QUERY, PERIOD_SECONDS, REGULATION_PERIODS, search_params, search_query_params, SEARCH_QUERY,
+    leaderboard_params, leaderboard_query, leaderboard_rows, matchup_query, matchup_pairs, MATCHUPS_QUERY,
+    build_game_info, TEAMS_QUERY, PLAYER_SUMMARY_QUERY, PLAYER_EVENTS_QUERY, PLAYER_GAMES_QUERY,
+    TEAMS_STATS_QUERY, TEAM_SUMMARY_QUERY, TEAM_EVENTS_QUERY, TEAM_GAMES_QUERY, TEAM_AVERAGES_QUERY,
+    GAMES_QUERY, GAMES_SELECT, GAME_EVENTS_QUERY, GAME_ORDER_BY, GAME_LAST_EVENT, GAME_BY_DATE_AND_TEAM,
+    batch_params, batch_statements, group_batch_rows, batch_results,
+    TEAM_EXISTS_QUERY, PLAYER_EXISTS_QUERY, GAME_POSSESSIONS_QUERY, GAME_SHOT_CHAINS_QUERY,
+    TEAM_POSSESSIONS_QUERY, TEAM_POSSESSION_GAMES_QUERY, TEAM_ASSISTS_QUERY, PLAYER_ASSISTS_QUERY, PLAYER_SHOT_CHAINS_QUERY,
+)
+import asyncio
+import os
+import uuid
+
+# Async variant of app.py's Postgres read routes (same SQL and response shapes), served
+# by an ASGI server on one event loop with an async psycopg 3 pool. A request waiting on
+# Postgres doesn't hold a worker, and a handler's independent queries run at the same
+# time on separate pooled connections.
+#
+# Run (from backend/): hypercorn asgi_app:app --bind 0.0.0.0:8000
+#
+# Routes: /, /api/pool/stats, /api/events, /api/search, /api/heatmap, /api/batch,
+# /api/teams[/stats], /api/teams/<team_name>[/averages|/possessions|/assists|/matchups],
+# /api/players[/<player_name>[/assists]], /api/games[/<game_date>/<team_name>],
+# /api/games/<game_id>[/possessions|/assists|/timeline], /api/leaderboards/<stat>, /api/matchups
+#
+# Only in app.py: /api/ready (warmup), /api/cache/stats (response cache), /metrics and
+# /api/metrics/queries (per-worker metrics), /api/export/* (Arrow / Parquet) and
+# /api/games/<game_id>/tracking* (memory-mapped frames, not SQL). DATA_BACKEND=memory
+# is also app.py only. tests/test_asgi_routes.py keeps this list in sync.
+
+# Async pool size: one process serves many concurrent requests, so it needs more
+# connections than a sync worker (still bounded by Postgres' max_connections)
+ASYNC_POOL_MAX_SIZE = int(os.getenv('DB_ASYNC_POOL_MAX_SIZE', 20))
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")  # Enable CORS for Next.js frontend
+
+pool = AsyncConnectionPool(
+    make_conninfo(
+        host=os.getenv('DATABASE_HOST'),
+        dbname=os.getenv('DATABASE_NAME'),
+        user=os.getenv('DATABASE_USER'),
+        password=os.getenv('DATABASE_PASSWORD'),
+        port=os.getenv('DATABASE_PORT')
+    ),
+    min_size=POOL_MIN_SIZE,
+    max_size=ASYNC_POOL_MAX_SIZE,
+    timeout=POOL_TIMEOUT,
+    max_lifetime=POOL_MAX_AGE,
+    kwargs={"row_factory": dict_row},  # rows as dicts, like RealDictCursor
+    open=False
+)
+
+@app.before_serving
+async def open_pool():
+    await pool.open()
+
+@app.after_serving
+async def close_pool():
+    await pool.close()
+
+
+# Query helpers: each call borrows its own connection, so calls can run concurrently
+async def fetch_all(query, params=None):
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return await cur.fetchall()
+
+async def fetch_one(query, params=None):
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return await cur.fetchone()
+
+async def stream_rows(query, params=None):
+    """Async version of database.stream_rows: server-side cursor, STREAM_BATCH_SIZE rows per round trip"""
+    async with pool.connection() as conn:
+        async with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+            cur.itersize = STREAM_BATCH_SIZE
+            await cur.execute(query, params)
+            async for row in cur:
+                yield row
+
+
+# NDJSON streaming, same format as app.py
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream():
+    """True when the client asked for an NDJSON stream"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(header, rows, count_key):
+    """Stream header, every row of an async iterable, then {count_key: n} as NDJSON"""
+    def dumps(obj):
+        return app.json.dumps(obj, separators=(',', ':')) + '\n'
+
+    async def generate():
+        yield dumps(header).encode()
+        count = 0
+        batch = []
+        try:
+            async for row in rows:
+                batch.append(dumps(row))
+                count += 1
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield ''.join(batch).encode()
+                    batch = []
+        except Exception as e:
+            # Headers are already sent, so the best we can do is stop and log
+            print(f"Error streaming rows: {e}")
+            yield ''.join(batch).encode()
+            return
+        batch.append(dumps({count_key: count}))
+        yield ''.join(batch).encode()
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+# Endpoints
+@app.route('/')
+async def home():
+    """Health check endpoint"""
+    return jsonify({"message": "NHL Stats API is running!"})
+
+@app.route('/api/pool/stats', methods=['GET'])
+async def get_pool_statistics():
+    """Get async connection pool usage for this process"""
+    stats = pool.get_stats()
+    stats["pid"] = os.getpid()
+    return jsonify(stats), 200
+
+@app.route('/api/events', methods=['GET'])
+async def get_events():
+    """Get play-by-play events with optional filters (cursor or offset pagination, same order as app.get_events)"""
+    try:
+        limit, offset, cursor_params = page_params(request.args)
+        season = season_param(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query, params = events_query(request.args.get('team'), request.args.get('player'),
+                                     request.args.get('event'), cursor_params, limit, offset, season)
+        events = await fetch_all(query, params)
+        return jsonify({
+            "data": events,
+            "count": len(events),
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": encode_cursor(events[-1]) if len(events) == limit else None
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching events: {e}")
+        return jsonify({"error": "Failed to fetch events"}), 500
+
+@app.route('/api/teams', methods=['GET'])
+async def get_teams():
+    """Get list of all teams"""
+    try:
+        teams = [row['team_name'] for row in await fetch_all(TEAMS_QUERY)]
+        return jsonify({"teams": teams}), 200
+
+    except Exception as e:
+        print(f"Error fetching teams: {e}")
+        return jsonify({"error": "Failed to fetch teams"}), 500
+
+@app.route('/api/players', methods=['GET'])
+async def get_players():
+    """Get list of all players with their team and stats"""
+    try:
+        query, params = players_query(request.args.get('team'))
+        players = await fetch_all(query, params)
+        return jsonify({"players": players, "count": len(players)}), 200
+
+    except Exception as e:
+        print(f"Error fetching players: {e}")
+        return jsonify({"error": "Failed to fetch players"}), 500
+
+@app.route('/api/players/<player_name>', methods=['GET'])
+async def get_player_detail(player_name):
+    """Get detailed statistics and all events for a specific player"""
+    try:
+        if wants_stream():
+            summary, games = await asyncio.gather(
+                fetch_one(PLAYER_SUMMARY_QUERY, (player_name,)),
+                fetch_all(PLAYER_GAMES_QUERY, (player_name,)))
+            if not summary:
+                return jsonify({"error": "Player not found"}), 404
+            return ndjson_response({"player": summary, "games": games},
+                                   stream_rows(PLAYER_EVENTS_QUERY, (player_name,)), "events_count")
+
+        # Summary, games and events are independent, so they run concurrently
+        summary, games, events = await asyncio.gather(
+            fetch_one(PLAYER_SUMMARY_QUERY, (player_name,)),
+            fetch_all(PLAYER_GAMES_QUERY, (player_name,)),
+            fetch_all(PLAYER_EVENTS_QUERY, (player_name,)))
+        if not summary:
+            return jsonify({"error": "Player not found"}), 404
+
+        return jsonify({
+            "player": summary,
+            "events": events,
+            "games": games,
+            "events_count": len(events)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching player detail: {e}")
+        return jsonify({"error": "Failed to fetch player details"}), 500
+
+@app.route('/api/teams/stats', methods=['GET'])
+async def get_teams_stats():
+    """Get list of all teams with their aggregated stats"""
+    try:
+        teams = await fetch_all(TEAMS_STATS_QUERY)
+        return jsonify({"teams": teams, "count": len(teams)}), 200
+
+    except Exception as e:
+        print(f"Error fetching team stats: {e}")
+        return jsonify({"error": "Failed to fetch team stats"}), 500
+
+@app.route('/api/teams/<team_name>', methods=['GET'])
+async def get_team_detail(team_name):
+    """Get detailed statistics and all events for a specific team"""
+    try:
+        if wants_stream():
+            summary, games = await asyncio.gather(
+                fetch_one(TEAM_SUMMARY_QUERY, (team_name,)),
+                fetch_all(TEAM_GAMES_QUERY, (team_name,)))
+            if not summary:
+                return jsonify({"error": "Team not found"}), 404
+            return ndjson_response({"team": summary, "games": games},
+                                   stream_rows(TEAM_EVENTS_QUERY, (team_name,)), "events_count")
+
+        # Summary, games and events are independent, so they run concurrently
+        summary, games, events = await asyncio.gather(
+            fetch_one(TEAM_SUMMARY_QUERY, (team_name,)),
+            fetch_all(TEAM_GAMES_QUERY, (team_name,)),
+            fetch_all(TEAM_EVENTS_QUERY, (team_name,)))
+        if not summary:
+            return jsonify({"error": "Team not found"}), 404
+
+        return jsonify({
+            "team": summary,
+            "events": events,
+            "games": games,
+            "events_count": len(events)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching team detail: {e}")
+        return jsonify({"error": "Failed to fetch team details"}), 500
+
+@app.route('/api/teams/<team_name>/averages', methods=['GET'])
+async def get_team_averages(team_name):
+    """Get average stats for a team (for player comparison)"""
+    try:
+        result = await fetch_one(TEAM_AVERAGES_QUERY, (team_name,))
+        if not result:
+            return jsonify({"error": "Team not found"}), 404
+        return jsonify(result), 200
+
+    except Exception as e:
+        print(f"Error fetching team averages: {e}")
+        return jsonify({"error": "Failed to fetch team averages"}), 500
+
+@app.route('/api/games', methods=['GET'])
+async def get_games():
+    """Get list of all games with final scores"""
+    try:
+        games = await fetch_all(GAMES_QUERY)
+        return jsonify({"games": games, "count": len(games)}), 200
+
+    except Exception as e:
+        print(f"Error fetching games: {e}")
+        return jsonify({"error": "Failed to fetch games"}), 500
+
+@app.route('/api/games/<game_date>/<team_name>', methods=['GET'])
+async def get_game_detail(game_date, team_name):
+    """Get all play-by-play events for a specific game"""
+    try:
+        query = GAME_EVENTS_QUERY.format(game_id=GAME_BY_DATE_AND_TEAM)
+        params = (game_date, team_name)
+
+        if wants_stream():
+            # First and last events give the game info; both are single-row index reads
+            first_event, final_event = await asyncio.gather(
+                fetch_one(query + GAME_ORDER_BY + " LIMIT 1", params),
+                fetch_one(query + GAME_LAST_EVENT, params))
+            if not first_event:
+                return jsonify({"error": "Game not found"}), 404
+            game_info = build_game_info(first_event, final_event, team_name)
+            return ndjson_response({"game": game_info}, stream_rows(query + GAME_ORDER_BY, params), "count")
+
+        events = await fetch_all(query + GAME_ORDER_BY, params)
+        if not events:
+            return jsonify({"error": "Game not found"}), 404
+
+        return jsonify({
+            "game": build_game_info(events[0], events[-1], team_name),  # Last event has final score
+            "events": events,
+            "count": len(events)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching game detail: {e}")
+        return jsonify({"error": "Failed to fetch game details"}), 500
+
+@app.route('/api/games/<int:game_id>', methods=['GET'])
+async def get_game_by_id(game_id):
+    """Get a game's teams, final score, period count and event range, plus all its events"""
+    try:
+        query = GAME_EVENTS_QUERY.format(game_id="%s") + GAME_ORDER_BY
+        if wants_stream():
+            game = await fetch_one(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,))
+            if not game:
+                return jsonify({"error": "Game not found"}), 404
+            return ndjson_response({"game": game}, stream_rows(query, (game_id,)), "count")
+
+        game, events = await asyncio.gather(
+            fetch_one(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,)),
+            fetch_all(query, (game_id,)))
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+
+        return jsonify({"game": game, "events": events, "count": len(events)}), 200
+
+    except Exception as e:
+        print(f"Error fetching game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch game details"}), 500
+
+@app.route('/api/games/<int:game_id>/possessions', methods=['GET'])
+async def get_game_possessions(game_id):
+    """Get every possession of a game in order: team, clock range, events, passes, shots"""
+    try:
+        game, possessions = await asyncio.gather(
+            fetch_one(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,)),
+            fetch_all(GAME_POSSESSIONS_QUERY, (game_id,)))
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+
+        return jsonify({"game": game, "possessions": possessions, "count": len(possessions)}), 200
+
+    except Exception as e:
+        print(f"Error fetching possessions for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch possessions"}), 500
+
+@app.route('/api/games/<int:game_id>/assists', methods=['GET'])
+async def get_game_shot_chains(game_id):
+    """Get every shot of a game with its primary / secondary assist and zone entry"""
+    try:
+        game, shots = await asyncio.gather(
+            fetch_one(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,)),
+            fetch_all(GAME_SHOT_CHAINS_QUERY, (game_id,)))
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+
+        return jsonify({"game": game, "shots": shots, "count": len(shots)}), 200
+
+    except Exception as e:
+        print(f"Error fetching shot chains for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch shot chains"}), 500
+
+@app.route('/api/games/<int:game_id>/timeline', methods=['GET'])
+async def get_game_timeline(game_id):
+    """Get per-team events, shots, goals, possession share and running score per clock bucket"""
+    try:
+        bucket = timeline_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        game, rows = await asyncio.gather(
+            fetch_one(GAMES_SELECT + " WHERE g.game_id = %s", (game_id,)),
+            fetch_all(TIMELINE_QUERY, {"game_id": game_id, "bucket": bucket, "period_seconds": PERIOD_SECONDS,
+                                       "regulation_periods": REGULATION_PERIODS}))
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+
+        points = timeline_points(rows, bucket)
+        return jsonify({"game": game, "bucket_seconds": bucket, "points": points, "count": len(points)}), 200
+
+    except Exception as e:
+        print(f"Error fetching timeline for game {game_id}: {e}")
+        return jsonify({"error": "Failed to fetch game timeline"}), 500
+
+@app.route('/api/teams/<team_name>/possessions', methods=['GET'])
+async def get_team_possessions(team_name):
+    """Get possession totals for a team plus a per-game breakdown"""
+    try:
+        summary, games = await asyncio.gather(
+            fetch_one(TEAM_POSSESSIONS_QUERY, (team_name,)),
+            fetch_all(TEAM_POSSESSION_GAMES_QUERY, (team_name,)))
+        if not summary:
+            return jsonify({"error": "Team not found"}), 404
+
+        return jsonify({"team": summary, "games": games}), 200
+
+    except Exception as e:
+        print(f"Error fetching team possessions: {e}")
+        return jsonify({"error": "Failed to fetch team possessions"}), 500
+
+@app.route('/api/teams/<team_name>/assists', methods=['GET'])
+async def get_team_assists(team_name):
+    """Get assist counts per player for a team"""
+    try:
+        exists, players = await asyncio.gather(
+            fetch_one(TEAM_EXISTS_QUERY, (team_name,)),
+            fetch_all(TEAM_ASSISTS_QUERY, (team_name, team_name)))
+        if not exists:
+            return jsonify({"error": "Team not found"}), 404
+
+        return jsonify({"team_name": team_name, "players": players, "count": len(players)}), 200
+
+    except Exception as e:
+        print(f"Error fetching team assists: {e}")
+        return jsonify({"error": "Failed to fetch team assists"}), 500
+
+@app.route('/api/players/<player_name>/assists', methods=['GET'])
+async def get_player_assists(player_name):
+    """Get assist and shot-chain totals for a player plus the chains themselves"""
+    try:
+        params = {"player_name": player_name}
+        exists, summary, shots = await asyncio.gather(
+            fetch_one(PLAYER_EXISTS_QUERY, (player_name,)),
+            fetch_one(PLAYER_ASSISTS_QUERY, params),
+            fetch_all(PLAYER_SHOT_CHAINS_QUERY, params))
+        if not exists:
+            return jsonify({"error": "Player not found"}), 404
+
+        return jsonify({"player_name": player_name, "summary": summary, "shots": shots, "count": len(shots)}), 200
+
+    except Exception as e:
+        print(f"Error fetching player assists: {e}")
+        return jsonify({"error": "Failed to fetch player assists"}), 500
+
+@app.route('/api/leaderboards/<stat>', methods=['GET'])
+async def get_leaderboard(stat):
+    """Get the top players for a stat, overall or for one situation / strength / period"""
+    try:
+        split, split_value, min_games, limit, offset = leaderboard_params(stat, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query, params = leaderboard_query(stat, split, split_value, min_games, limit, offset)
+        leaders = leaderboard_rows(await fetch_all(query, params), offset)
+        return jsonify({
+            "stat": stat,
+            "split": split,
+            "value": split_value,
+            "min_games": min_games,
+            "leaders": leaders,
+            "count": len(leaders),
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + limit if len(leaders) == limit else None
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching leaderboard: {e}")
+        return jsonify({"error": "Failed to fetch leaderboard"}), 500
+
+@app.route('/api/matchups', methods=['GET'])
+async def get_matchups():
+    """Get per-matchup totals for every team and opponent, precomputed at ingest"""
+    try:
+        matchups = await fetch_all(MATCHUPS_QUERY)
+        return jsonify({
+            "teams": sorted({row['team_name'] for row in matchups} | {row['opp_team_name'] for row in matchups}),
+            "matchups": matchups,
+            "count": len(matchups)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching matchups: {e}")
+        return jsonify({"error": "Failed to fetch matchups"}), 500
+
+@app.route('/api/teams/<team_name>/matchups', methods=['GET'])
+async def get_team_matchups(team_name):
+    """Get the team's totals against each opponent next to that opponent's totals against the team"""
+    try:
+        rows = await fetch_all(*matchup_query(team_name, request.args.get('opponent')))
+        if not rows:
+            return jsonify({"error": "No matchups found"}), 404
+
+        matchups = matchup_pairs(rows, team_name)
+        return jsonify({
+            "team_name": team_name,
+            "matchups": matchups,
+            "count": len(matchups)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching team matchups: {e}")
+        return jsonify({"error": "Failed to fetch team matchups"}), 500
+
+@app.route('/api/search', methods=['GET'])
+async def search_names():
+    """Get the top players and teams matching q, by name prefix, word prefix, substring, then fuzzy match"""
+    try:
+        q, kind, limit = search_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        results = await fetch_all(SEARCH_QUERY, search_query_params(q, kind, limit)) if q else []
+        return jsonify({"query": q, "results": results, "count": len(results)}), 200
+
+    except Exception as e:
+        print(f"Error searching names: {e}")
+        return jsonify({"error": "Failed to search"}), 500
+
+@app.route('/api/heatmap', methods=['GET'])
+async def get_heatmap():
+    """Get event counts and success rates binned over the 200x85 rink"""
+    try:
+        bin_size, x_bins, y_bins, filters, vectors = heatmap_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        query, params = heatmap_query(filters, bin_size, x_bins, y_bins)
+        bins = heatmap_bins(await fetch_all(query, params), vectors)
+        return jsonify({
+            "bin_size": bin_size,
+            "x_bins": x_bins,
+            "y_bins": y_bins,
+            "total": sum(b['count'] for b in bins),
+            "bins": bins,
+            "count": len(bins)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching heatmap: {e}")
+        return jsonify({"error": "Failed to fetch heatmap"}), 500
+
+
+@app.route('/api/batch', methods=['POST'])
+async def post_batch():
+    """Run several player, team and team_averages sub-queries in one request"""
+    try:
+        subqueries = batch_params(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # One connection for the whole batch, one statement per section
+        rows = {}
+        async with pool.connection() as conn:
+            for section, query, params in batch_statements(subqueries):
+                cur = await conn.execute(query, params)
+                rows[section] = group_batch_rows(await cur.fetchall())
+
+        results, errors = batch_results(subqueries, rows)
+        return jsonify({"results": results, "errors": errors, "count": len(results)}), 200
+
+    except Exception as e:
+        print(f"Error running batch: {e}")
+        return jsonify({"error": "Failed to run batch"}), 500
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,166 @@
+import pandas as pd
+import numpy as np
+from csv_schema import COLUMNS, CSV_READ_OPTIONS
+import argparse
+import datetime
+import os
+import time
+
+# Synthetic play-by-play built by replaying the real Olympic games.
+# Every synthetic game copies the event sequence of a randomly chosen real game
+# (so the event mix, score flow and detail columns stay realistic), swaps in a
+# synthetic home/away team and roster, jitters coordinates a little and gets its
+# own date. Output is a CSV in the same format as the source file, so it can be
+# loaded with lib/load_data.py or served with DATA_BACKEND=memory.
+#
+# Usage (from backend/, with PYTHONPATH=.): python bench/generate_data.py --rows 1000000 --out /tmp/pxp_1m.csv
+
+SOURCE_CSV = "../misc/pxp_womens_oly_2022_v2.csv"
+FIRST_SEASON_START = datetime.date(2021, 10, 1)
+COORD_JITTER = 2        # +/- units added to each coordinate
+GAMES_PER_BATCH = 500   # games built and written per to_csv call
+RINK_LIMITS = {'x_coord': 200, 'x_coord_2': 200, 'y_coord': 85, 'y_coord_2': 85}
+
+
+class GameTemplates:
+    """The real games, pre-split into arrays so synthetic games are pure index arithmetic"""
+
+    def __init__(self, source):
+        self.source = source.reset_index(drop=True)
+        is_home = self.source['venue'] == 'home'
+        home = self.source['team_name'].where(is_home, self.source['opp_team_name'])
+        away = self.source['opp_team_name'].where(is_home, self.source['team_name'])
+        game_ids = pd.MultiIndex.from_arrays([self.source['game_date'], home, away]).factorize()[0]
+        self.rows = [np.flatnonzero(game_ids == g) for g in range(game_ids.max() + 1)]
+
+        # Each real player becomes a roster slot on the home (0) or away (1) side of their game
+        slots = (self.source.dropna(subset=['player_name'])
+                 .drop_duplicates('player_name')
+                 .assign(slot=lambda d: d.groupby('team_name').cumcount()))
+        slot_of = dict(zip(slots['player_name'], slots['slot']))
+        team_of = dict(zip(slots['player_name'], slots['team_name']))
+        self.roster_size = int(slots['slot'].max()) + 1
+
+        self.team_side = np.where(is_home, 0, 1)
+        self.player_slot, self.player_side = self._player_columns('player_name', slot_of, team_of, home)
+        self.player_2_slot, self.player_2_side = self._player_columns('player_name_2', slot_of, team_of, home)
+
+    def _player_columns(self, column, slot_of, team_of, home):
+        names = self.source[column]
+        slot = names.map(slot_of).fillna(-1).astype(int).to_numpy()
+        side = np.where(names.map(team_of) == home, 0, 1)
+        return slot, side
+
+
+def synthetic_names(source, teams, roster_size, rng):
+    """Team names plus a (teams x roster_size) array of player names mixed from real first/last names"""
+    team_names = np.array([f"League (Women) - Team {i + 1:03d}" for i in range(teams)], dtype=object)
+    parts = source['player_name'].dropna().drop_duplicates().str.split(' ', n=1)
+    firsts = parts.str[0].unique()
+    lasts = parts.str[-1].unique()
+
+    # Unique across the whole league so player pages stay one person
+    seen = set()
+    players = []
+    while len(players) < teams * roster_size:
+        name = f"{rng.choice(firsts)} {rng.choice(lasts)}"
+        if name in seen:
+            name = f"{name} {len(players)}"
+        seen.add(name)
+        players.append(name)
+    return team_names, np.array(players, dtype=object).reshape(teams, roster_size)
+
+
+def schedule(teams, rng):
+    """Endless (date, home, away) schedule: every team plays once per game day"""
+    day = FIRST_SEASON_START
+    while True:
+        order = rng.permutation(teams)
+        for home, away in zip(order[0::2], order[1::2]):
+            yield day, home, away
+        day += datetime.timedelta(days=1)
+
+
+def season_of(day):
+    """Seasons start in the fall, like the source data (Feb 2022 is season 2021)"""
+    return day.year if day.month >= 9 else day.year - 1
+
+
+def build_batch(templates, games, team_names, rosters, rng):
+    """Rows for a batch of (template, date, home, away) games as a raw-text DataFrame"""
+    template_ids = np.array([g[0] for g in games])
+    idx = np.concatenate([templates.rows[t] for t in template_ids])
+    game_no = np.repeat(np.arange(len(games)), [len(templates.rows[t]) for t in template_ids])
+
+    sides = np.array([[g[2], g[3]] for g in games])  # (home, away) team index per game
+    team = sides[game_no, templates.team_side[idx]]
+    opp = sides[game_no, 1 - templates.team_side[idx]]
+
+    batch = templates.source.iloc[idx].reset_index(drop=True)
+    batch['team_name'] = team_names[team]
+    batch['opp_team_name'] = team_names[opp]
+
+    for column, slot, side in (('player_name', templates.player_slot, templates.player_side),
+                               ('player_name_2', templates.player_2_slot, templates.player_2_side)):
+        row_slot = slot[idx]
+        names = rosters[sides[game_no, side[idx]], np.maximum(row_slot, 0)]
+        batch[column] = np.where(row_slot >= 0, names, None)
+
+    dates = np.array([f"{g[1].day}/{g[1].month}/{g[1].year}" for g in games], dtype=object)
+    seasons = np.array([str(season_of(g[1])) for g in games], dtype=object)
+    batch['game_date'] = dates[game_no]
+    batch['season_year'] = seasons[game_no]
+
+    for column, limit in RINK_LIMITS.items():
+        values = pd.to_numeric(batch[column], errors='coerce').to_numpy()
+        jittered = np.clip(values + rng.integers(-COORD_JITTER, COORD_JITTER + 1, len(values)), 0, limit)
+        batch[column] = pd.array(jittered, dtype='Int64')
+
+    return batch[COLUMNS]
+
+
+def generate(out_path, rows, teams=32, seed=42, source_csv=SOURCE_CSV):
+    """Write at least `rows` synthetic rows (whole games only) to out_path, returns the row count"""
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(source_csv, **CSV_READ_OPTIONS)
+    templates = GameTemplates(source)
+    team_names, rosters = synthetic_names(source, teams, templates.roster_size, rng)
+    games = schedule(teams, rng)
+
+    start = time.perf_counter()
+    written = 0
+    game_count = 0
+    first = True
+    while written < rows:
+        batch_games = []
+        batch_rows = 0
+        while written + batch_rows < rows and len(batch_games) < GAMES_PER_BATCH:
+            template = int(rng.integers(len(templates.rows)))
+            batch_games.append((template, *next(games)))
+            batch_rows += len(templates.rows[template])
+
+        batch = build_batch(templates, batch_games, team_names, rosters, rng)
+        batch.to_csv(out_path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+        written += len(batch)
+        game_count += len(batch_games)
+        print(f"  {written:,} rows / {game_count:,} games...")
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Wrote {written:,} rows ({game_count:,} games, {teams} teams) to {out_path} in {elapsed:.1f}s")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic play-by-play CSVs for benchmarking")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="minimum rows to write (whole games)")
+    parser.add_argument('--teams', type=int, default=32, help="teams in the synthetic league (even number)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--source', default=SOURCE_CSV, help="real play-by-play CSV to replay")
+    parser.add_argument('--out', default=os.path.join("bench", "data", "pxp_synthetic.csv"))
+    args = parser.parse_args()
+
+    if args.teams < 2 or args.teams % 2:
+        parser.error("--teams must be an even number >= 2")
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    generate(args.out, args.rows, teams=args.teams, seed=args.seed, source_csv=args.source)
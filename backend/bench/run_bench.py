@@ -0,0 +1,241 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+# Drives every API route with concurrent clients and reports throughput and
+# latency percentiles per endpoint as JSON, so runs can be diffed across commits.
+#
+# Usage (from backend/, with PYTHONPATH=.:lib like the loader):
+#   python bench/run_bench.py --csv bench/data/pxp_synthetic.csv      # in-process, DATA_BACKEND=memory
+#   python bench/run_bench.py --backend postgres --load bench/data/pxp_synthetic.csv
+#   python bench/run_bench.py --url http://localhost:5000             # a running server
+#   python bench/run_bench.py --csv ... --compare bench/results/<previous>.json
+
+DEFAULT_CLIENTS = 8
+DEFAULT_REQUESTS = 200      # per endpoint
+WARMUP_REQUESTS = 5         # per endpoint, not measured
+RESULTS_DIR = os.path.join("bench", "results")
+
+
+class InProcessClient:
+    """Flask test client; one per thread since test clients aren't thread-safe"""
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def get(self, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.get(path)
+        return response.status_code, response.get_data()
+
+
+class HttpClient:
+    """Plain urllib client for benchmarking a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base_url + path) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def make_client(args):
+    """Configure the app through environment variables before importing it"""
+    if args.url:
+        return HttpClient(args.url)
+
+    if not args.cache:
+        os.environ['RESPONSE_CACHE_ENABLED'] = '0'  # measure the data path, not the cache
+    if args.backend == 'memory':
+        os.environ['DATA_BACKEND'] = 'memory'
+        if args.csv:
+            os.environ['MEMORY_STORE_CSV'] = args.csv
+    elif args.load:
+        from load_data import load_csv_to_db
+        load_csv_to_db(args.load)
+
+    from app import app
+    return InProcessClient(app)
+
+
+def fetch_json(client, path):
+    status, body = client.get(path)
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return json.loads(body)
+
+
+def endpoint_plan(client):
+    """(name, path) for every route, with real team/player/game values picked from the data"""
+    quote = lambda value: urllib.parse.quote(str(value), safe='')
+    teams = fetch_json(client, '/api/teams')['teams']
+    players = fetch_json(client, '/api/players')['players']
+    games = fetch_json(client, '/api/games')['games']
+    team = teams[0]
+    player = max(players, key=lambda p: p.get('shots') or 0)['player_name']
+    game = games[len(games) // 2]
+    game_date = parsedate_to_datetime(game['game_date']).date().isoformat()
+    first_page = fetch_json(client, '/api/events?limit=100')
+
+    plan = [
+        ('events', '/api/events?limit=100'),
+        ('events_max_limit', '/api/events'),
+        ('events_deep_offset', '/api/events?limit=100&offset=5000'),
+        ('events_team', f'/api/events?limit=100&team={quote(team)}'),
+        ('events_player', f'/api/events?limit=100&player={quote(player)}'),
+        ('events_event', '/api/events?limit=100&event=Shot'),
+        ('teams', '/api/teams'),
+        ('players', '/api/players'),
+        ('players_team', f'/api/players?team={quote(team)}'),
+        ('player_detail', f'/api/players/{quote(player)}'),
+        ('teams_stats', '/api/teams/stats'),
+        ('team_detail', f'/api/teams/{quote(team)}'),
+        ('team_averages', f'/api/teams/{quote(team)}/averages'),
+        ('games', '/api/games'),
+        ('game_detail', f'/api/games/{game_date}/{quote(game["team_name"])}'),
+        ('game_detail_stream', f'/api/games/{game_date}/{quote(game["team_name"])}?stream=1'),
+        ('heatmap', '/api/heatmap'),
+        ('heatmap_team_vectors', f'/api/heatmap?team={quote(team)}&vectors=1&bin=5'),
+    ]
+    if first_page.get('next_cursor'):
+        plan.insert(3, ('events_cursor', f'/api/events?limit=100&cursor={first_page["next_cursor"]}'))
+    return plan
+
+
+def run_endpoint(client, path, requests, clients):
+    """Hit one path `requests` times from `clients` threads, returns latencies (s), statuses and wall time"""
+    for _ in range(WARMUP_REQUESTS):
+        client.get(path)
+
+    latencies = np.zeros(requests)
+    statuses = [None] * requests
+    response_bytes = [0] * requests
+
+    def one(i):
+        start = time.perf_counter()
+        status, body = client.get(path)
+        latencies[i] = time.perf_counter() - start
+        statuses[i] = status
+        response_bytes[i] = len(body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(requests)))
+    return latencies, statuses, response_bytes, time.perf_counter() - start
+
+
+def summarize(path, latencies, statuses, response_bytes, wall):
+    ms = latencies * 1000
+    errors = sum(1 for status in statuses if status >= 400)
+    codes = {}
+    for status in statuses:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    return {
+        "path": path,
+        "requests": len(statuses),
+        "errors": errors,
+        "status_codes": codes,
+        "throughput_rps": round(len(statuses) / wall, 2),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "response_bytes": int(np.median(response_bytes)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print p50/p95/throughput changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    print(f"{'endpoint':<24}{'p50':>10}{'p95':>10}{'rps':>10}")
+    for name, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        change = lambda key: (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+        print(f"{name:<24}{change('p50_ms'):>+9.1f}%{change('p95_ms'):>+9.1f}%{change('throughput_rps'):>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API endpoint")
+    parser.add_argument('--backend', choices=['memory', 'postgres'], default='memory')
+    parser.add_argument('--csv', help="CSV for the memory backend (defaults to MEMORY_STORE_CSV, else Postgres)")
+    parser.add_argument('--load', help="load this CSV into Postgres before benchmarking")
+    parser.add_argument('--url', help="benchmark a running server instead of the in-process app")
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="requests per endpoint")
+    parser.add_argument('--only', nargs='*', help="endpoint names to run (default: all)")
+    parser.add_argument('--cache', action='store_true', help="leave the response cache enabled")
+    parser.add_argument('--out', help="results file (default: bench/results/<timestamp>-<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    client = make_client(args)
+    plan = endpoint_plan(client)
+    if args.only:
+        plan = [(name, path) for name, path in plan if name in args.only]
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "target": args.url or f"in-process ({args.backend})",
+            "dataset": args.csv or args.load or os.getenv('MEMORY_STORE_CSV'),
+            "response_cache": bool(args.cache),
+            "clients": args.clients,
+            "requests_per_endpoint": args.requests,
+        },
+        "endpoints": {},
+    }
+
+    print(f"{'endpoint':<24}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, path in plan:
+        summary = summarize(path, *run_endpoint(client, path, args.requests, args.clients))
+        results['endpoints'][name] = summary
+        print(f"{name:<24}{summary['throughput_rps']:>10.1f}{summary['p50_ms']:>10.2f}"
+              f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}{summary['errors']:>8}")
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{results['meta']['commit'] or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✓ Results written to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
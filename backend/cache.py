@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from database import get_db_connection
+import hashlib
+import os
+import threading
+import time
+
+# Cache configuration (override with environment variables)
+CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # memory budget per worker
+CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 300))                         # seconds an entry stays fresh
+VERSION_CHECK_INTERVAL = float(os.getenv('DATASET_VERSION_CHECK_INTERVAL', 5))  # seconds between version lookups
+
+
+class CacheEntry:
+    """
+    A serialized response body plus what's needed to replay it
+    encoded holds compressed copies of body by Content-Encoding, added as clients ask for them
+    """
+
+    __slots__ = ('body', 'etag', 'mimetype', 'stored_at', 'size', 'encoded')
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.stored_at = time.monotonic()
+        self.size = len(body)
+        self.encoded = {}
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of response bodies with a TTL and a total size budget.
+    Keys are expected to contain the dataset version, so a reload never serves stale data.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stores = 0
+
+    def get(self, key):
+        """Return the entry for key (marking it recently used) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        """Store entry, evicting least recently used entries to stay under max_bytes"""
+        # One response may not take more than a quarter of the budget
+        if entry.size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self.stores += 1
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def add_encoding(self, key, entry, encoding, body):
+        """Keep a compressed copy of entry's body, counted against max_bytes while entry is cached"""
+        with self._lock:
+            if encoding in entry.encoded:
+                return
+            entry.encoded[encoding] = body
+            if self._entries.get(key) is entry:
+                entry.size += len(body)
+                self._bytes += len(body)
+                while self._bytes > self.max_bytes and self._entries:
+                    oldest = next(iter(self._entries))
+                    self._remove(oldest)
+                    self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stores": self.stores,
+                "dataset_version": _version_state["version"],
+            }
+
+
+# Dataset version, bumped by the loader whenever play_by_play changes.
+# Looked up at most once every VERSION_CHECK_INTERVAL seconds per worker.
+_version_state = {"version": None, "checked_at": 0.0, "pinned": False}
+_version_lock = threading.Lock()
+
+
+def pin_dataset_version(version):
+    """Use a fixed dataset version instead of polling dataset_meta (in-memory backend)"""
+    _version_state["version"] = version
+    _version_state["pinned"] = True
+
+
+def get_dataset_version():
+    """Current dataset version (falls back to the last known one if the lookup fails)"""
+    if _version_state["pinned"]:
+        return _version_state["version"]
+
+    now = time.monotonic()
+    if _version_state["version"] is not None and now - _version_state["checked_at"] < VERSION_CHECK_INTERVAL:
+        return _version_state["version"]
+
+    with _version_lock:
+        if _version_state["version"] is not None and now - _version_state["checked_at"] < VERSION_CHECK_INTERVAL:
+            return _version_state["version"]
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT version FROM dataset_meta WHERE id = 1")
+                    row = cur.fetchone()
+            _version_state["version"] = row[0] if row else 0
+        except Exception as e:
+            print(f"Error checking dataset version: {e}")
+            if _version_state["version"] is None:
+                _version_state["version"] = 0
+        _version_state["checked_at"] = now
+        return _version_state["version"]
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# Possessions and shot chains, built in one vectorized pass over events in play order
+# (game, period ASC, clock_seconds DESC, id ASC). Used at ingest by lib/analytics.py and
+# by the memory backend, so both serve the same rows.
+#
+# A possession is a run of consecutive events by one team within a period; a faceoff
+# always starts a new one. For every shot, the last completed pass of the possession is
+# the primary assist when it went to the shooter, and the completed pass before that is
+# the secondary assist when it went to the primary passer. The last successful zone
+# entry of the possession before the shot makes it a zone-entry-to-shot chain.
+
+# Columns build_chains needs
+CHAIN_COLUMNS = ['id', 'game_id', 'game_date', 'period', 'clock_seconds', 'team_name', 'opp_team_name',
+                 'player_name', 'player_name_2', 'event', 'event_successful', 'event_type']
+
+POSSESSION_COLUMNS = ['game_id', 'possession_no', 'game_date', 'team_name', 'opp_team_name', 'period',
+                      'start_clock', 'end_clock', 'duration', 'event_count', 'passes', 'shots', 'goals',
+                      'zone_entries', 'start_event', 'end_event', 'first_event_id', 'last_event_id']
+
+SHOT_CHAIN_COLUMNS = ['shot_event_id', 'game_id', 'possession_no', 'game_date', 'team_name', 'opp_team_name',
+                      'period', 'clock_seconds', 'shooter', 'shot_type', 'goal',
+                      'primary_assist', 'primary_pass_event_id', 'secondary_assist', 'secondary_pass_event_id',
+                      'zone_entry_player', 'zone_entry_type', 'zone_entry_event_id', 'seconds_from_entry',
+                      'seconds_into_possession']
+
+
+def last_index(flags):
+    """For every row, the position of the latest row at or before it where flags is set (-1 if none)"""
+    return np.maximum.accumulate(np.where(flags, np.arange(len(flags)), -1))
+
+
+def build_chains(events):
+    """(possessions, shot chains) DataFrames for events with CHAIN_COLUMNS (rows without a team, game, period or clock are skipped)"""
+    # Rows without a period or clock have no place in play order
+    events = events[events['team_name'].notna() & events['game_id'].notna()
+                    & events['period'].notna() & events['clock_seconds'].notna()]
+    events = events.sort_values(['game_id', 'period', 'clock_seconds', 'id'],
+                                ascending=[True, True, False, True]).reset_index(drop=True)
+    n = len(events)
+    if n == 0:
+        return pd.DataFrame(columns=POSSESSION_COLUMNS), pd.DataFrame(columns=SHOT_CHAIN_COLUMNS)
+
+    game = events['game_id'].to_numpy(dtype=np.int64)
+    period = events['period'].to_numpy(dtype=np.int64)
+    clock = events['clock_seconds'].to_numpy(dtype=np.int64)
+    team = pd.factorize(events['team_name'])[0]
+    event = events['event'].to_numpy(dtype=object)
+    successful = events['event_successful'].eq(True).to_numpy()
+    player = events['player_name'].to_numpy(dtype=object)
+    receiver = events['player_name_2'].to_numpy(dtype=object)
+
+    # Possession boundaries
+    new_game = np.ones(n, dtype=bool)
+    new_game[1:] = game[1:] != game[:-1]
+    new_possession = new_game | (event == 'Faceoff Win')
+    new_possession[1:] |= (period[1:] != period[:-1]) | (team[1:] != team[:-1])
+    possession = np.cumsum(new_possession) - 1
+    starts = np.flatnonzero(new_possession)
+    ends = np.append(starts[1:], n) - 1
+    row_start = starts[possession]
+    game_first_possession = np.maximum.accumulate(np.where(new_game, possession, 0))
+    possession_no = (possession - game_first_possession + 1)[starts]  # numbered from 1 within each game
+
+    is_shot = event == 'Shot'
+    is_pass = (event == 'Play') & successful
+    is_entry = (event == 'Zone Entry') & successful
+
+    def per_possession(flags):
+        return np.bincount(possession, weights=flags, minlength=len(starts)).astype(np.int64)
+
+    possessions = pd.DataFrame({
+        'game_id': game[starts],
+        'possession_no': possession_no,
+        'game_date': events['game_date'].to_numpy(dtype=object)[starts],
+        'team_name': events['team_name'].to_numpy(dtype=object)[starts],
+        'opp_team_name': events['opp_team_name'].to_numpy(dtype=object)[starts],
+        'period': period[starts],
+        'start_clock': clock[starts],
+        'end_clock': clock[ends],
+        'duration': clock[starts] - clock[ends],
+        'event_count': ends - starts + 1,
+        'passes': per_possession(is_pass),
+        'shots': per_possession(is_shot),
+        'goals': per_possession(is_shot & successful),
+        'zone_entries': per_possession(is_entry),
+        'start_event': event[starts],
+        'end_event': event[ends],
+        'first_event_id': events['id'].to_numpy(dtype=np.int64)[starts],
+        'last_event_id': events['id'].to_numpy(dtype=np.int64)[ends],
+    })
+
+    # Assists: completed passes earlier in the same possession, each one to the next player in the chain
+    shots = np.flatnonzero(is_shot)
+    last_pass = last_index(is_pass)
+    primary = last_pass[shots]
+    primary = np.where((primary >= row_start[shots]) & (receiver[np.maximum(primary, 0)] == player[shots])
+                       & pd.notna(player[shots]), primary, -1)
+    secondary = np.where(primary > 0, last_pass[np.maximum(primary - 1, 0)], -1)
+    secondary = np.where((primary >= 0) & (secondary >= row_start[shots])
+                         & (receiver[np.maximum(secondary, 0)] == player[np.maximum(primary, 0)]), secondary, -1)
+    entry = last_index(is_entry)[shots]
+    entry = np.where(entry >= row_start[shots], entry, -1)
+
+    ids = events['id'].to_numpy(dtype=np.int64)
+    event_type = events['event_type'].to_numpy(dtype=object)
+
+    def pick(values, rows, dtype=object):
+        """values at rows, missing where rows is -1"""
+        return pd.array([values[row] if row >= 0 else None for row in rows.tolist()], dtype=dtype)
+
+    chains = pd.DataFrame({
+        'shot_event_id': ids[shots],
+        'game_id': game[shots],
+        'possession_no': possession_no[possession[shots]],
+        'game_date': events['game_date'].to_numpy(dtype=object)[shots],
+        'team_name': events['team_name'].to_numpy(dtype=object)[shots],
+        'opp_team_name': events['opp_team_name'].to_numpy(dtype=object)[shots],
+        'period': period[shots],
+        'clock_seconds': clock[shots],
+        'shooter': player[shots],
+        'shot_type': event_type[shots],
+        'goal': successful[shots],
+        'primary_assist': pick(player, primary),
+        'primary_pass_event_id': pick(ids, primary, 'Int64'),
+        'secondary_assist': pick(player, secondary),
+        'secondary_pass_event_id': pick(ids, secondary, 'Int64'),
+        'zone_entry_player': pick(player, entry),
+        'zone_entry_type': pick(event_type, entry),
+        'zone_entry_event_id': pick(ids, entry, 'Int64'),
+        'seconds_from_entry': pick(clock[np.maximum(entry, 0)] - clock[shots], np.where(entry >= 0, np.arange(len(shots)), -1), 'Int64'),
+        'seconds_into_possession': clock[row_start[shots]] - clock[shots],
+    })
+    return possessions, chains
+
+
+def frame_records(frame):
+    """DataFrame rows as dicts of plain Python values (None for missing)"""
+    return [{key: (None if pd.isna(value) else (value.item() if hasattr(value, 'item') else value))
+             for key, value in row.items()} for row in frame.to_dict('records')]
@@ -0,0 +1,859 @@
+import numpy as np
+import pandas as pd
+from csv_schema import COLUMNS, CSV_READ_OPTIONS, coerce_chunk
+from chains import CHAIN_COLUMNS, POSSESSION_COLUMNS, SHOT_CHAIN_COLUMNS, build_chains, frame_records
+from queries import PERIOD_SECONDS, period_length, FUZZY_THRESHOLD, FEED_NULL_DATE, FEED_NULL_PERIOD, FEED_NULL_CLOCK, LEADERBOARD_COLUMNS, EXPORT_EVENT_COLUMNS, MATCHUP_COLUMNS, NET_X, NET_Y, SLOT
+import datetime
+import os
+import re
+
+# In-memory backend: play_by_play held as NumPy column arrays.
+# String columns are stored as int32 codes into a sorted dictionary (-1 = NULL);
+# columns holding the same kind of value share one so their codes compare directly.
+DICTIONARIES = {
+    'team_name': 'teams',
+    'opp_team_name': 'teams',
+    'player_name': 'players',
+    'player_name_2': 'players',
+    'venue': 'venue',
+    'situation_type': 'situation_type',
+    'event': 'event',
+    'event_type': 'event_type',
+    'event_detail_1': 'event_detail_1',
+    'event_detail_2': 'event_detail_2',
+    'event_detail_3': 'event_detail_3',
+}
+INT_COLUMNS = ['id', 'season_year', 'period', 'clock_seconds', 'goals_for', 'goals_against']
+COORD_COLUMNS = ['x_coord', 'y_coord', 'x_coord_2', 'y_coord_2']
+EVENT_COLUMNS = ['id'] + COLUMNS  # same columns as EVENTS_SELECT in app.py
+GAME_COLUMNS = ['game_id', 'game_date', 'season_year', 'home_team', 'away_team', 'home_goals', 'away_goals',
+                'periods', 'event_count', 'first_event_id', 'last_event_id']  # GAMES_SELECT in app.py
+
+# Same counters as lib/aggregates.py builds into player_game_stats / team_game_stats
+COUNTERS = [
+    'total_events', 'goals', 'shots', 'successful_passes', 'incomplete_passes', 'faceoff_wins',
+    'puck_recoveries', 'takeaways', 'zone_entries', 'dump_ins_outs', 'penalties'
+]
+EVENT_COUNTERS = {
+    'faceoff_wins': 'Faceoff Win',
+    'puck_recoveries': 'Puck Recovery',
+    'takeaways': 'Takeaway',
+    'zone_entries': 'Zone Entry',
+    'dump_ins_outs': 'Dump In/Out',
+    'penalties': 'Penalty Taken',
+}
+
+
+class ColumnStore:
+    """
+    Read-only, columnar copy of play_by_play that answers every API query with
+    vectorized masks and group-bys. Results match the SQL path row for row
+    (same keys and Python types as psycopg2's RealDictCursor rows).
+    """
+
+    def __init__(self, df, version=0):
+        """df has play_by_play's columns (id optional) typed like csv_schema.coerce_chunk output"""
+        self.size = len(df)
+        self.version = version
+
+        # Dictionary-encoded strings
+        self.dictionaries = {}
+        self.codes = {}
+        for name in sorted(set(DICTIONARIES.values())):
+            columns = [c for c, d in DICTIONARIES.items() if d == name]
+            values = pd.concat([df[c] for c in columns]).dropna().unique()
+            self.dictionaries[name] = np.array(sorted(values), dtype=object)
+            for column in columns:
+                self.codes[column] = self._encode(df[column], self.dictionaries[name])
+
+        # Dates are dictionary-encoded too; the dictionary is sorted so code order is date order
+        game_dates = pd.to_datetime(df['game_date']).dt.date
+        self.dates = np.array(sorted(game_dates.dropna().unique()), dtype=object)
+        self.codes['game_date'] = self._encode(game_dates, self.dates)
+
+        # Plain numeric columns
+        self.ints = {}
+        self.int_nulls = {}
+        for column in INT_COLUMNS:
+            values = df[column] if column in df else pd.Series(np.arange(1, self.size + 1))
+            values = pd.to_numeric(values, errors='coerce')
+            nulls = values.isna().to_numpy()
+            self.ints[column] = values.fillna(0).to_numpy(dtype=np.int64)
+            self.int_nulls[column] = nulls if nulls.any() else None
+
+        successful = df['event_successful'].map({True: 1, False: 0}).fillna(-1)
+        self.successful = successful.to_numpy(dtype=np.int8)  # 1 / 0 / -1 = NULL
+        self.coords = {c: pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float64) for c in COORD_COLUMNS}
+
+        # Output lookups: code -> Python value, with the extra last slot (code -1) as None
+        self._lookups = {name: np.append(values, None) for name, values in self.dictionaries.items()}
+        self._lookups['game_date'] = np.append(self.dates, None)
+
+        # Feed order for /api/events: game_date DESC, period ASC, clock_seconds DESC, id ASC, NULL keys
+        # last like FEED_KEYS (a NULL date's code, -1, is already below every date's)
+        self.feed_periods = self._with_nulls('period', FEED_NULL_PERIOD)
+        self.feed_clocks = self._with_nulls('clock_seconds', FEED_NULL_CLOCK)
+        self.feed_order = np.lexsort((
+            self.ints['id'], -self.feed_clocks, self.feed_periods, -self.codes['game_date']
+        ))
+
+        # Equivalents of player_game_stats / team_game_stats and the home-side game list
+        has_teams = (self.codes['team_name'] >= 0) & (self.codes['opp_team_name'] >= 0)
+        self.player_games = self._game_stats(
+            ['player_name', 'team_name', 'game_date', 'opp_team_name'], has_teams & (self.codes['player_name'] >= 0))
+        self.team_games = self._game_stats(['team_name', 'game_date', 'opp_team_name'], has_teams)
+        self.home_games = self._game_stats(
+            ['game_date', 'team_name', 'opp_team_name'], self.codes['venue'] == self.code('venue', 'home'))
+        self.game_ids, self.game_table = self._games(df)
+
+        # Possessions and shot chains, the same rows lib/analytics.py precomputes
+        self.possession_frame, self.chain_frame = build_chains(self._chain_events())
+
+        # Search dictionary and leaderboard splits, same rows as search_names and
+        # player_split_stats (lib/search.py, lib/leaderboards.py)
+        self.search_names = self._search_names()
+        self.split_stats = self._split_stats()
+
+        # Head-to-head matrix, same rows as team_matchup_stats (lib/matchups.py)
+        self.matchup_stats = self._matchup_stats()
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Build the store straight from a play-by-play CSV (ids numbered like a fresh load)"""
+        return cls(coerce_chunk(pd.read_csv(csv_path, **CSV_READ_OPTIONS)))
+
+    @classmethod
+    def from_postgres(cls):
+        """Build the store from the play_by_play table"""
+        from database import get_db_connection
+
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {', '.join(EVENT_COLUMNS)}, game_id FROM play_by_play ORDER BY id")
+                df = pd.DataFrame(cur.fetchall(), columns=EVENT_COLUMNS + ['game_id'])
+                cur.execute("SELECT version FROM dataset_meta WHERE id = 1")
+                row = cur.fetchone()
+        return cls(df, version=row[0] if row else 0)
+
+    # Encoding / decoding helpers
+
+    @staticmethod
+    def _encode(series, dictionary):
+        return pd.Categorical(series, categories=dictionary).codes.astype(np.int32)
+
+    def code(self, dictionary, value):
+        """Code of value in a dictionary (-2 if absent, which matches nothing, not even NULL)"""
+        values = self.dictionaries[dictionary] if dictionary != 'game_date' else self.dates
+        pos = np.searchsorted(values, value)
+        return int(pos) if pos < len(values) and values[pos] == value else -2
+
+    def _with_nulls(self, column, null_value):
+        """An int column with its NULLs replaced by null_value"""
+        nulls = self.int_nulls[column]
+        return self.ints[column] if nulls is None else np.where(nulls, null_value, self.ints[column])
+
+    def _values(self, column, idx):
+        """Python values of column for row positions idx"""
+        if column in self.codes:
+            lookup = self._lookups[DICTIONARIES.get(column, column)]
+            return lookup[self.codes[column][idx]].tolist()
+        if column in self.ints:
+            values = self.ints[column][idx].tolist()
+            nulls = self.int_nulls[column]
+            if nulls is not None:
+                values = [None if null else v for v, null in zip(values, nulls[idx])]
+            return values
+        if column == 'event_successful':
+            return np.array([None, False, True], dtype=object)[self.successful[idx] + 1].tolist()
+        # Coordinates: float8 in the play_by_play view (None for NULL)
+        return [None if np.isnan(v) else v for v in self.coords[column][idx].tolist()]
+
+    def rows(self, idx, columns):
+        """Materialize rows idx as dicts with the given columns"""
+        values = [self._values(c, idx) for c in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    @staticmethod
+    def _records(table, idx, columns):
+        """Rows idx of a grouped table (dict of lists/arrays) as dicts, columns maps output name -> table key"""
+        values = [np.asarray(table[key])[idx].tolist() for key in columns.values()]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    # Group-bys
+
+    def _game_stats(self, key_columns, mask):
+        """Group the rows in mask by key_columns and count events, like lib/aggregates.py"""
+        idx = np.flatnonzero(mask)
+        keys = np.column_stack([self.codes[c][idx] for c in key_columns]) if len(idx) else np.empty((0, len(key_columns)), np.int32)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n = len(groups)
+
+        event = self.codes['event'][idx]
+        successful = self.successful[idx]
+        is_shot = event == self.code('event', 'Shot')
+        is_play = event == self.code('event', 'Play')
+
+        def count(flags):
+            return np.bincount(inverse, weights=flags, minlength=n).astype(np.int64)
+
+        stats = {c: groups[:, i] for i, c in enumerate(key_columns)}
+        stats['total_events'] = np.bincount(inverse, minlength=n).astype(np.int64)
+        stats['goals'] = count(is_shot & (successful == 1))
+        stats['shots'] = count(is_shot & (successful == 0))
+        stats['successful_passes'] = count(is_play & (successful == 1))
+        stats['incomplete_passes'] = count(is_play & (successful == 0))
+        for counter, event_name in EVENT_COUNTERS.items():
+            stats[counter] = count(event == self.code('event', event_name))
+
+        # Score at the last event of each group (latest period, lowest clock)
+        order = np.lexsort((self.ints['clock_seconds'][idx], -self.ints['period'][idx], inverse))
+        last = idx[order[np.unique(inverse[order], return_index=True)[1]]]
+        stats['score_for'] = self._values('goals_for', last)
+        stats['score_against'] = self._values('goals_against', last)
+        return stats
+
+    def _games(self, df):
+        """
+        Per-row game ids plus the equivalent of the games table. Ids come from df when
+        it has a game_id column, otherwise they are numbered by (date, home, away) like a fresh load.
+        """
+        is_home = self.codes['venue'] == self.code('venue', 'home')
+        home = np.where(is_home, self.codes['team_name'], self.codes['opp_team_name'])
+        away = np.where(is_home, self.codes['opp_team_name'], self.codes['team_name'])
+        idx = np.flatnonzero((self.codes['game_date'] >= 0) & (home >= 0) & (away >= 0))
+        keys = np.column_stack([self.codes['game_date'][idx], home[idx], away[idx]]) if len(idx) else np.empty((0, 3), np.int32)
+        groups, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        n = len(groups)
+
+        if 'game_id' in df:
+            ids = pd.to_numeric(df['game_id']).to_numpy(dtype=np.int64)[idx][first]
+        else:
+            ids = np.arange(1, n + 1, dtype=np.int64)
+        row_ids = np.full(self.size, -1, dtype=np.int64)
+        row_ids[idx] = ids[inverse]
+
+        def reduce(ufunc, column, initial):
+            out = np.full(n, initial, dtype=np.int64)
+            ufunc.at(out, inverse, self.ints[column][idx])
+            return out
+
+        # Final score from the home side's last event, like home_games / the games listing
+        home_scores = {
+            (d, t, o): (f, a) for d, t, o, f, a in zip(
+                self.home_games['game_date'], self.home_games['team_name'], self.home_games['opp_team_name'],
+                self.home_games['score_for'], self.home_games['score_against'])
+        }
+        scores = [home_scores.get(tuple(key), (None, None)) for key in groups.tolist()]
+
+        table = {
+            'game_id': ids,
+            'game_date': groups[:, 0],
+            'home_team': groups[:, 1],
+            'away_team': groups[:, 2],
+            'season_year': reduce(np.minimum, 'season_year', np.iinfo(np.int64).max),
+            'home_goals': np.array([f for f, _ in scores], dtype=object),
+            'away_goals': np.array([a for _, a in scores], dtype=object),
+            'periods': reduce(np.maximum, 'period', 0),
+            'event_count': np.bincount(inverse, minlength=n).astype(np.int64),
+            'first_event_id': reduce(np.minimum, 'id', np.iinfo(np.int64).max),
+            'last_event_id': reduce(np.maximum, 'id', 0),
+        }
+        return row_ids, table
+
+    def _chain_events(self):
+        """Every row with the columns chains.build_chains needs"""
+        idx = np.arange(self.size)
+        frame = pd.DataFrame({c: self._values(c, idx) for c in CHAIN_COLUMNS if c != 'game_id'})
+        frame['game_id'] = np.where(self.game_ids >= 0, self.game_ids, np.nan)  # rows outside a game are skipped
+        return frame
+
+    def _search_names(self):
+        """kind, name, search_key, team_name, event_count and trigrams of every player and team with events"""
+        players = np.concatenate([self.codes['player_name'], self.codes['player_name_2']])
+        teams = np.concatenate([self.codes['team_name'], self.codes['team_name']])
+        keep = players >= 0
+        pairs, counts = np.unique(np.column_stack([players[keep], teams[keep]]), axis=0, return_counts=True)
+        # Most events first, then team name order (codes are sorted, no team last)
+        team_order = np.where(pairs[:, 1] >= 0, pairs[:, 1], np.iinfo(np.int32).max)
+        order = np.lexsort((team_order, -counts, pairs[:, 0]))
+        pairs, counts = pairs[order], counts[order]
+        first = np.flatnonzero(np.r_[True, pairs[1:, 0] != pairs[:-1, 0]])
+        totals = np.add.reduceat(counts, first) if len(first) else counts
+
+        team_names = self.dictionaries['teams']
+        names = [('player', self.dictionaries['players'][p], team_names[t] if t >= 0 else None, int(n))
+                 for p, t, n in zip(pairs[first, 0], pairs[first, 1], totals)]
+        team_counts = np.bincount(self.codes['team_name'][self.codes['team_name'] >= 0], minlength=len(team_names))
+        names += [('team', team_names[t], None, int(team_counts[t])) for t in np.flatnonzero(team_counts)]
+
+        frame = pd.DataFrame(names, columns=['kind', 'name', 'team_name', 'event_count'])
+        frame['search_key'] = frame['name'].str.lower()
+        frame['trigrams'] = frame['search_key'].map(trigrams)
+        return frame
+
+    def _split_stats(self):
+        """Per player and team totals overall, per situation_type, strength and period"""
+        idx = np.flatnonzero((self.codes['player_name'] >= 0) & (self.codes['team_name'] >= 0))
+        event = self.codes['event'][idx]
+        successful = self.successful[idx]
+        is_shot = event == self.code('event', 'Shot')
+        is_pass = event == self.code('event', 'Play')
+        situation = self._values('situation_type', idx)
+        frame = pd.DataFrame({
+            'player_name': self._values('player_name', idx),
+            'team_name': self._values('team_name', idx),
+            'game_id': np.where(self.game_ids[idx] >= 0, self.game_ids[idx], np.nan),
+            'situation': situation,
+            'strength': [strength(value) for value in situation],
+            'period': [str(value) if value is not None else None for value in self._values('period', idx)],
+            'goals': is_shot & (successful == 1),
+            'shots': is_shot & (successful == 0),
+            'shot_attempts': is_shot,
+            'successful_passes': is_pass & (successful == 1),
+            'incomplete_passes': is_pass & (successful == 0),
+            'takeaways': event == self.code('event', 'Takeaway'),
+            'faceoff_wins': event == self.code('event', 'Faceoff Win'),
+        })
+        sums = {c: (c, 'sum') for c in ['goals', 'shots', 'shot_attempts', 'successful_passes',
+                                         'incomplete_passes', 'takeaways', 'faceoff_wins']}
+        splits = []
+        for split, column in (('all', None), ('situation', 'situation'), ('strength', 'strength'), ('period', 'period')):
+            keys = ['player_name', 'team_name'] + ([column] if column else [])
+            grouped = frame.groupby(keys).agg(games_played=('game_id', 'nunique'), **sums).reset_index()
+            grouped['split'] = split
+            grouped['split_value'] = grouped[column] if column else ''
+            splits.append(grouped)
+        stats = pd.concat(splits, ignore_index=True)
+        attempts = stats['successful_passes'] + stats['incomplete_passes']
+        stats['pass_completion_pct'] = (stats['successful_passes'] / attempts * 100).where(attempts > 0)
+        return stats[['split', 'split_value'] + LEADERBOARD_COLUMNS]
+
+    def _matchup_stats(self):
+        """Per team and opponent totals with shot location summaries"""
+        idx = np.flatnonzero((self.codes['team_name'] >= 0) & (self.codes['opp_team_name'] >= 0))
+        event = self.codes['event'][idx]
+        successful = self.successful[idx]
+        is_shot = event == self.code('event', 'Shot')
+        is_pass = event == self.code('event', 'Play')
+        is_entry = event == self.code('event', 'Zone Entry')
+        x, y = self.coords['x_coord'][idx], self.coords['y_coord'][idx]
+        located = is_shot & ~np.isnan(x) & ~np.isnan(y)
+        x_min, x_max, y_min, y_max = SLOT
+        slot = is_shot & (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+        frame = pd.DataFrame({
+            'team_name': self._values('team_name', idx),
+            'opp_team_name': self._values('opp_team_name', idx),
+            'game_id': np.where(self.game_ids[idx] >= 0, self.game_ids[idx], np.nan),
+            'total_events': np.ones(len(idx), dtype=np.int64),
+            'goals': is_shot & (successful == 1),
+            'shots': is_shot & (successful == 0),
+            'shot_attempts': is_shot,
+            'successful_passes': is_pass & (successful == 1),
+            'incomplete_passes': is_pass & (successful == 0),
+            'zone_entries': is_entry,
+            'successful_zone_entries': is_entry & (successful == 1),
+            'faceoff_wins': event == self.code('event', 'Faceoff Win'),
+            'takeaways': event == self.code('event', 'Takeaway'),
+            'located_shot_attempts': located,
+            'shot_x': np.where(located, x, np.nan),
+            'shot_y': np.where(located, y, np.nan),
+            'shot_distance': np.where(located, np.hypot(NET_X - x, NET_Y - y), np.nan),
+            'slot_shot_attempts': slot,
+            'slot_goals': slot & (successful == 1),
+        })
+        sums = {c: (c, 'sum') for c in MATCHUP_COLUMNS[3:] if c in frame}
+        stats = frame.groupby(['team_name', 'opp_team_name']).agg(
+            games_played=('game_id', 'nunique'), **sums,
+            avg_shot_x=('shot_x', 'mean'), avg_shot_y=('shot_y', 'mean'), avg_shot_distance=('shot_distance', 'mean'),
+        ).reset_index()
+        # ROUND(..., 2) in SQL (which rounds half up where this rounds half to even, a last-digit difference at most)
+        for column in ('avg_shot_x', 'avg_shot_y', 'avg_shot_distance'):
+            stats[column] = np.round(stats[column], 2)
+        stats['shooting_pct'] = (stats['goals'] / stats['shot_attempts'] * 100).where(stats['shot_attempts'] > 0)
+        attempts = stats['successful_passes'] + stats['incomplete_passes']
+        stats['pass_completion_pct'] = (stats['successful_passes'] / attempts * 100).where(attempts > 0)
+        return stats[MATCHUP_COLUMNS]
+
+    def _rollup(self, table, mask, key_columns, sums):
+        """Re-group a per-game table by key_columns: summed counters plus distinct games_played"""
+        idx = np.flatnonzero(mask)
+        keys = np.column_stack([table[c][idx] for c in key_columns]) if len(idx) else np.empty((0, len(key_columns)), np.int32)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n = len(groups)
+
+        out = {c: groups[:, i] for i, c in enumerate(key_columns)}
+        for column in sums:
+            out[column] = np.bincount(inverse, weights=table[column][idx], minlength=n).astype(np.int64)
+        game_days = np.unique(np.column_stack([inverse, table['game_date'][idx]]), axis=0) if n else np.empty((0, 2), np.int64)
+        out['games_played'] = np.bincount(game_days[:, 0], minlength=n).astype(np.int64)
+        return out
+
+    def _decode(self, table, dictionaries):
+        """Replace code arrays in a grouped table with Python values"""
+        decoded = dict(table)
+        for column, dictionary in dictionaries.items():
+            decoded[column] = self._lookups[dictionary][table[column]]
+        return decoded
+
+    def _table_mask(self, table, **filters):
+        """Mask over a grouped table's rows where each column equals a value"""
+        mask = np.ones(len(table['total_events']), dtype=bool)
+        for column, (dictionary, value) in filters.items():
+            mask &= table[column] == self.code(dictionary, value)
+        return mask
+
+    def _shot_chart_events(self, mask):
+        """Shots and passes with coordinates, newest game first (stable within a date)"""
+        mask = mask & ~np.isnan(self.coords['x_coord'])
+        mask &= np.isin(self.codes['event'], [self.code('event', 'Shot'), self.code('event', 'Play')])
+        idx = np.flatnonzero(mask)
+        return idx[np.argsort(-self.codes['game_date'][idx], kind='stable')]
+
+    # Queries, one per route
+
+    def events(self, team=None, player=None, event=None, limit=2000, offset=0, cursor_params=None, season=None):
+        order = self.feed_order
+        mask = np.ones(len(order), dtype=bool)
+        if team:
+            mask &= self.codes['team_name'][order] == self.code('teams', team)
+        if player:
+            mask &= self.codes['player_name'][order] == self.code('players', player)
+        if event:
+            mask &= self.codes['event'][order] == self.code('event', event)
+        if season is not None:
+            mask &= self.ints['season_year'][order] == season
+        if cursor_params:
+            # (game_date, -period, clock_seconds, -id) < cursor on the COALESCE'd keys, same as EVENTS_AFTER_CURSOR
+            cursor_date, neg_period, clock, neg_id = cursor_params
+            if cursor_date == FEED_NULL_DATE:
+                cursor_code = -1  # NULL's code
+            else:
+                # A date missing from the store falls between its neighbours' codes
+                first = np.searchsorted(self.dates, cursor_date, side='left')
+                found = first < len(self.dates) and self.dates[first] == cursor_date
+                cursor_code = first if found else first - 0.5
+            dates = self.codes['game_date'][order]
+            neg_periods = -self.feed_periods[order]
+            clocks = self.feed_clocks[order]
+            mask &= (dates < cursor_code) | ((dates == cursor_code) & (
+                (neg_periods < neg_period) | ((neg_periods == neg_period) & (
+                    (clocks < clock) | ((clocks == clock) & (-self.ints['id'][order] < neg_id))))))
+        idx = order[mask][offset:offset + limit]
+        return self.rows(idx, EVENT_COLUMNS)
+
+    def teams(self):
+        return self._lookups['teams'][np.unique(self.team_games['team_name'])].tolist()
+
+    def players(self, team=None):
+        table = self.player_games
+        mask = self._table_mask(table, team_name=('teams', team)) if team else np.ones(len(table['total_events']), bool)
+        grouped = self._decode(
+            self._rollup(table, mask, ['player_name', 'team_name'], ['goals', 'successful_passes', 'shots']),
+            {'player_name': 'players', 'team_name': 'teams'})
+        return self._records(grouped, slice(None), {
+            'player_name': 'player_name', 'team_name': 'team_name', 'games_played': 'games_played',
+            'goals': 'goals', 'successful_plays': 'successful_passes', 'shots': 'shots'})
+
+    def player_detail(self, player_name):
+        """Returns (summary or None, shot chart events, per-game rows)"""
+        table = self.player_games
+        mask = self._table_mask(table, player_name=('players', player_name))
+        grouped = self._decode(
+            self._rollup(table, mask, ['player_name', 'team_name'], COUNTERS),
+            {'player_name': 'players', 'team_name': 'teams'})
+        summaries = self._records(grouped, slice(None), {
+            c: c for c in ['player_name', 'team_name', 'games_played'] + COUNTERS})
+        if not summaries:
+            return None, [], []
+
+        events = self.rows(
+            self._shot_chart_events(self.codes['player_name'] == self.code('players', player_name)),
+            ['period', 'clock_seconds', 'event', 'event_successful', 'x_coord', 'y_coord', 'opp_team_name',
+             'event_type', 'player_name_2', 'x_coord_2', 'y_coord_2'])
+        return summaries[0], events, self._game_rows(table, mask)
+
+    def _game_rows(self, table, mask):
+        """Per-game breakdown rows, newest game first"""
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort(-table['game_date'][idx], kind='stable')]
+        decoded = self._decode(table, {'game_date': 'game_date', 'opp_team_name': 'teams'})
+        return self._records(decoded, idx, {
+            'game_date': 'game_date', 'opp_team_name': 'opp_team_name', 'total_events': 'total_events',
+            'goals': 'goals', 'shots': 'shots', 'passes': 'successful_passes',
+            'score_for': 'score_for', 'score_against': 'score_against'})
+
+    def teams_stats(self):
+        table = self.team_games
+        grouped = self._decode(
+            self._rollup(table, np.ones(len(table['total_events']), bool), ['team_name'], ['goals', 'shots', 'successful_passes']),
+            {'team_name': 'teams'})
+        return self._records(grouped, slice(None), {
+            'team_name': 'team_name', 'games_played': 'games_played', 'goals': 'goals',
+            'shots': 'shots', 'passes': 'successful_passes'})
+
+    def team_detail(self, team_name):
+        """Returns (summary or None, shot chart events, per-game rows)"""
+        table = self.team_games
+        mask = self._table_mask(table, team_name=('teams', team_name))
+        grouped = self._decode(self._rollup(table, mask, ['team_name'], COUNTERS), {'team_name': 'teams'})
+        columns = {c: c for c in ['team_name', 'games_played'] + COUNTERS if c != 'incomplete_passes'}
+        columns['passes'] = columns.pop('successful_passes')
+        summaries = self._records(grouped, slice(None), columns)
+        if not summaries:
+            return None, [], []
+
+        events = self.rows(
+            self._shot_chart_events(self.codes['team_name'] == self.code('teams', team_name)),
+            ['period', 'clock_seconds', 'event', 'event_successful', 'x_coord', 'y_coord', 'player_name',
+             'opp_team_name', 'event_type', 'player_name_2', 'x_coord_2', 'y_coord_2'])
+        return summaries[0], events, self._game_rows(table, mask)
+
+    def team_averages(self, team_name):
+        table = self.player_games
+        mask = self._table_mask(table, team_name=('teams', team_name))
+        players = self._rollup(table, mask, ['player_name'], ['goals', 'shots', 'successful_passes', 'incomplete_passes'])
+        n = len(players['player_name'])
+        if n == 0:
+            return {"total_players": 0, "avg_goals": None, "avg_shots": None,
+                    "avg_shooting_pct": None, "avg_pass_completion_pct": None}
+
+        goals, shots = players['goals'], players['shots']
+        passes = players['successful_passes'] + players['incomplete_passes']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shooting_pct = np.where(goals + shots > 0, goals / (goals + shots) * 100, 0.0)
+            pass_pct = np.where(passes > 0, players['successful_passes'] / passes * 100, 0.0)
+        return {
+            "total_players": n,
+            "avg_goals": int(goals.sum()) / n,
+            "avg_shots": int(shots.sum()) / n,
+            "avg_shooting_pct": sum(shooting_pct.tolist()) / n,
+            "avg_pass_completion_pct": sum(pass_pct.tolist()) / n,
+        }
+
+    def games(self):
+        table = self._decode(self.game_table, {'game_date': 'game_date', 'home_team': 'teams', 'away_team': 'teams'})
+        idx = np.lexsort((self.game_table['game_id'], -self.game_table['game_date']))
+        return self._records(table, idx, {
+            'game_id': 'game_id', 'game_date': 'game_date', 'team_name': 'home_team', 'opp_team_name': 'away_team',
+            'goals_for': 'home_goals', 'goals_against': 'away_goals'})
+
+    def game_row(self, game_id):
+        """games row for game_id, or None"""
+        pos = np.flatnonzero(self.game_table['game_id'] == game_id)
+        if not len(pos):
+            return None
+        table = self._decode(self.game_table, {'game_date': 'game_date', 'home_team': 'teams', 'away_team': 'teams'})
+        return self._records(table, pos, {column: column for column in GAME_COLUMNS})[0]
+
+    def game(self, game_id):
+        """(games row, events in game order) for game_id, or (None, [])"""
+        game = self.game_row(game_id)
+        if game is None:
+            return None, []
+        idx = np.flatnonzero(self.game_ids == game_id)
+        idx = idx[np.lexsort((self.ints['id'][idx], -self.ints['clock_seconds'][idx], self.ints['period'][idx]))]
+        return game, self.rows(idx, EVENT_COLUMNS)
+
+    def game_events(self, game_date, team_name):
+        """Every event of the game on game_date involving team_name, in game order"""
+        date_code = self.code('game_date', datetime.date.fromisoformat(game_date))
+        team_code = self.code('teams', team_name)
+        mask = (self.codes['game_date'] == date_code) & (
+            (self.codes['team_name'] == team_code) | (self.codes['opp_team_name'] == team_code))
+        idx = np.flatnonzero(mask)
+        idx = idx[np.lexsort((self.ints['id'][idx], -self.ints['clock_seconds'][idx], self.ints['period'][idx]))]
+        return self.rows(idx, EVENT_COLUMNS)
+
+    # Possessions and shot chains
+
+    def game_possessions(self, game_id):
+        """(games row or None, possessions in order)"""
+        frame = self.possession_frame[self.possession_frame['game_id'] == game_id].sort_values('possession_no')
+        columns = [c for c in POSSESSION_COLUMNS if c not in ('game_id', 'game_date')]
+        return self.game_row(game_id), frame_records(frame[columns])
+
+    def game_shot_chains(self, game_id):
+        """(games row or None, shot chains in game order)"""
+        frame = self.chain_frame[self.chain_frame['game_id'] == game_id]
+        frame = frame.sort_values(['period', 'clock_seconds', 'shot_event_id'], ascending=[True, False, True])
+        return self.game_row(game_id), frame_records(frame[SHOT_CHAIN_COLUMNS])
+
+    @staticmethod
+    def _possession_totals(frame):
+        """POSSESSION_TOTALS in app.py"""
+        return {
+            'possessions': len(frame),
+            'total_duration': int(frame['duration'].sum()),
+            'total_events': int(frame['event_count'].sum()),
+            'passes': int(frame['passes'].sum()),
+            'shots': int(frame['shots'].sum()),
+            'goals': int(frame['goals'].sum()),
+            'possessions_with_shot': int((frame['shots'] > 0).sum()),
+            'possessions_with_entry': int((frame['zone_entries'] > 0).sum()),
+        }
+
+    def team_possessions(self, team_name):
+        """(summary or None, per-game rows newest first)"""
+        frame = self.possession_frame[self.possession_frame['team_name'] == team_name]
+        if frame.empty:
+            return None, []
+        summary = {'team_name': team_name, 'games_played': int(frame['game_id'].nunique()), **self._possession_totals(frame)}
+        games = [{'game_id': int(game_id), 'game_date': game_date, 'opp_team_name': opp_team_name, **self._possession_totals(group)}
+                 for (game_id, game_date, opp_team_name), group
+                 in frame.groupby(['game_id', 'game_date', 'opp_team_name'], sort=False, dropna=False)]
+        games.sort(key=lambda game: (-game['game_date'].toordinal(), game['game_id']))
+        return summary, games
+
+    def team_assists(self, team_name):
+        """Assist counts per player of the team, or None if the team doesn't exist"""
+        if self.code('teams', team_name) < 0:
+            return None
+        chains = self.chain_frame[self.chain_frame['team_name'] == team_name]
+        players = {}
+        for column, kind in (('primary_assist', 'primary'), ('secondary_assist', 'secondary')):
+            for player_name, goal in zip(chains[column], chains['goal']):
+                if pd.isna(player_name):
+                    continue
+                row = players.setdefault(player_name, {
+                    'player_name': player_name, 'primary_assists': 0, 'secondary_assists': 0,
+                    'primary_goal_assists': 0, 'secondary_goal_assists': 0})
+                row[f'{kind}_assists'] += 1
+                row[f'{kind}_goal_assists'] += int(goal)
+        return sorted(players.values(), key=lambda row: (-row['primary_assists'], row['player_name']))
+
+    def player_assists(self, player_name):
+        """(summary, shot chains the player shot or set up) or (None, []) if the player doesn't exist"""
+        if self.code('players', player_name) < 0:
+            return None, []
+        chains = self.chain_frame
+        shooter = chains['shooter'] == player_name
+        primary = chains['primary_assist'] == player_name
+        secondary = chains['secondary_assist'] == player_name
+        goal = chains['goal'].astype(bool)
+        summary = {
+            'primary_assists': int(primary.sum()),
+            'secondary_assists': int(secondary.sum()),
+            'primary_goal_assists': int((primary & goal).sum()),
+            'secondary_goal_assists': int((secondary & goal).sum()),
+            'shots': int(shooter.sum()),
+            'assisted_shots': int((shooter & chains['primary_assist'].notna()).sum()),
+            'shots_off_entry': int((shooter & chains['zone_entry_event_id'].notna()).sum()),
+        }
+        involved = chains[shooter | primary | secondary].sort_values(
+            ['game_date', 'period', 'clock_seconds', 'shot_event_id'], ascending=[False, True, False, True])
+        return summary, frame_records(involved[SHOT_CHAIN_COLUMNS])
+
+    def heatmap(self, filters, bin_size, x_bins, y_bins):
+        """Per-bin totals over the rink in one vectorized pass, same rows as the SQL in get_heatmap"""
+        x, y = self.coords['x_coord'], self.coords['y_coord']
+        mask = ~np.isnan(x) & ~np.isnan(y)
+        for column, value in filters.items():
+            if value is None or value == '':
+                continue
+            if column in self.ints:
+                mask &= self.ints[column] == value
+            else:
+                mask &= self.codes[column] == self.code(DICTIONARIES[column], value)
+
+        idx = np.flatnonzero(mask)
+        x_bin = np.clip(np.floor(x[idx] / bin_size), 0, x_bins - 1).astype(np.int64)
+        y_bin = np.clip(np.floor(y[idx] / bin_size), 0, y_bins - 1).astype(np.int64)
+        flat = x_bin * y_bins + y_bin
+        size = x_bins * y_bins
+
+        dx = self.coords['x_coord_2'][idx] - x[idx]
+        dy = self.coords['y_coord_2'][idx] - y[idx]
+        has_vector = ~np.isnan(dx) & ~np.isnan(dy)
+
+        count = np.bincount(flat, minlength=size)
+        successful = np.bincount(flat, weights=self.successful[idx] == 1, minlength=size)
+        vector_count = np.bincount(flat, weights=has_vector, minlength=size)
+        sum_dx = np.bincount(flat, weights=np.where(has_vector, dx, 0.0), minlength=size)
+        sum_dy = np.bincount(flat, weights=np.where(has_vector, dy, 0.0), minlength=size)
+
+        return [{
+            'x_bin': int(b // y_bins),
+            'y_bin': int(b % y_bins),
+            'count': int(count[b]),
+            'successful': int(successful[b]),
+            'vector_count': int(vector_count[b]),
+            'sum_dx': float(sum_dx[b]),
+            'sum_dy': float(sum_dy[b]),
+        } for b in np.flatnonzero(count)]
+
+    def timeline(self, game_id, bucket):
+        """Per-bucket totals for one game in one vectorized pass, same rows as TIMELINE_QUERY"""
+        idx = np.flatnonzero(self.game_ids == game_id)
+        idx = idx[np.lexsort((self.ints['id'][idx], -self.ints['clock_seconds'][idx], self.ints['period'][idx]))]
+        period = self.ints['period'][idx]
+        clock = self.ints['clock_seconds'][idx]
+
+        # Seconds until the next event of the period (or its end)
+        next_clock = np.append(clock[1:], 0)
+        next_clock[np.flatnonzero(period[1:] != period[:-1])] = 0
+        held = clock - next_clock
+
+        # Overtime runs as long as its latest clock says (period_length)
+        lengths = {p: period_length(p, int(clock[period == p].max())) for p in np.unique(period).tolist()}
+        period_seconds = np.array([lengths[p] for p in period.tolist()], dtype=np.int64)
+        keys = np.column_stack([period, (period_seconds - np.maximum(clock, 1)) // bucket])
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+
+        venue = self.codes['venue'][idx]
+        is_shot = self.codes['event'][idx] == self.code('event', 'Shot')
+        is_goal = is_shot & (self.successful[idx] == 1)
+        rows = [{'period': int(p), 'period_seconds': lengths[int(p)], 'bucket': int(b)} for p, b in groups]
+        for side in ('home', 'away'):
+            on_side = venue == self.code('venue', side)
+            totals = {
+                f'{side}_events': on_side,
+                f'{side}_shots': on_side & is_shot,
+                f'{side}_goals': on_side & is_goal,
+                f'{side}_possession_seconds': np.where(on_side, held, 0),
+            }
+            for key, weights in totals.items():
+                sums = np.bincount(inverse, weights=weights, minlength=len(groups))
+                for row, total in zip(rows, sums.tolist()):
+                    row[key] = int(total)
+
+        # Score as of the home side's last event in the bucket (rows are in game order)
+        home_rows = np.flatnonzero(venue == self.code('venue', 'home'))
+        last_home = np.full(len(groups), -1, dtype=np.int64)
+        np.maximum.at(last_home, inverse[home_rows], home_rows)
+        home_score = self._values('goals_for', idx[np.maximum(last_home, 0)])
+        away_score = self._values('goals_against', idx[np.maximum(last_home, 0)])
+        for row, last, home, away in zip(rows, last_home.tolist(), home_score, away_score):
+            row['home_score'], row['away_score'] = (home, away) if last >= 0 else (None, None)
+        return rows
+
+    def search(self, q, kind, limit):
+        """Top matches for q, ranked like SEARCH_QUERY (fuzzy scores approximate pg_trgm's word_similarity)"""
+        names = self.search_names
+        if kind is not None:
+            names = names[names['kind'] == kind]
+        keys = names['search_key']
+        q_trigrams = trigrams(q)
+        score = names['trigrams'].map(lambda grams: len(q_trigrams & grams) / len(q_trigrams) if q_trigrams else 0.0)
+        contains = keys.str.contains(q, regex=False)
+        match_rank = np.select(
+            [keys.str.startswith(q), (' ' + keys).str.contains(' ' + q, regex=False), contains],
+            [0, 1, 2], default=3)
+        matches = names.assign(match_rank=match_rank, score=score)[contains | (score >= FUZZY_THRESHOLD)]
+        matches = matches.sort_values(['match_rank', 'score', 'event_count', 'name'], ascending=[True, False, False, True])
+        return frame_records(matches.head(limit)[['kind', 'name', 'team_name', 'event_count']])
+
+    def leaderboard(self, stat, split, split_value, min_games, limit, offset):
+        """One page of a leaderboard, same rows and order as LEADERBOARD_QUERY"""
+        stats = self.split_stats
+        stats = stats[(stats['split'] == split) & (stats['split_value'] == split_value)
+                      & (stats['games_played'] >= min_games) & stats[stat].notna()]
+        stats = stats.sort_values([stat, 'games_played', 'player_name'], ascending=[False, True, True])
+        return frame_records(stats.iloc[offset:offset + limit][LEADERBOARD_COLUMNS])
+
+    def matchups(self, team_name=None, opponent=None):
+        """team_matchup_stats rows: all of them, every matchup of team_name, or just the pair"""
+        stats = self.matchup_stats
+        if opponent:
+            stats = stats[((stats['team_name'] == team_name) & (stats['opp_team_name'] == opponent))
+                          | ((stats['team_name'] == opponent) & (stats['opp_team_name'] == team_name))]
+        elif team_name:
+            stats = stats[(stats['team_name'] == team_name) | (stats['opp_team_name'] == team_name)]
+        return frame_records(stats.sort_values(['team_name', 'opp_team_name']))
+
+    # Bulk export (pyarrow is optional, so it's only imported here)
+
+    def export_events(self, filters):
+        """Filtered events as an Arrow table with the same schema as the SQL export, in id order"""
+        import pyarrow as pa
+        from export import events_schema
+
+        mask = np.ones(self.size, dtype=bool)
+        for column in ('team_name', 'player_name', 'event'):
+            if filters[column] is not None:
+                mask &= self.codes[column] == self.code(DICTIONARIES[column], filters[column])
+        if filters['season_year'] is not None:
+            mask &= self.ints['season_year'] == filters['season_year']
+            if self.int_nulls['season_year'] is not None:
+                mask &= ~self.int_nulls['season_year']
+        dates = self.codes['game_date']
+        if filters['date_from'] is not None:
+            mask &= (dates >= 0) & (dates >= np.searchsorted(self.dates, filters['date_from'], 'left'))
+        if filters['date_to'] is not None:
+            mask &= (dates >= 0) & (dates < np.searchsorted(self.dates, filters['date_to'], 'right'))
+        idx = np.flatnonzero(mask)
+
+        schema = events_schema(EXPORT_EVENT_COLUMNS)
+        arrays = []
+        for name, _, _ in EXPORT_EVENT_COLUMNS:
+            arrow_type = schema.field(name).type
+            if name == 'game_date':
+                codes = self.codes['game_date'][idx]
+                arrays.append(pa.array(self.dates, pa.date32()).take(pa.array(codes, pa.int32(), mask=codes < 0)))
+            elif name == 'game_id':
+                ids = self.game_ids[idx]
+                arrays.append(pa.array(ids, arrow_type, mask=ids < 0))
+            elif name in self.codes:
+                codes = self.codes[name][idx]
+                dictionary = pa.array(self.dictionaries[DICTIONARIES[name]], pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32(), mask=codes < 0), dictionary))
+            elif name in self.ints:
+                nulls = self.int_nulls[name]
+                arrays.append(pa.array(self.ints[name][idx], arrow_type, mask=nulls[idx] if nulls is not None else None))
+            elif name == 'event_successful':
+                successful = self.successful[idx]
+                arrays.append(pa.array(successful == 1, mask=successful < 0))
+            else:
+                arrays.append(pa.array(self.coords[name][idx], pa.float64(), from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def export_table(self, name):
+        """An aggregate table as a DataFrame with the SQL table's columns and order, None for an unknown name"""
+        if name == 'games':
+            table = self._decode(self.game_table, {'game_date': 'game_date', 'home_team': 'teams', 'away_team': 'teams'})
+            return pd.DataFrame({c: table[c] for c in GAME_COLUMNS}).sort_values('game_id')
+        if name in ('player_game_stats', 'team_game_stats'):
+            keys = (['player_name'] if name == 'player_game_stats' else []) + ['team_name', 'game_date', 'opp_team_name']
+            table = self._decode(self.player_games if name == 'player_game_stats' else self.team_games,
+                                 {c: DICTIONARIES.get(c, c) for c in keys})
+            frame = pd.DataFrame({c: table[c] for c in keys + COUNTERS + ['score_for', 'score_against']})
+            return frame.sort_values(keys[:-1])
+        if name == 'possessions':
+            return self.possession_frame.sort_values(['game_id', 'possession_no'])
+        if name == 'shot_chains':
+            return self.chain_frame[SHOT_CHAIN_COLUMNS].sort_values(['game_id', 'shot_event_id'])
+        if name == 'team_matchup_stats':
+            return self.matchup_stats.sort_values(['team_name', 'opp_team_name'])
+        if name == 'player_split_stats':
+            columns = ['player_name', 'team_name', 'split', 'split_value'] + LEADERBOARD_COLUMNS[2:]
+            return self.split_stats[columns].sort_values(['split', 'split_value', 'player_name', 'team_name'])
+        return None
+
+
+def strength(situation_type):
+    """Team's side of a situation_type like '5 on 4': even, power_play, short_handed (None if unparseable)"""
+    match = re.fullmatch(r'(\d+) on (\d+)', situation_type or '')
+    if not match:
+        return None
+    skaters, opponents = int(match.group(1)), int(match.group(2))
+    return 'power_play' if skaters > opponents else 'short_handed' if skaters < opponents else 'even'
+
+
+def trigrams(text):
+    """pg_trgm's trigram set: every word lowercased, padded with two spaces in front and one behind"""
+    grams = set()
+    for word in re.findall(r'[^\W_]+', text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def load_store_from_env():
+    """Build the store from MEMORY_STORE_CSV if set, otherwise from Postgres"""
+    csv_path = os.getenv('MEMORY_STORE_CSV')
+    store = ColumnStore.from_csv(csv_path) if csv_path else ColumnStore.from_postgres()
+    print(f"Loaded {store.size} events into the in-memory store")
+    return store
@@ -0,0 +1,67 @@
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # Optional: br is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd is only offered when installed
+    zstandard = None
+
+# Response compression (override with environment variables)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', '1').lower() not in ('0', 'false', 'no')
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # smaller bodies go out as they are
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', 3))
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+# Encoding -> compress function, best first (used to break ties between equal q-values)
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS['zstd'] = lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+if brotli is not None:
+    ENCODERS['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+ENCODERS['gzip'] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for a parsed Accept-Encoding header (request.accept_encodings), or None"""
+    if not COMPRESSION_ENABLED:
+        return None
+    best, best_quality = None, 0
+    for encoding in ENCODERS:
+        quality = accept_encoding[encoding]  # also matches a * entry
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def should_compress(response):
+    """Complete, successful, not yet encoded bodies of a text type over the size threshold"""
+    return (
+        response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and response.calculate_content_length() >= COMPRESSION_MIN_SIZE
+    )
+
+
+def compress(body, encoding):
+    return ENCODERS[encoding](body)
+
+
+def set_encoded_body(response, body, encoding):
+    """Swap in an encoded body; the ETag gets the encoding as a suffix since the bytes differ"""
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
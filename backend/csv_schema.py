@@ -0,0 +1,34 @@
+import pandas as pd
+
+# Column order shared by the CSV, the COPY statements and play_by_play
+COLUMNS = [
+    'game_date', 'season_year', 'team_name', 'opp_team_name', 'venue',
+    'period', 'clock_seconds', 'situation_type', 'goals_for', 'goals_against',
+    'player_name', 'event', 'event_successful', 'x_coord', 'y_coord',
+    'event_type', 'player_name_2', 'x_coord_2', 'y_coord_2',
+    'event_detail_1', 'event_detail_2', 'event_detail_3'
+]
+INTEGER_COLS = ['season_year', 'period', 'clock_seconds', 'goals_for', 'goals_against']
+NUMERIC_COLS = ['x_coord', 'y_coord', 'x_coord_2', 'y_coord_2']
+
+# pd.read_csv options: read everything as text and only treat empty fields as missing
+CSV_READ_OPTIONS = dict(dtype=str, keep_default_na=False, na_values=[''])
+
+
+def coerce_chunk(df):
+    """Vectorized type coercion for one chunk of raw CSV rows"""
+    # Convert 't'/'f' to boolean
+    df['event_successful'] = df['event_successful'].map({'t': True, 'f': False})
+
+    # Convert game_date to proper date format
+    df['game_date'] = pd.to_datetime(df['game_date'], dayfirst=True)
+
+    # Nullable integers so a missing value doesn't turn the column into floats
+    for col in INTEGER_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+
+    # Replace empty strings with None for numeric columns
+    for col in NUMERIC_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    return df[COLUMNS]
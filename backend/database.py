@@ -1,34 +1,342 @@
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 import os
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 from contextlib import contextmanager
+from metrics import POOL_ACQUIRE, record_query
 
 load_dotenv()
 
-@contextmanager
-def get_db_connection():
-    """
-    Get a database connection that auto-closes
-    Usage: with get_db_connection() as conn:
-    """
-    conn = psycopg2.connect(
+# Pool configuration (override with environment variables)
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))          # connections opened up front
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))         # hard cap per process
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))         # seconds to wait for a free connection
+POOL_MAX_AGE = float(os.getenv('DB_POOL_MAX_AGE', 1800))       # recycle connections older than this (seconds)
+POOL_HEALTH_CHECK_AFTER = float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', 30))  # ping connections idle longer than this
+
+# Rows fetched per round trip when streaming through a server-side cursor
+STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', 1000))
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within POOL_TIMEOUT seconds"""
+
+
+def _open_connection():
+    """Open a brand new connection using the DATABASE_* settings"""
+    return psycopg2.connect(
         host=os.getenv('DATABASE_HOST'),
         database=os.getenv('DATABASE_NAME'),
         user=os.getenv('DATABASE_USER'),
         password=os.getenv('DATABASE_PASSWORD'),
         port=os.getenv('DATABASE_PORT')
     )
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Idle connections are pinged before reuse if they sat around longer than
+    health_check_after, and closed/replaced once they are older than max_age.
+    Callers wait (up to timeout) when all max_size connections are in use.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 max_age=POOL_MAX_AGE, health_check_after=POOL_HEALTH_CHECK_AFTER):
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = []         # list of (conn, created_at, last_used), most recently used last
+        self._created_at = {}   # id(conn) -> created_at for connections handed out
+        self._in_use = 0
+        self._closed = False
+
+        # Counters reported by stats()
+        self._opened = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        for _ in range(min(self.min_size, self.max_size)):
+            self._idle.append((self._new_connection(), time.monotonic(), time.monotonic()))
+
+    def _new_connection(self):
+        conn = _open_connection()
+        with self._cond:
+            self._opened += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        """Cheap check first, then a round trip if the connection has been idle a while"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        """Take a connection out of the pool, opening one if there is room"""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle or self._in_use + len(self._idle) < self.max_size:
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    raise PoolTimeout(f"no database connection available after {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._acquired += 1
+            candidate = self._idle.pop() if self._idle else None
+
+            if waited:
+                wait_time = time.monotonic() - start
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        # Network I/O (health check / connect) happens outside the lock
+        try:
+            if candidate is not None:
+                conn, created_at, last_used = candidate
+                if time.monotonic() - created_at > self.max_age:
+                    self._close_quietly(conn)
+                    with self._cond:
+                        self._recycled += 1
+                    candidate = None
+                elif not self._is_healthy(conn, last_used):
+                    self._close_quietly(conn)
+                    with self._cond:
+                        self._discarded += 1
+                    candidate = None
+
+            if candidate is None:
+                conn, created_at = self._new_connection(), time.monotonic()
+            else:
+                conn, created_at = candidate[0], candidate[1]
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created_at[id(conn)] = created_at
+        return conn
+
+    def release(self, conn, discard=False):
+        """Give a connection back; anything left open in its transaction is rolled back"""
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._discarded += 1 if discard else 0
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection; connections in use are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "min_size": self.min_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "total": self._in_use + len(self._idle),
+                "opened": self._opened,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "wait_time_avg": round(self._wait_time_total / self._waits, 6) if self._waits else 0.0,
+            }
+
+
+# One pool per process: gunicorn forks workers after importing the app, and a
+# connection must never be shared across processes, so the pool is created
+# lazily and rebuilt whenever we notice we are running in a new PID.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+# Pools inherited from a parent process. Their connections share sockets with the
+# parent, and freeing a psycopg2 connection runs PQfinish, which sends Terminate on
+# that socket and ends the parent's session. Holding a reference keeps them alive
+# (and unused) for the life of the child.
+_inherited_pools = []
+
+
+def _abandon_inherited_pool():
+    """Set aside a pool created by another process without closing or freeing it"""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid != os.getpid():
+        _inherited_pools.append(_pool)
+        _pool = None
+        _pool_pid = None
+
+
+def get_pool():
+    """Return this process's connection pool, creating it on first use"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # Closing (or freeing) the parent's connections here would tear down its sessions too
+                _abandon_inherited_pool()
+                _pool = ConnectionPool()
+                _pool_pid = pid
+    return _pool
+
+
+def close_pool():
+    """Close this process's pool (e.g. on worker shutdown)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        _abandon_inherited_pool()
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+        _pool_pid = None
+
+
+def get_pool_stats():
+    """Pool statistics for this process (empty pool if nothing has connected yet)"""
+    if _pool is not None and _pool_pid == os.getpid():
+        stats = _pool.stats()
+    else:
+        stats = {"max_size": POOL_MAX_SIZE, "min_size": POOL_MIN_SIZE, "in_use": 0, "idle": 0, "total": 0}
+    stats["pid"] = os.getpid()
+    return stats
+
+
+@contextmanager
+def get_db_connection():
+    """
+    Borrow a pooled database connection and give it back afterwards
+    Usage: with get_db_connection() as conn:
+    """
+    pool = get_pool()
+    start = time.perf_counter()
+    conn = pool.acquire()
+    POOL_ACQUIRE.observe(time.perf_counter() - start)
+    broken = False
     try:
         yield conn  # Give the connection to whoever asked
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True  # Don't hand a dead connection to the next request
+        raise
     finally:
-        conn.close()  # Always close, even if there's an error
+        pool.release(conn, discard=broken or conn.closed)  # Always return it, even if there's an error
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that reports each statement's time and row count to metrics"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(self, query, vars, time.perf_counter() - start, self.rowcount)
 
 @contextmanager
 def get_db_cursor(conn):
     """Get a cursor that returns dictionaries and auto-closes"""
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor(cursor_factory=InstrumentedCursor)
     try:
         yield cursor
     finally:
-        cursor.close()
\ No newline at end of file
+        cursor.close()
+
+def stream_rows(query, params=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield dict rows from a server-side (named) cursor, batch_size rows per round trip
+    The connection is borrowed when iteration starts and returned when it ends,
+    so only one batch is ever held in memory.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cursor.itersize = batch_size
+        start = time.perf_counter()
+        rows = 0
+        try:
+            cursor.execute(query, params)
+            for row in cursor:
+                rows += 1
+                yield row
+        finally:
+            # Time to drain the cursor, which includes the client consuming the stream
+            elapsed = time.perf_counter() - start
+            cursor.close()
+            record_query(None, query, params, elapsed, rows)
+
+def stream_batches(query, params=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield lists of up to batch_size tuple rows from a server-side (named) cursor
+    Like stream_rows, for consumers that work column-wise (bulk export) and don't need dicts.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+        start = time.perf_counter()
+        rows = 0
+        try:
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                rows += len(batch)
+                yield batch
+        finally:
+            elapsed = time.perf_counter() - start
+            cursor.close()
+            record_query(None, query, params, elapsed, rows)
@@ -0,0 +1,133 @@
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: /api/export answers 501 without it
+    pa = None
+
+# Bulk export as Arrow IPC stream or Parquet, written batch by batch while the response
+# streams out. Columns are typed (int16/int32, date32, float64, bool) and text columns
+# are dictionary-encoded, so pandas / polars load them as categoricals without parsing.
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 65536))  # rows per record batch / Parquet row group
+PARQUET_COMPRESSION = os.getenv('EXPORT_PARQUET_COMPRESSION', 'zstd')
+
+MIMETYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+EXTENSIONS = {'arrow': 'arrows', 'parquet': 'parquet'}
+
+if pa is not None:
+    PRIMITIVE_TYPES = {
+        'int16': pa.int16(),
+        'int32': pa.int32(),
+        'date32': pa.date32(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+    }
+
+
+def export_available():
+    return pa is not None
+
+
+def arrow_type(column_type):
+    """Arrow type for an EXPORT_EVENT_COLUMNS type (anything else is a dimension table)"""
+    return PRIMITIVE_TYPES.get(column_type) or pa.dictionary(pa.int32(), pa.string())
+
+
+def events_schema(columns):
+    return pa.schema([(name, arrow_type(column_type)) for name, _, column_type in columns])
+
+
+def id_dictionary(pairs):
+    """Dictionary values indexed by id (ids are serials, gaps hold nulls)"""
+    pairs = list(pairs)
+    values = [None] * (max((key for key, _ in pairs), default=-1) + 1)
+    for key, value in pairs:
+        values[key] = value
+    return pa.array(values, pa.string())
+
+
+def events_batch(rows, columns, schema, dictionaries):
+    """A record batch from tuple rows in EXPORT_EVENT_COLUMNS order; dimension ids become dictionary indices"""
+    arrays = []
+    for (name, _, column_type), values in zip(columns, zip(*rows)):
+        if column_type in PRIMITIVE_TYPES:
+            arrays.append(pa.array(values, PRIMITIVE_TYPES[column_type]))
+        else:
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(values, pa.int32()), dictionaries[column_type]))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def dictionary_encode_strings(table):
+    """Dictionary-encode every string column of an Arrow table"""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table
+
+
+def table_from_rows(rows, column_names):
+    """Arrow table for dict rows (types inferred, strings dictionary-encoded)"""
+    if not rows:
+        return pa.table({name: pa.array([], pa.null()) for name in column_names})
+    return dictionary_encode_strings(pa.Table.from_pylist(rows))
+
+
+class ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_export(export_format, schema, batches):
+    """
+    Yield the bytes of an Arrow IPC stream or Parquet file as each record batch is written
+    Arrow streams can be read back batch by batch; Parquet gets one row group per batch and
+    its footer at the end.
+    """
+    sink = ChunkSink()
+    if export_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch], schema=schema))
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    try:
+        for batch in batches:
+            if batch.num_rows:
+                write(batch)
+                yield sink.drain()
+    except Exception as e:
+        # Headers are already sent, so the best we can do is stop and log (the file is left truncated)
+        print(f"Error exporting rows: {e}")
+        return
+    writer.close()
+    yield sink.drain()
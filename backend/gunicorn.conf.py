@@ -0,0 +1,50 @@
+import gc
+import os
+
+# Gunicorn settings (picked up automatically when started from backend/: gunicorn app:app)
+#
+# The app is imported once in the master before forking (preload_app), so module imports,
+# the JSON provider and, with DATA_BACKEND=memory, the whole column store are built once
+# and shared copy-on-write by every worker. Each worker then opens its own connection
+# pool and warms its response cache (warmup.py); /api/ready says when it's done.
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no')
+
+
+def when_ready(server):
+    """Master, app loaded: drop any connections it opened and freeze what it built"""
+    from database import close_pool
+
+    # Loading the memory store from Postgres goes through the pool; workers must not inherit those sockets
+    close_pool()
+    # Objects created so far are never collected, so the collector doesn't touch (and copy) their pages in workers
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker, right after the fork: open its own pool"""
+    from database import get_pool
+
+    if os.getenv('DATA_BACKEND', 'postgres') != 'memory':
+        try:
+            get_pool()  # POOL_MIN_SIZE connections now, instead of on the first request
+        except Exception as e:
+            server.log.warning(f"Could not open the connection pool: {e}")
+
+
+def post_worker_init(worker):
+    """Worker, app loaded: warm its caches in the background"""
+    from app import app
+    from warmup import start_warmup
+
+    start_warmup(app)
+
+
+def worker_exit(server, worker):
+    from database import close_pool
+
+    close_pool()
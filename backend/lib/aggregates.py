@@ -0,0 +1,89 @@
+from psycopg2.extras import execute_values
+
+# Event counters shared by player_game_stats and team_game_stats
+COUNTER_COLUMNS = """
+    COUNT(*) as total_events,
+    SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
+    SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
+    SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as successful_passes,
+    SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END) as incomplete_passes,
+    SUM(CASE WHEN event = 'Faceoff Win' THEN 1 ELSE 0 END) as faceoff_wins,
+    SUM(CASE WHEN event = 'Puck Recovery' THEN 1 ELSE 0 END) as puck_recoveries,
+    SUM(CASE WHEN event = 'Takeaway' THEN 1 ELSE 0 END) as takeaways,
+    SUM(CASE WHEN event = 'Zone Entry' THEN 1 ELSE 0 END) as zone_entries,
+    SUM(CASE WHEN event = 'Dump In/Out' THEN 1 ELSE 0 END) as dump_ins_outs,
+    SUM(CASE WHEN event = 'Penalty Taken' THEN 1 ELSE 0 END) as penalties,
+
+    -- Score at the last event of the group (latest period, lowest clock)
+    (ARRAY_AGG(goals_for ORDER BY period DESC, clock_seconds ASC))[1] as score_for,
+    (ARRAY_AGG(goals_against ORDER BY period DESC, clock_seconds ASC))[1] as score_against
+"""
+
+PLAYER_GAME_STATS_INSERT = f"""
+    INSERT INTO player_game_stats
+    SELECT
+        player_name,
+        team_name,
+        game_date,
+        opp_team_name,
+        {COUNTER_COLUMNS}
+    FROM play_by_play p
+    WHERE player_name IS NOT NULL AND team_name IS NOT NULL AND opp_team_name IS NOT NULL
+    {{game_filter}}
+    GROUP BY player_name, team_name, game_date, opp_team_name
+"""
+
+TEAM_GAME_STATS_INSERT = f"""
+    INSERT INTO team_game_stats
+    SELECT
+        team_name,
+        game_date,
+        opp_team_name,
+        {COUNTER_COLUMNS}
+    FROM play_by_play p
+    WHERE team_name IS NOT NULL AND opp_team_name IS NOT NULL
+    {{game_filter}}
+    GROUP BY team_name, game_date, opp_team_name
+"""
+
+# Matches rows of table alias t against the (game_date, home_team, away_team) rows in refresh_games
+GAME_MATCH = """
+    EXISTS (
+        SELECT 1 FROM refresh_games g
+        WHERE {t}.game_date = g.game_date
+        AND (({t}.team_name = g.home_team AND {t}.opp_team_name = g.away_team)
+          OR ({t}.team_name = g.away_team AND {t}.opp_team_name = g.home_team))
+    )
+"""
+
+AGGREGATE_TABLES = {
+    'player_game_stats': PLAYER_GAME_STATS_INSERT,
+    'team_game_stats': TEAM_GAME_STATS_INSERT,
+}
+
+
+def refresh_aggregates(cur, games=None):
+    """
+    Rebuild the per-game summary tables inside the caller's transaction.
+    games is a list of (game_date, home_team, away_team); None rebuilds everything.
+    """
+    if games is None:
+        cur.execute(f"TRUNCATE {', '.join(AGGREGATE_TABLES)}")
+        for insert_query in AGGREGATE_TABLES.values():
+            cur.execute(insert_query.format(game_filter=""))
+        return
+
+    if not games:
+        return
+
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS refresh_games (
+            game_date DATE, home_team VARCHAR(100), away_team VARCHAR(100)
+        ) ON COMMIT DROP
+    """)
+    cur.execute("TRUNCATE refresh_games")
+    execute_values(cur, "INSERT INTO refresh_games VALUES %s", games)
+
+    for table, insert_query in AGGREGATE_TABLES.items():
+        cur.execute(f"DELETE FROM {table} s WHERE {GAME_MATCH.format(t='s')}")
+        cur.execute(insert_query.format(game_filter=f"AND {GAME_MATCH.format(t='p')}"))
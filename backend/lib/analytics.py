@@ -0,0 +1,45 @@
+import pandas as pd
+from psycopg2.extras import execute_values
+from chains import CHAIN_COLUMNS, POSSESSION_COLUMNS, SHOT_CHAIN_COLUMNS, build_chains
+
+# Ingest-time analytics: possessions and shot chains (see chains.py) for every loaded
+# game, so the possession and assist endpoints read precomputed rows.
+
+GAMES_PER_BATCH = 500  # games read, chained and written per pass
+
+CHAIN_EVENTS_QUERY = f"""
+    SELECT {', '.join(CHAIN_COLUMNS)}
+    FROM play_by_play
+    WHERE game_id = ANY(%s)
+    ORDER BY game_id, period, clock_seconds DESC, id
+"""
+
+
+def frame_tuples(frame, columns):
+    """Rows of frame as tuples of plain Python values (None for missing) for execute_values"""
+    values = frame[columns].astype(object).where(frame[columns].notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def refresh_chains(cur, game_ids=None):
+    """
+    Rebuild possessions and shot_chains inside the caller's transaction.
+    game_ids limits the rebuild to those games; None rebuilds everything.
+    """
+    if game_ids is None:
+        cur.execute("TRUNCATE possessions, shot_chains")
+        cur.execute("SELECT game_id FROM games ORDER BY game_id")
+        game_ids = [row[0] for row in cur.fetchall()]
+    else:
+        game_ids = sorted(set(game_ids))
+        cur.execute("DELETE FROM possessions WHERE game_id = ANY(%s)", (game_ids,))
+        cur.execute("DELETE FROM shot_chains WHERE game_id = ANY(%s)", (game_ids,))
+
+    for start in range(0, len(game_ids), GAMES_PER_BATCH):
+        cur.execute(CHAIN_EVENTS_QUERY, (game_ids[start:start + GAMES_PER_BATCH],))
+        events = pd.DataFrame(cur.fetchall(), columns=CHAIN_COLUMNS)
+        possessions, chains = build_chains(events)
+        execute_values(cur, f"INSERT INTO possessions ({', '.join(POSSESSION_COLUMNS)}) VALUES %s",
+                       frame_tuples(possessions, POSSESSION_COLUMNS), page_size=1000)
+        execute_values(cur, f"INSERT INTO shot_chains ({', '.join(SHOT_CHAIN_COLUMNS)}) VALUES %s",
+                       frame_tuples(chains, SHOT_CHAIN_COLUMNS), page_size=1000)
@@ -1,31 +1,351 @@
 -- Save this as: create_tables.sql
 
-CREATE TABLE IF NOT EXISTS play_by_play (
-    id SERIAL PRIMARY KEY,
+-- Dimension tables: every repeated string is stored once and referenced by a small integer key
+CREATE TABLE IF NOT EXISTS teams (
+    team_id SMALLSERIAL PRIMARY KEY,
+    team_name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS players (
+    player_id SERIAL PRIMARY KEY,
+    player_name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id SMALLSERIAL PRIMARY KEY,
+    event VARCHAR(50) NOT NULL UNIQUE
+);
+
+-- Low-cardinality text (venue, situation_type, event_type, event_detail_1..3) shares one dictionary
+CREATE TABLE IF NOT EXISTS labels (
+    label_id SMALLSERIAL PRIMARY KEY,
+    label VARCHAR(100) NOT NULL UNIQUE
+);
+
+-- One row per game, keyed from the home side. Built at ingest with the final score and
+-- the event range, so listing games never touches the event table.
+CREATE TABLE IF NOT EXISTS games (
+    game_id SERIAL PRIMARY KEY,
+    game_date DATE NOT NULL,
+    home_team_id SMALLINT NOT NULL REFERENCES teams(team_id),
+    away_team_id SMALLINT NOT NULL REFERENCES teams(team_id),
+    season_year SMALLINT,
+    home_goals SMALLINT,
+    away_goals SMALLINT,
+    periods SMALLINT,
+    event_count INTEGER,
+    first_event_id INTEGER,
+    last_event_id INTEGER,
+    UNIQUE (game_date, home_team_id, away_team_id)
+);
+
+-- Fact table. Columns are ordered widest first so rows pack without alignment padding.
+-- Partitioned by season (one LIST partition per season_year, named play_by_play_events_s<season>,
+-- see lib/partitions.py): a season is loaded by attaching a freshly built partition and retired
+-- by detaching it, and queries filtered on season_year only read that season's partition.
+-- Indexes below are created on every partition. A unique key would have to include season_year,
+-- so id has a plain index; it comes from one sequence and is unique across partitions anyway.
+-- A database created before partitioning needs play_by_play_events dropped (CASCADE, the view
+-- is recreated below) and a full reload.
+CREATE TABLE IF NOT EXISTS play_by_play_events (
+    id SERIAL,
     game_date DATE,
-    season_year INTEGER,
-    team_name VARCHAR(100),
+    game_id INTEGER REFERENCES games(game_id),
+    player_id INTEGER REFERENCES players(player_id),
+    player_2_id INTEGER REFERENCES players(player_id),
+    x_coord REAL,
+    y_coord REAL,
+    x_coord_2 REAL,
+    y_coord_2 REAL,
+    season_year SMALLINT,
+    team_id SMALLINT REFERENCES teams(team_id),
+    opp_team_id SMALLINT REFERENCES teams(team_id),
+    venue_id SMALLINT REFERENCES labels(label_id),
+    period SMALLINT,
+    clock_seconds SMALLINT,
+    situation_id SMALLINT REFERENCES labels(label_id),
+    goals_for SMALLINT,
+    goals_against SMALLINT,
+    event_id SMALLINT REFERENCES events(event_id),
+    event_type_id SMALLINT REFERENCES labels(label_id),
+    event_detail_1_id SMALLINT REFERENCES labels(label_id),
+    event_detail_2_id SMALLINT REFERENCES labels(label_id),
+    event_detail_3_id SMALLINT REFERENCES labels(label_id),
+    event_successful BOOLEAN
+) PARTITION BY LIST (season_year);
+
+-- Rows without a season (the loaders create a partition for every season they see)
+CREATE TABLE IF NOT EXISTS play_by_play_events_default PARTITION OF play_by_play_events DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_event_row_id ON play_by_play_events(id);
+CREATE INDEX IF NOT EXISTS idx_team_id ON play_by_play_events(team_id);
+CREATE INDEX IF NOT EXISTS idx_game_date ON play_by_play_events(game_date);
+CREATE INDEX IF NOT EXISTS idx_player_id ON play_by_play_events(player_id);
+-- A game's events in play order are one range read
+CREATE INDEX IF NOT EXISTS idx_game_events ON play_by_play_events(game_id, period, clock_seconds DESC, id);
+
+-- play_by_play keeps its original columns. Coordinates are REAL in storage and come back as float8
+-- through numeric (so 12.3 stays 12.3, not 12.300000190734863), which the driver and the JSON
+-- serializer take as plain floats. The trailing *_id columns let queries filter on keys.
+-- Unused LEFT JOINs on unique keys are removed by the planner, so narrow queries stay cheap.
+CREATE OR REPLACE VIEW play_by_play AS
+SELECT
+    e.id,
+    e.game_date,
+    e.season_year,
+    t.team_name,
+    o.team_name AS opp_team_name,
+    v.label AS venue,
+    e.period,
+    e.clock_seconds,
+    s.label AS situation_type,
+    e.goals_for,
+    e.goals_against,
+    p.player_name,
+    ev.event,
+    e.event_successful,
+    e.x_coord::numeric::float8 AS x_coord,
+    e.y_coord::numeric::float8 AS y_coord,
+    et.label AS event_type,
+    p2.player_name AS player_name_2,
+    e.x_coord_2::numeric::float8 AS x_coord_2,
+    e.y_coord_2::numeric::float8 AS y_coord_2,
+    d1.label AS event_detail_1,
+    d2.label AS event_detail_2,
+    d3.label AS event_detail_3,
+    e.team_id,
+    e.opp_team_id,
+    e.player_id,
+    e.player_2_id,
+    e.event_id,
+    e.game_id
+FROM play_by_play_events e
+LEFT JOIN teams t ON t.team_id = e.team_id
+LEFT JOIN teams o ON o.team_id = e.opp_team_id
+LEFT JOIN labels v ON v.label_id = e.venue_id
+LEFT JOIN labels s ON s.label_id = e.situation_id
+LEFT JOIN players p ON p.player_id = e.player_id
+LEFT JOIN events ev ON ev.event_id = e.event_id
+LEFT JOIN labels et ON et.label_id = e.event_type_id
+LEFT JOIN players p2 ON p2.player_id = e.player_2_id
+LEFT JOIN labels d1 ON d1.label_id = e.event_detail_1_id
+LEFT JOIN labels d2 ON d2.label_id = e.event_detail_2_id
+LEFT JOIN labels d3 ON d3.label_id = e.event_detail_3_id;
+
+-- One row per loaded game, used by incremental loads to skip unchanged games.
+-- Games are keyed from the home team's perspective, whichever team an event belongs to.
+CREATE TABLE IF NOT EXISTS ingested_games (
+    game_date DATE NOT NULL,
+    home_team VARCHAR(100) NOT NULL,
+    away_team VARCHAR(100) NOT NULL,
+    source_hash VARCHAR(40) NOT NULL,
+    row_count INTEGER NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (game_date, home_team, away_team)
+);
+
+
+-- Per player, per game totals built at ingest so the stats endpoints never rescan play_by_play.
+-- score_for/score_against are the score at the player's last event of the game.
+CREATE TABLE IF NOT EXISTS player_game_stats (
+    player_name VARCHAR(100) NOT NULL,
+    team_name VARCHAR(100) NOT NULL,
+    game_date DATE NOT NULL,
+    opp_team_name VARCHAR(100) NOT NULL,
+    total_events INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    successful_passes INTEGER NOT NULL,
+    incomplete_passes INTEGER NOT NULL,
+    faceoff_wins INTEGER NOT NULL,
+    puck_recoveries INTEGER NOT NULL,
+    takeaways INTEGER NOT NULL,
+    zone_entries INTEGER NOT NULL,
+    dump_ins_outs INTEGER NOT NULL,
+    penalties INTEGER NOT NULL,
+    score_for INTEGER,
+    score_against INTEGER,
+    PRIMARY KEY (player_name, team_name, game_date, opp_team_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_player_game_stats_team ON player_game_stats(team_name);
+
+-- Per team, per game totals (every event of the team, with or without a player).
+-- score_for/score_against are the score at the team's last event of the game.
+CREATE TABLE IF NOT EXISTS team_game_stats (
+    team_name VARCHAR(100) NOT NULL,
+    game_date DATE NOT NULL,
+    opp_team_name VARCHAR(100) NOT NULL,
+    total_events INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    successful_passes INTEGER NOT NULL,
+    incomplete_passes INTEGER NOT NULL,
+    faceoff_wins INTEGER NOT NULL,
+    puck_recoveries INTEGER NOT NULL,
+    takeaways INTEGER NOT NULL,
+    zone_entries INTEGER NOT NULL,
+    dump_ins_outs INTEGER NOT NULL,
+    penalties INTEGER NOT NULL,
+    score_for INTEGER,
+    score_against INTEGER,
+    PRIMARY KEY (team_name, game_date, opp_team_name)
+);
+
+
+-- Possessions and shot chains, rebuilt at ingest for every loaded game (lib/analytics.py,
+-- chains.py). A possession is a run of one team's consecutive events within a period
+-- (a faceoff starts a new one); rows go away with their game.
+CREATE TABLE IF NOT EXISTS possessions (
+    game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    possession_no INTEGER NOT NULL,
+    game_date DATE NOT NULL,
+    team_name VARCHAR(100) NOT NULL,
+    opp_team_name VARCHAR(100),
+    period SMALLINT NOT NULL,
+    start_clock SMALLINT NOT NULL,
+    end_clock SMALLINT NOT NULL,
+    duration SMALLINT NOT NULL,
+    event_count INTEGER NOT NULL,
+    passes INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    zone_entries INTEGER NOT NULL,
+    start_event VARCHAR(50),
+    end_event VARCHAR(50),
+    first_event_id INTEGER NOT NULL,
+    last_event_id INTEGER NOT NULL,
+    PRIMARY KEY (game_id, possession_no)
+);
+
+CREATE INDEX IF NOT EXISTS idx_possessions_team ON possessions(team_name, game_id);
+
+-- One row per shot: the completed passes that set it up (primary / secondary assist)
+-- and the zone entry that started the attack, all within the shot's possession.
+CREATE TABLE IF NOT EXISTS shot_chains (
+    shot_event_id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    possession_no INTEGER NOT NULL,
+    game_date DATE NOT NULL,
+    team_name VARCHAR(100) NOT NULL,
     opp_team_name VARCHAR(100),
-    venue VARCHAR(10),
-    period INTEGER,
-    clock_seconds INTEGER,
-    situation_type VARCHAR(20),
-    goals_for INTEGER,
-    goals_against INTEGER,
-    player_name VARCHAR(100),
-    event VARCHAR(50),
-    event_successful BOOLEAN,
-    x_coord NUMERIC,
-    y_coord NUMERIC,
-    event_type VARCHAR(50),
-    player_name_2 VARCHAR(100),
-    x_coord_2 NUMERIC,
-    y_coord_2 NUMERIC,
-    event_detail_1 VARCHAR(100),
-    event_detail_2 VARCHAR(100),
-    event_detail_3 VARCHAR(100)
-);
-
-CREATE INDEX idx_team_name ON play_by_play(team_name);
-CREATE INDEX idx_game_date ON play_by_play(game_date);
-CREATE INDEX idx_player_name ON play_by_play(player_name);
\ No newline at end of file
+    period SMALLINT NOT NULL,
+    clock_seconds SMALLINT NOT NULL,
+    shooter VARCHAR(100),
+    shot_type VARCHAR(100),
+    goal BOOLEAN NOT NULL,
+    primary_assist VARCHAR(100),
+    primary_pass_event_id INTEGER,
+    secondary_assist VARCHAR(100),
+    secondary_pass_event_id INTEGER,
+    zone_entry_player VARCHAR(100),
+    zone_entry_type VARCHAR(100),
+    zone_entry_event_id INTEGER,
+    seconds_from_entry SMALLINT,
+    seconds_into_possession SMALLINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_shot_chains_game ON shot_chains(game_id);
+CREATE INDEX IF NOT EXISTS idx_shot_chains_team ON shot_chains(team_name);
+CREATE INDEX IF NOT EXISTS idx_shot_chains_shooter ON shot_chains(shooter);
+CREATE INDEX IF NOT EXISTS idx_shot_chains_primary ON shot_chains(primary_assist);
+CREATE INDEX IF NOT EXISTS idx_shot_chains_secondary ON shot_chains(secondary_assist);
+
+-- Leaderboards (/api/leaderboards/<stat>): per player and team totals for every split, rebuilt
+-- at ingest (lib/leaderboards.py). split is 'all' (split_value ''), 'situation' (situation_type),
+-- 'strength' (even / power_play / short_handed, from the team's side of situation_type) or
+-- 'period'. Each ranked stat has an index in leaderboard order, so a page of any leaderboard is
+-- a short index range read however many events or players there are.
+CREATE TABLE IF NOT EXISTS player_split_stats (
+    player_name VARCHAR(100) NOT NULL,
+    team_name VARCHAR(100) NOT NULL,
+    split VARCHAR(20) NOT NULL,
+    split_value VARCHAR(100) NOT NULL,
+    games_played INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    shot_attempts INTEGER NOT NULL,
+    successful_passes INTEGER NOT NULL,
+    incomplete_passes INTEGER NOT NULL,
+    pass_completion_pct DOUBLE PRECISION,
+    takeaways INTEGER NOT NULL,
+    faceoff_wins INTEGER NOT NULL,
+    PRIMARY KEY (split, split_value, player_name, team_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_leaders_goals ON player_split_stats (split, split_value, goals DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_shots ON player_split_stats (split, split_value, shots DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_shot_attempts ON player_split_stats (split, split_value, shot_attempts DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_passes ON player_split_stats (split, split_value, successful_passes DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_pass_pct ON player_split_stats (split, split_value, pass_completion_pct DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_takeaways ON player_split_stats (split, split_value, takeaways DESC NULLS LAST, games_played, player_name);
+CREATE INDEX IF NOT EXISTS idx_leaders_faceoff_wins ON player_split_stats (split, split_value, faceoff_wins DESC NULLS LAST, games_played, player_name);
+
+-- Head-to-head matrix (/api/matchups, /api/teams/<team_name>/matchups): one row per team and
+-- opponent with the team's totals in those games, rebuilt at ingest (lib/matchups.py). Each pair
+-- has a row per direction, so both sides of a comparison are primary key lookups. Shot locations
+-- are in the shooting team's direction (net at x 189, y 42.5); the slot is the box from the top of
+-- the circles to the goal line between the faceoff dots.
+CREATE TABLE IF NOT EXISTS team_matchup_stats (
+    team_name VARCHAR(100) NOT NULL,
+    opp_team_name VARCHAR(100) NOT NULL,
+    games_played INTEGER NOT NULL,
+    total_events INTEGER NOT NULL,
+    goals INTEGER NOT NULL,
+    shots INTEGER NOT NULL,
+    shot_attempts INTEGER NOT NULL,
+    shooting_pct DOUBLE PRECISION,
+    successful_passes INTEGER NOT NULL,
+    incomplete_passes INTEGER NOT NULL,
+    pass_completion_pct DOUBLE PRECISION,
+    zone_entries INTEGER NOT NULL,
+    successful_zone_entries INTEGER NOT NULL,
+    faceoff_wins INTEGER NOT NULL,
+    takeaways INTEGER NOT NULL,
+    located_shot_attempts INTEGER NOT NULL,
+    avg_shot_x DOUBLE PRECISION,
+    avg_shot_y DOUBLE PRECISION,
+    avg_shot_distance DOUBLE PRECISION,
+    slot_shot_attempts INTEGER NOT NULL,
+    slot_goals INTEGER NOT NULL,
+    PRIMARY KEY (team_name, opp_team_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_team_matchup_stats_opp ON team_matchup_stats(opp_team_name, team_name);
+
+-- Search dictionary for /api/search: every player (as player_name or player_name_2) and team
+-- once, with its event count for ranking. Rebuilt at ingest (lib/search.py). search_key is the
+-- lowercased name; the trigram index serves substring and fuzzy matches, the pattern_ops index
+-- name prefixes.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS search_names (
+    kind VARCHAR(10) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    search_key VARCHAR(100) NOT NULL,
+    team_name VARCHAR(100),
+    event_count INTEGER NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_search_names_trgm ON search_names USING GIN (search_key gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_search_names_prefix ON search_names (search_key varchar_pattern_ops);
+
+-- Keyset pagination for /api/events: one index per filter, each matching the feed order
+-- (game_date DESC, period ASC, clock_seconds DESC, id ASC written as a single direction, with
+-- NULL keys COALESCE'd to sort last; the expressions are FEED_KEYS in queries.py).
+CREATE INDEX IF NOT EXISTS idx_events_feed ON play_by_play_events ((COALESCE(game_date, DATE '0001-01-01')) DESC, (-COALESCE(period, 32767)) DESC, (COALESCE(clock_seconds, -1)) DESC, (-id) DESC);
+CREATE INDEX IF NOT EXISTS idx_events_feed_team ON play_by_play_events (team_id, (COALESCE(game_date, DATE '0001-01-01')) DESC, (-COALESCE(period, 32767)) DESC, (COALESCE(clock_seconds, -1)) DESC, (-id) DESC);
+CREATE INDEX IF NOT EXISTS idx_events_feed_player ON play_by_play_events (player_id, (COALESCE(game_date, DATE '0001-01-01')) DESC, (-COALESCE(period, 32767)) DESC, (COALESCE(clock_seconds, -1)) DESC, (-id) DESC);
+CREATE INDEX IF NOT EXISTS idx_events_feed_event ON play_by_play_events (event_id, (COALESCE(game_date, DATE '0001-01-01')) DESC, (-COALESCE(period, 32767)) DESC, (COALESCE(clock_seconds, -1)) DESC, (-id) DESC);
+
+
+-- Single-row dataset version, bumped by the loader whenever play_by_play changes.
+-- The API includes it in response cache keys.
+CREATE TABLE IF NOT EXISTS dataset_meta (
+    id SMALLINT PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO dataset_meta (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,73 @@
+# Leaderboard splits (player_split_stats, see create_tables.sql): every player's totals
+# overall, per situation_type, per strength and per period, in one GROUPING SETS pass over
+# play_by_play after every load. Shots are unsuccessful shots as everywhere else in the
+# API; shot_attempts counts goals too.
+
+# Team's side of a situation_type like '5 on 4'
+STRENGTH = """
+    CASE
+        WHEN situation_type !~ '^[0-9]+ on [0-9]+$' THEN NULL
+        WHEN split_part(situation_type, ' on ', 1)::int > split_part(situation_type, ' on ', 2)::int THEN 'power_play'
+        WHEN split_part(situation_type, ' on ', 1)::int < split_part(situation_type, ' on ', 2)::int THEN 'short_handed'
+        ELSE 'even'
+    END
+"""
+
+LEADERBOARDS_INSERT = f"""
+    INSERT INTO player_split_stats (
+        player_name, team_name, split, split_value, games_played, goals, shots, shot_attempts,
+        successful_passes, incomplete_passes, pass_completion_pct, takeaways, faceoff_wins
+    )
+    SELECT
+        player_name, team_name, split, split_value, games_played, goals, shots, shot_attempts,
+        successful_passes, incomplete_passes,
+        CASE
+            WHEN (successful_passes + incomplete_passes) > 0
+            THEN (successful_passes::float / (successful_passes + incomplete_passes)) * 100
+        END,
+        takeaways, faceoff_wins
+    FROM (
+        SELECT
+            player_name,
+            team_name,
+            CASE
+                WHEN GROUPING(situation_type) = 0 THEN 'situation'
+                WHEN GROUPING(strength) = 0 THEN 'strength'
+                WHEN GROUPING(period) = 0 THEN 'period'
+                ELSE 'all'
+            END as split,
+            CASE
+                WHEN GROUPING(situation_type) = 0 THEN situation_type
+                WHEN GROUPING(strength) = 0 THEN strength
+                WHEN GROUPING(period) = 0 THEN period::text
+                ELSE ''
+            END as split_value,
+            COUNT(DISTINCT game_id) as games_played,
+            SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
+            SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
+            SUM(CASE WHEN event = 'Shot' THEN 1 ELSE 0 END) as shot_attempts,
+            SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as successful_passes,
+            SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END) as incomplete_passes,
+            SUM(CASE WHEN event = 'Takeaway' THEN 1 ELSE 0 END) as takeaways,
+            SUM(CASE WHEN event = 'Faceoff Win' THEN 1 ELSE 0 END) as faceoff_wins
+        FROM (
+            SELECT player_name, team_name, game_id, period, situation_type, event, event_successful,
+                   {STRENGTH} as strength
+            FROM play_by_play
+            WHERE player_name IS NOT NULL AND team_name IS NOT NULL
+        ) e
+        GROUP BY GROUPING SETS (
+            (player_name, team_name),
+            (player_name, team_name, situation_type),
+            (player_name, team_name, strength),
+            (player_name, team_name, period)
+        )
+    ) totals
+    -- Groups of events without a situation, strength or period
+    WHERE split_value IS NOT NULL
+"""
+
+def refresh_leaderboards(cur):
+    """Rebuild player_split_stats inside the caller's transaction"""
+    cur.execute("TRUNCATE player_split_stats")
+    cur.execute(LEADERBOARDS_INSERT)
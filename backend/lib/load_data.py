@@ -1,53 +1,359 @@
 import pandas as pd
 import psycopg2
-from database import get_db_connection
+from psycopg2.extras import execute_values
+from database import get_db_connection, POOL_MAX_SIZE
+from aggregates import refresh_aggregates
+from analytics import refresh_chains
+from leaderboards import refresh_leaderboards
+from matchups import refresh_matchups
+from search import refresh_search_names
+from normalize import copy_events, encode_rows, insert_events, prune_games, refresh_game_summaries
+from partitions import attached_partitions, build_partition, detach_partition, ensure_partitions, staged_seasons, swap_partition
+from csv_schema import COLUMNS, CSV_READ_OPTIONS, coerce_chunk
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import io
 import os
+import time
 
-def load_csv_to_db(csv_path):
-    """Load CSV data into PostgreSQL database"""
-    print(f"Reading CSV from {csv_path}...")
-    df = pd.read_csv(csv_path)
-    
-    # Convert 't'/'f' to boolean
-    df['event_successful'] = df['event_successful'].map({'t': True, 'f': False})
-    
-    # Convert game_date to proper date format
-    df['game_date'] = pd.to_datetime(df['game_date'], dayfirst=True)
-    
-    # Replace empty strings with None for numeric columns
-    numeric_cols = ['x_coord', 'y_coord', 'x_coord_2', 'y_coord_2']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    print(f"Connecting to database...")
-    
-    # FIX: Use context manager properly
+# Rows parsed, coerced and streamed per COPY (bounds memory for huge CSVs)
+CHUNK_SIZE = 50000
+
+# A game is (game_date, team_name, opp_team_name) seen from the home team's side
+GAME_KEY = ['game_date', 'home_team', 'away_team']
+
+
+def game_keys(df):
+    """Home-perspective game key for every row of a coerced chunk"""
+    is_home = df['venue'] == 'home'
+    return pd.DataFrame({
+        'game_date': df['game_date'].dt.date,
+        'home_team': df['team_name'].where(is_home, df['opp_team_name']),
+        'away_team': df['opp_team_name'].where(is_home, df['team_name']),
+    }, index=df.index)
+
+
+def game_fingerprints(keys, row_hashes):
+    """
+    Per-game (hash, row count) for one chunk.
+    Row hashes are split into two 32-bit halves and summed so chunks (and row
+    order within a game) can be combined without caring about overflow.
+    """
+    frame = keys.copy()
+    frame['hash_hi'] = (row_hashes.values >> 32).astype('int64')
+    frame['hash_lo'] = (row_hashes.values & 0xFFFFFFFF).astype('int64')
+    frame['row_count'] = 1
+    return frame.groupby(GAME_KEY, sort=False)[['hash_hi', 'hash_lo', 'row_count']].sum()
+
+
+def combine_fingerprints(parts):
+    """Merge per-chunk fingerprints into one row per game with a source_hash string"""
+    if not parts:
+        return pd.DataFrame(columns=['source_hash', 'row_count'])
+    combined = pd.concat(parts).groupby(level=GAME_KEY, sort=False).sum()
+    combined['source_hash'] = [f"{hi:x}-{lo:x}" for hi, lo in zip(combined['hash_hi'], combined['hash_lo'])]
+    return combined[['source_hash', 'row_count']]
+
+
+def read_csv_chunks(csv_path, chunksize=CHUNK_SIZE):
+    """Yield (coerced DataFrame, game keys, per-game fingerprints) for chunks of at most chunksize rows"""
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, **CSV_READ_OPTIONS):
+        # Hash the raw source text so fingerprints don't depend on type inference
+        row_hashes = pd.util.hash_pandas_object(chunk[COLUMNS], index=False)
+        df = coerce_chunk(chunk)
+        keys = game_keys(df)
+        yield df, keys, game_fingerprints(keys, row_hashes)
+
+
+def copy_frame(cur, df, table):
+    """Stream a coerced DataFrame into table with COPY ... FROM STDIN"""
+    buf = io.StringIO()
+    # Empty unquoted fields are NULL in COPY's csv format
+    df.to_csv(buf, index=False, header=False, date_format='%Y-%m-%d', float_format='%.10g')
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def load_file_to_staging(csv_path, staging_table):
+    """Load one CSV into its own UNLOGGED staging table, returns (row count, game fingerprints)"""
+    start = time.perf_counter()
+    rows = 0
+    fingerprints = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            cur.execute(f"CREATE UNLOGGED TABLE {staging_table} AS SELECT {', '.join(COLUMNS)} FROM play_by_play WITH NO DATA")
+
+            for chunk, _, chunk_fingerprints in read_csv_chunks(csv_path):
+                copy_frame(cur, chunk, staging_table)
+                fingerprints.append(chunk_fingerprints)
+                rows += len(chunk)
+                print(f"  {os.path.basename(csv_path)}: copied {rows} rows...")
+
+        conn.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Staged {rows} rows from {csv_path} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows, fingerprints
+
+
+# source_hash of a game whose rows are swapped in but whose aggregates aren't rebuilt yet:
+# it never matches a file, so if the rebuild fails --incremental deletes and reloads the game
+PENDING_HASH = 'pending'
+
+
+def record_ingested_games(cur, fingerprints, pending=False):
+    """Upsert the fingerprint of every game just written to play_by_play (PENDING_HASH until its aggregates are rebuilt)"""
+    rows = [(*key, PENDING_HASH if pending else row.source_hash, int(row.row_count)) for key, row in fingerprints.iterrows()]
+    execute_values(cur, """
+        INSERT INTO ingested_games (game_date, home_team, away_team, source_hash, row_count)
+        VALUES %s
+        ON CONFLICT (game_date, home_team, away_team) DO UPDATE
+        SET source_hash = EXCLUDED.source_hash, row_count = EXCLUDED.row_count, loaded_at = now()
+    """, rows)
+
+
+def bump_dataset_version(cur):
+    """Tell API workers that cached responses are stale"""
+    cur.execute("UPDATE dataset_meta SET version = version + 1, updated_at = now() WHERE id = 1")
+
+
+def season_game_keys(cur, seasons):
+    """(game_date, home_team, away_team) of every game in seasons"""
+    cur.execute("""
+        SELECT g.game_date, h.team_name, a.team_name FROM games g
+        JOIN teams h ON h.team_id = g.home_team_id
+        JOIN teams a ON a.team_id = g.away_team_id
+        WHERE g.season_year = ANY(%s)
+    """, (list(seasons),))
+    return [tuple(row) for row in cur.fetchall()]
+
+
+def forget_games(cur, games):
+    """Remove the fingerprints of games that were unloaded"""
+    if games:
+        execute_values(cur, """
+            DELETE FROM ingested_games i
+            USING (VALUES %s) AS v(game_date, home_team, away_team)
+            WHERE i.game_date = v.game_date AND i.home_team = v.home_team AND i.away_team = v.away_team
+        """, games)
+
+
+def refresh_derived(cur):
+    """Rebuild the cross-game tables and tell API workers the data changed"""
+    refresh_leaderboards(cur)
+    refresh_matchups(cur)
+    refresh_search_names(cur)
+    bump_dataset_version(cur)
+
+
+def swap_in_staging(staging_tables, fingerprints, seasons_only=False):
+    """
+    Swap the staged rows into play_by_play, one season partition at a time, then refresh.
+    Every season's partition is built and indexed, and its games' scores computed from it,
+    before anything is detached; the DETACH / ATTACH (ACCESS EXCLUSIVE) then commits in its
+    own short transaction, so readers only wait for the swap itself. From that commit the
+    events and games are new; the per-game and cross-game tables are rebuilt in a second
+    transaction and until it commits (and in the response caches, keyed by dataset version)
+    still describe the old data. The swapped games are fingerprinted as pending until then,
+    so if the rebuild fails --incremental reloads them.
+    seasons_only replaces just the seasons in the staged files and keeps the others
+    (rows without a season are only loaded by a full load).
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            game_ids = []
+            for staging_table in staging_tables:
+                game_ids += encode_rows(cur, staging_table)
+            seasons = staged_seasons(cur, staging_tables)
+            built = [(season, *build_partition(cur, staging_tables, season)) for season in seasons]
+            # New games get their scores before they become visible
+            refresh_game_summaries(cur, game_ids, tables=[table for _, table, _ in built])
+
+            # The swap: DETACH / ATTACH and the TRUNCATE lock play_by_play until this commits
+            if seasons_only:
+                # Games of the replaced seasons lose their fingerprints and aggregates too
+                replaced_games = season_game_keys(cur, seasons)
+                forget_games(cur, replaced_games)
+            else:
+                for season in attached_partitions(cur):
+                    if season not in seasons:
+                        detach_partition(cur, season, drop=True)
+                cur.execute("TRUNCATE play_by_play_events_default, ingested_games")
+                for staging_table in staging_tables:
+                    copy_events(cur, staging_table, where="s.season_year IS NULL")
+
+            for season, table, indexes in built:
+                swap_partition(cur, season, table, indexes)
+            record_ingested_games(cur, fingerprints, pending=True)
+            for staging_table in staging_tables:
+                cur.execute(f"DROP TABLE {staging_table}")
+            conn.commit()
+
+            # Derived tables are rebuilt from the new partitions without blocking readers
+            refresh_game_summaries(cur, game_ids)  # games whose rows have no season
+            prune_games(cur)
+            if seasons_only:
+                refresh_aggregates(cur, replaced_games + list(fingerprints.index))
+                refresh_chains(cur, game_ids)
+            else:
+                refresh_aggregates(cur)
+                refresh_chains(cur)
+            refresh_derived(cur)
+            record_ingested_games(cur, fingerprints)
+        conn.commit()
+
+
+def retire_season(season, drop=False):
+    """
+    Detach a season's partition and remove its games, fingerprints and per-game aggregates
+    (possessions and shot chains go with their games). The detached table is kept as play_by_play_events_s<season>_detached unless drop is set.
+    The detach is committed on its own so readers aren't blocked while the rest is removed; until
+    that commits the season's games, fingerprints and aggregates are still listed. Running it again
+    after a failure finishes the cleanup.
+    """
     with get_db_connection() as conn:
-        cur = conn.cursor()
-        
-        print(f"Inserting {len(df)} rows...")
-        
-        # Insert data row by row
-        insert_query = """
-            INSERT INTO play_by_play (
-                game_date, season_year, team_name, opp_team_name, venue,
-                period, clock_seconds, situation_type, goals_for, goals_against,
-                player_name, event, event_successful, x_coord, y_coord,
-                event_type, player_name_2, x_coord_2, y_coord_2,
-                event_detail_1, event_detail_2, event_detail_3
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        for idx, row in df.iterrows():
-            cur.execute(insert_query, tuple(row))
-            if (idx + 1) % 1000 == 0:
-                print(f"Inserted {idx + 1} rows...")
-        
+        with conn.cursor() as cur:
+            games = season_game_keys(cur, [season])
+            detached = None
+            if season in attached_partitions(cur):
+                detached = detach_partition(cur, season, drop=drop)
+                conn.commit()
+            else:
+                print(f"Season {season} is already detached, removing what's left of it")
+
+            forget_games(cur, games)
+            refresh_aggregates(cur, games)
+            prune_games(cur)
+            refresh_derived(cur)
         conn.commit()
-        cur.close()
-    
-    print(f"✓ Successfully loaded {len(df)} rows into database!")
+
+    print(f"✓ Retired season {season} ({len(games)} games)" + (f", rows kept in {detached}" if detached else ""))
+    return len(games)
+
+
+def drop_staging(staging_tables):
+    """Clean up staging tables after a failed load"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for staging_table in staging_tables:
+                cur.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        conn.commit()
+
+
+def load_csv_to_db(csv_paths, workers=4, seasons_only=False):
+    """
+    Load one or more CSV files into PostgreSQL, replacing everything already there
+    (or, with seasons_only, just the seasons the files contain).
+    Files are COPY'd in parallel into staging tables, then swapped in atomically.
+    """
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+
+    workers = max(1, min(workers, len(csv_paths), POOL_MAX_SIZE))
+    staging_tables = [f"play_by_play_staging_{os.getpid()}_{i}" for i in range(len(csv_paths))]
+
+    print(f"Loading {len(csv_paths)} file(s) with {workers} worker(s)...")
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(load_file_to_staging, csv_paths, staging_tables))
+
+        row_counts = [rows for rows, _ in results]
+        fingerprints = combine_fingerprints([part for _, parts in results for part in parts])
+
+        print("Swapping staged rows into play_by_play...")
+        swap_in_staging(staging_tables, fingerprints, seasons_only=seasons_only)
+    except (psycopg2.Error, OSError, ValueError) as e:
+        print(f"Error loading data: {e}")
+        drop_staging(staging_tables)
+        raise
+
+    total = sum(row_counts)
+    elapsed = time.perf_counter() - start
+    print(f"✓ Successfully loaded {total} rows into database in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return total
+
+def ingest_incremental(csv_paths):
+    """
+    Load only the games that are new or whose source rows changed.
+    Unchanged games are skipped; changed games are deleted and reloaded in the
+    same transaction as the new ones, so running this twice is a no-op.
+    """
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+
+    start = time.perf_counter()
+
+    # Pass 1: fingerprint every game in the source files (no database work)
+    fingerprints = combine_fingerprints([
+        part for csv_path in csv_paths for _, _, part in read_csv_chunks(csv_path)
+    ])
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT game_date, home_team, away_team, source_hash, row_count FROM ingested_games")
+            existing = {(d, h, a): (source_hash, row_count) for d, h, a, source_hash, row_count in cur.fetchall()}
+
+            new_games, changed_games = [], []
+            for key, row in fingerprints.iterrows():
+                if key not in existing:
+                    new_games.append(key)
+                elif existing[key] != (row.source_hash, row.row_count):
+                    changed_games.append(key)
+
+            skipped = len(fingerprints) - len(new_games) - len(changed_games)
+            print(f"{len(new_games)} new, {len(changed_games)} changed, {skipped} unchanged game(s)")
+            if not new_games and not changed_games:
+                return 0
+
+            # Pass 2: COPY just the rows of games we need into a temp table
+            to_load = pd.MultiIndex.from_tuples(new_games + changed_games, names=GAME_KEY)
+            cur.execute(f"CREATE TEMP TABLE incoming_rows ON COMMIT DROP AS SELECT {', '.join(COLUMNS)} FROM play_by_play WITH NO DATA")
+            rows = 0
+            for csv_path in csv_paths:
+                for chunk, keys, _ in read_csv_chunks(csv_path):
+                    mask = pd.MultiIndex.from_frame(keys).isin(to_load)
+                    if mask.any():
+                        copy_frame(cur, chunk[mask], "incoming_rows")
+                        rows += int(mask.sum())
+
+            if changed_games:
+                execute_values(cur, """
+                    DELETE FROM play_by_play_events p
+                    USING (VALUES %s) AS v(game_date, home_team, away_team)
+                    JOIN teams h ON h.team_name = v.home_team
+                    JOIN teams a ON a.team_name = v.away_team
+                    JOIN games g ON g.game_date = v.game_date AND g.home_team_id = h.team_id AND g.away_team_id = a.team_id
+                    WHERE p.game_id = g.game_id
+                """, changed_games)
+
+            ensure_partitions(cur, "incoming_rows")
+            game_ids = insert_events(cur, "incoming_rows")
+            record_ingested_games(cur, fingerprints.loc[to_load])
+            refresh_aggregates(cur, new_games + changed_games)
+            refresh_chains(cur, game_ids)
+            refresh_derived(cur)
+        conn.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Loaded {rows} rows for {len(to_load)} game(s) in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows
 
 if __name__ == "__main__":
-    csv_path = "../notes/pxp_womens_oly_2022_v2.csv"
-    load_csv_to_db(csv_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load play-by-play CSV files into PostgreSQL")
+    parser.add_argument('csv_paths', nargs='*', default=["../notes/pxp_womens_oly_2022_v2.csv"])
+    parser.add_argument('--incremental', action='store_true', help="only load new or changed games")
+    parser.add_argument('--workers', type=int, default=4, help="files loaded in parallel")
+    parser.add_argument('--seasons', action='store_true', help="only replace the seasons found in the files")
+    parser.add_argument('--retire-season', type=int, help="detach this season's partition instead of loading")
+    parser.add_argument('--drop', action='store_true', help="with --retire-season, drop the detached partition")
+    args = parser.parse_args()
+
+    if args.retire_season is not None:
+        retire_season(args.retire_season, drop=args.drop)
+    elif args.incremental:
+        ingest_incremental(args.csv_paths)
+    else:
+        load_csv_to_db(args.csv_paths, workers=args.workers, seasons_only=args.seasons)
@@ -0,0 +1,94 @@
+import pandas as pd
+from tracking import build_game, write_game, TRACKING_DIR
+import argparse
+import os
+import time
+
+# Tracking ingest: broadcast tracking CSVs for one game (one file per video clip, e.g. each
+# power play of the Big Data Cup tracking set) into the memory-mapped columns of tracking.py.
+# Frames need the game clock they were shot at (clock_seconds, or game_clock as mm:ss, as
+# in the output of the tracking / play-by-play join); rows without a team are the puck.
+
+# Source column -> tracking.py column (anything not listed keeps its name)
+COLUMN_ALIASES = {'frame_id': 'source_frame_id', 'x_ft': 'x', 'y_ft': 'y', 'team': 'team_name'}
+REQUIRED_COLUMNS = ['source_frame_id', 'period', 'track_id', 'x', 'y']
+
+EVENTS_QUERY = """
+    SELECT id, period, clock_seconds FROM play_by_play
+    WHERE game_id = %s AND period IS NOT NULL AND clock_seconds IS NOT NULL
+"""
+
+
+def clock_to_seconds(clock):
+    """'mm:ss' (or 'mm:ss.f') to seconds remaining in the period"""
+    parts = clock.str.partition(':')
+    return pd.to_numeric(parts[0], errors='coerce') * 60 + pd.to_numeric(parts[2], errors='coerce')
+
+
+def read_clip(csv_path, clip):
+    """One clip's rows with tracking.py's column names, typed"""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, na_values=[''])
+    df = df.rename(columns={c: COLUMN_ALIASES.get(c.strip().lower(), c.strip().lower()) for c in df.columns})
+    if 'clock_seconds' not in df and 'game_clock' in df:
+        df['clock_seconds'] = clock_to_seconds(df['game_clock'])
+    missing = [c for c in REQUIRED_COLUMNS + ['clock_seconds'] if c not in df]
+    if missing:
+        raise ValueError(f"{csv_path} has no {', '.join(missing)} column(s)")
+
+    for column in ('source_frame_id', 'period', 'track_id', 'jersey_number'):
+        df[column] = pd.to_numeric(df[column], errors='coerce') if column in df else None
+    for column in ('clock_seconds', 'x', 'y'):
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    if 'team_name' not in df:
+        df['team_name'] = None
+    df['clip'] = clip
+
+    # A position needs its frame, time and location
+    df = df.dropna(subset=['source_frame_id', 'period', 'clock_seconds', 'track_id', 'x', 'y'])
+    return df[['clip', 'source_frame_id', 'period', 'clock_seconds', 'track_id', 'team_name', 'jersey_number', 'x', 'y']]
+
+
+def game_events(game_id, pbp_csv=None):
+    """The game's (id, period, clock_seconds) from Postgres, or numbered like DATA_BACKEND=memory from a CSV"""
+    if pbp_csv:
+        from columnar import ColumnStore
+
+        store = ColumnStore.from_csv(pbp_csv)
+        idx = (store.game_ids == game_id).nonzero()[0]
+        return pd.DataFrame(store.rows(idx, ['id', 'period', 'clock_seconds'])).dropna()
+
+    from database import get_db_connection
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(EVENTS_QUERY, (game_id,))
+            return pd.DataFrame(cur.fetchall(), columns=['id', 'period', 'clock_seconds'])
+
+
+def load_tracking(game_id, csv_paths, pbp_csv=None):
+    """Build and write one game's tracking columns from its clip CSVs, returns the written meta"""
+    start = time.perf_counter()
+    positions = pd.concat([read_clip(path, clip) for clip, path in enumerate(csv_paths)], ignore_index=True)
+    if positions.empty:
+        raise ValueError("no tracking rows with a frame, period, clock and location")
+    events = game_events(game_id, pbp_csv)
+    if events.empty:
+        raise ValueError(f"game {game_id} has no play-by-play events to link frames to")
+
+    teams, frames, frame_rows, rows, event_columns = build_game(positions, events)
+    meta = write_game(game_id, teams, frames, frame_rows, rows, event_columns, sources=csv_paths)
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Wrote {meta['frame_count']} frames ({meta['row_count']} positions) for game {game_id} "
+          f"to {os.path.join(TRACKING_DIR, str(game_id))} in {elapsed:.2f}s")
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load broadcast tracking CSVs for one game into memory-mapped columns")
+    parser.add_argument('csv_paths', nargs='+', help="tracking CSVs of the game, one per video clip")
+    parser.add_argument('--game-id', type=int, required=True, help="games.game_id the frames belong to")
+    parser.add_argument('--pbp-csv', help="link frames to this play-by-play CSV instead of Postgres (memory backend)")
+    args = parser.parse_args()
+
+    load_tracking(args.game_id, args.csv_paths, pbp_csv=args.pbp_csv)
@@ -0,0 +1,62 @@
+from queries import MATCHUP_COLUMNS, NET_X, NET_Y, SLOT
+
+# Head-to-head matrix (team_matchup_stats, see create_tables.sql): every team's totals
+# against every opponent, in one GROUP BY pass over play_by_play after every load. Shots
+# are unsuccessful shots as everywhere else in the API; shot_attempts counts goals too.
+# Shot averages are rounded to 2 decimals so the memory backend can match them exactly.
+
+SLOT_X_MIN, SLOT_X_MAX, SLOT_Y_MIN, SLOT_Y_MAX = SLOT
+
+MATCHUPS_INSERT = f"""
+    INSERT INTO team_matchup_stats ({', '.join(MATCHUP_COLUMNS)})
+    SELECT
+        team_name, opp_team_name, games_played, total_events, goals, shots, shot_attempts,
+        CASE WHEN shot_attempts > 0 THEN (goals::float / shot_attempts) * 100 END,
+        successful_passes, incomplete_passes,
+        CASE
+            WHEN (successful_passes + incomplete_passes) > 0
+            THEN (successful_passes::float / (successful_passes + incomplete_passes)) * 100
+        END,
+        zone_entries, successful_zone_entries, faceoff_wins, takeaways,
+        located_shot_attempts, avg_shot_x, avg_shot_y, avg_shot_distance, slot_shot_attempts, slot_goals
+    FROM (
+        SELECT
+            team_name,
+            opp_team_name,
+            COUNT(DISTINCT game_id) as games_played,
+            COUNT(*) as total_events,
+            SUM(CASE WHEN event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as goals,
+            SUM(CASE WHEN event = 'Shot' AND event_successful = false THEN 1 ELSE 0 END) as shots,
+            SUM(CASE WHEN event = 'Shot' THEN 1 ELSE 0 END) as shot_attempts,
+            SUM(CASE WHEN event = 'Play' AND event_successful = true THEN 1 ELSE 0 END) as successful_passes,
+            SUM(CASE WHEN event = 'Play' AND event_successful = false THEN 1 ELSE 0 END) as incomplete_passes,
+            SUM(CASE WHEN event = 'Zone Entry' THEN 1 ELSE 0 END) as zone_entries,
+            SUM(CASE WHEN event = 'Zone Entry' AND event_successful = true THEN 1 ELSE 0 END) as successful_zone_entries,
+            SUM(CASE WHEN event = 'Faceoff Win' THEN 1 ELSE 0 END) as faceoff_wins,
+            SUM(CASE WHEN event = 'Takeaway' THEN 1 ELSE 0 END) as takeaways,
+
+            -- Shot locations (attempts with coordinates only)
+            COUNT(shot_x) as located_shot_attempts,
+            ROUND(AVG(shot_x)::numeric, 2)::float as avg_shot_x,
+            ROUND(AVG(shot_y)::numeric, 2)::float as avg_shot_y,
+            ROUND(AVG(SQRT(({NET_X} - shot_x) ^ 2 + ({NET_Y} - shot_y) ^ 2))::numeric, 2)::float as avg_shot_distance,
+            SUM(CASE WHEN slot THEN 1 ELSE 0 END) as slot_shot_attempts,
+            SUM(CASE WHEN slot AND event_successful = true THEN 1 ELSE 0 END) as slot_goals
+        FROM (
+            SELECT team_name, opp_team_name, game_id, event, event_successful,
+                   CASE WHEN event = 'Shot' AND y_coord IS NOT NULL THEN x_coord::float END as shot_x,
+                   CASE WHEN event = 'Shot' AND x_coord IS NOT NULL THEN y_coord::float END as shot_y,
+                   event = 'Shot'
+                       AND x_coord BETWEEN {SLOT_X_MIN} AND {SLOT_X_MAX}
+                       AND y_coord BETWEEN {SLOT_Y_MIN} AND {SLOT_Y_MAX} as slot
+            FROM play_by_play
+            WHERE team_name IS NOT NULL AND opp_team_name IS NOT NULL
+        ) e
+        GROUP BY team_name, opp_team_name
+    ) totals
+"""
+
+def refresh_matchups(cur):
+    """Rebuild team_matchup_stats inside the caller's transaction"""
+    cur.execute("TRUNCATE team_matchup_stats")
+    cur.execute(MATCHUPS_INSERT)
@@ -0,0 +1,167 @@
+# Dictionary encoding for play_by_play: staged text rows are split into the
+# teams / players / events / labels dimensions, the games table and compact
+# play_by_play_events rows.
+
+# (dimension table, key column, value column) -> source columns that feed it
+DIMENSIONS = [
+    ('teams', 'team_id', 'team_name', ['team_name', 'opp_team_name']),
+    ('players', 'player_id', 'player_name', ['player_name', 'player_name_2']),
+    ('events', 'event_id', 'event', ['event']),
+    ('labels', 'label_id', 'label', ['venue', 'situation_type', 'event_type',
+                                     'event_detail_1', 'event_detail_2', 'event_detail_3']),
+]
+
+# play_by_play_events column -> expression over the staged row (s) and its dimension joins
+FACT_COLUMNS = [
+    ('game_date', 's.game_date'),
+    ('game_id', 'g.game_id'),
+    ('player_id', 'p.player_id'),
+    ('player_2_id', 'p2.player_id'),
+    ('x_coord', 's.x_coord'),
+    ('y_coord', 's.y_coord'),
+    ('x_coord_2', 's.x_coord_2'),
+    ('y_coord_2', 's.y_coord_2'),
+    ('season_year', 's.season_year'),
+    ('team_id', 't.team_id'),
+    ('opp_team_id', 'o.team_id'),
+    ('venue_id', 'v.label_id'),
+    ('period', 's.period'),
+    ('clock_seconds', 's.clock_seconds'),
+    ('situation_id', 'st.label_id'),
+    ('goals_for', 's.goals_for'),
+    ('goals_against', 's.goals_against'),
+    ('event_id', 'ev.event_id'),
+    ('event_type_id', 'et.label_id'),
+    ('event_detail_1_id', 'd1.label_id'),
+    ('event_detail_2_id', 'd2.label_id'),
+    ('event_detail_3_id', 'd3.label_id'),
+    ('event_successful', 's.event_successful'),
+]
+
+FACT_JOINS = """
+    LEFT JOIN teams t ON t.team_name = s.team_name
+    LEFT JOIN teams o ON o.team_name = s.opp_team_name
+    LEFT JOIN labels v ON v.label = s.venue
+    LEFT JOIN labels st ON st.label = s.situation_type
+    LEFT JOIN players p ON p.player_name = s.player_name
+    LEFT JOIN events ev ON ev.event = s.event
+    LEFT JOIN labels et ON et.label = s.event_type
+    LEFT JOIN players p2 ON p2.player_name = s.player_name_2
+    LEFT JOIN labels d1 ON d1.label = s.event_detail_1
+    LEFT JOIN labels d2 ON d2.label = s.event_detail_2
+    LEFT JOIN labels d3 ON d3.label = s.event_detail_3
+    LEFT JOIN games g ON g.game_date = s.game_date
+        AND g.home_team_id = CASE WHEN s.venue = 'home' THEN t.team_id ELSE o.team_id END
+        AND g.away_team_id = CASE WHEN s.venue = 'home' THEN o.team_id ELSE t.team_id END
+"""
+
+# Home-perspective team names of a staged row, like load_data.game_keys
+HOME_TEAM = "CASE WHEN s.venue = 'home' THEN s.team_name ELSE s.opp_team_name END"
+AWAY_TEAM = "CASE WHEN s.venue = 'home' THEN s.opp_team_name ELSE s.team_name END"
+
+# Final score (from the home side's last event, as /api/games always reported it),
+# period count and event range of each game
+GAME_SUMMARY_UPDATE = """
+    UPDATE games g SET
+        season_year = s.season_year,
+        home_goals = s.home_goals,
+        away_goals = s.away_goals,
+        periods = s.periods,
+        event_count = s.event_count,
+        first_event_id = s.first_event_id,
+        last_event_id = s.last_event_id
+    FROM (
+        SELECT
+            e.game_id,
+            MIN(e.season_year) AS season_year,
+            (ARRAY_AGG(e.goals_for ORDER BY e.period DESC, e.clock_seconds ASC) FILTER (WHERE e.team_id = gm.home_team_id))[1] AS home_goals,
+            (ARRAY_AGG(e.goals_against ORDER BY e.period DESC, e.clock_seconds ASC) FILTER (WHERE e.team_id = gm.home_team_id))[1] AS away_goals,
+            MAX(e.period) AS periods,
+            COUNT(*) AS event_count,
+            MIN(e.id) AS first_event_id,
+            MAX(e.id) AS last_event_id
+        FROM {events} e
+        JOIN games gm ON gm.game_id = e.game_id
+        WHERE e.game_id = ANY(%s)
+        GROUP BY e.game_id
+    ) s
+    WHERE g.game_id = s.game_id
+"""
+
+
+def upsert_dimensions(cur, source_table):
+    """Add any team / player / event / label text in source_table that isn't encoded yet"""
+    for table, _, value_column, source_columns in DIMENSIONS:
+        values = " UNION ".join(
+            f"SELECT {column} FROM {source_table} WHERE {column} IS NOT NULL" for column in source_columns
+        )
+        # ORDER BY keeps ids stable between identical loads
+        cur.execute(f"""
+            INSERT INTO {table} ({value_column})
+            SELECT v FROM ({values}) AS d(v)
+            ORDER BY v
+            ON CONFLICT ({value_column}) DO NOTHING
+        """)
+
+
+def upsert_games(cur, source_table):
+    """Add the games in source_table to games (existing games keep their game_id), returns their ids"""
+    # ORDER BY numbers new games by date then team names, so a fresh load is reproducible
+    cur.execute(f"""
+        INSERT INTO games (game_date, home_team_id, away_team_id)
+        SELECT game_date, home_team_id, away_team_id FROM (
+            SELECT DISTINCT s.game_date, h.team_id AS home_team_id, a.team_id AS away_team_id,
+                   h.team_name AS home_team, a.team_name AS away_team
+            FROM {source_table} s
+            JOIN teams h ON h.team_name = {HOME_TEAM}
+            JOIN teams a ON a.team_name = {AWAY_TEAM}
+            WHERE s.game_date IS NOT NULL
+        ) d
+        ORDER BY game_date, home_team, away_team
+        ON CONFLICT (game_date, home_team_id, away_team_id) DO UPDATE SET game_date = EXCLUDED.game_date
+        RETURNING game_id
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def refresh_game_summaries(cur, game_ids, tables=None):
+    """Recompute final score, periods and event range for game_ids (from tables instead of play_by_play_events if given)"""
+    if not game_ids:
+        return
+    events = "play_by_play_events"
+    if tables:
+        events = "(" + " UNION ALL ".join(f"SELECT * FROM {table}" for table in tables) + ")"
+    cur.execute(GAME_SUMMARY_UPDATE.format(events=events), (game_ids,))
+
+
+def prune_games(cur):
+    """Drop games that no longer have any events (after a reload or a retired season)"""
+    cur.execute("DELETE FROM games g WHERE NOT EXISTS (SELECT 1 FROM play_by_play_events e WHERE e.game_id = g.game_id)")
+
+
+def encode_rows(cur, source_table):
+    """Add the dimension values and games of source_table, returns its game_ids"""
+    upsert_dimensions(cur, source_table)
+    return upsert_games(cur, source_table)
+
+
+def copy_events(cur, source_table, target="play_by_play_events", where=None, params=None):
+    """INSERT the encoded rows of source_table (optionally filtered on s.*) into target"""
+    targets = ', '.join(column for column, _ in FACT_COLUMNS)
+    expressions = ', '.join(expression for _, expression in FACT_COLUMNS)
+    where_clause = f"WHERE {where}" if where else ""
+    # Hash joins can shuffle rows; keep ids in file order like a plain INSERT ... SELECT would
+    cur.execute(f"""
+        INSERT INTO {target} ({targets})
+        SELECT {expressions} FROM {source_table} s {FACT_JOINS}
+        {where_clause}
+        ORDER BY s.ctid
+    """, params)
+
+
+def insert_events(cur, source_table):
+    """Encode the text rows of source_table into play_by_play_events and refresh their games, returns their game_ids"""
+    game_ids = encode_rows(cur, source_table)
+    copy_events(cur, source_table)
+    refresh_game_summaries(cur, game_ids)
+    return game_ids
@@ -0,0 +1,109 @@
+import re
+from normalize import copy_events
+
+# Season partitions of play_by_play_events (LIST on season_year, see create_tables.sql).
+# A season is loaded by building play_by_play_events_s<season> as a standalone table
+# (rows, CHECK constraint and indexes, while readers still use the old partition) and
+# swapping it in with DETACH / ATTACH, so the parent is only locked for the swap itself.
+
+PARENT = "play_by_play_events"
+PARTITION_NAME = re.compile(rf"^{PARENT}_s(\d+)$")
+
+
+def partition_name(season):
+    return f"{PARENT}_s{int(season)}"
+
+
+def attached_partitions(cur):
+    """{season: partition name} for every season partition currently attached"""
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (PARENT,))
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[int(match.group(1))] = name
+    return partitions
+
+
+def staged_seasons(cur, source_tables):
+    """Distinct non-null seasons across source_tables"""
+    union = " UNION ".join(f"SELECT DISTINCT season_year FROM {table}" for table in source_tables)
+    cur.execute(f"SELECT season_year FROM ({union}) s WHERE season_year IS NOT NULL ORDER BY 1")
+    return [row[0] for row in cur.fetchall()]
+
+
+def ensure_partitions(cur, source_table):
+    """Create an empty partition for every season in source_table that doesn't have one yet"""
+    attached = attached_partitions(cur)
+    for season in staged_seasons(cur, [source_table]):
+        if season not in attached:
+            cur.execute(f"CREATE TABLE {partition_name(season)} PARTITION OF {PARENT} FOR VALUES IN ({int(season)})")
+
+
+def build_partition(cur, source_tables, season):
+    """
+    Fill a standalone table with one season's encoded rows, ready to attach
+    Returns (table, [(index, final index name)]); the indexes match the parent's, so ATTACH adopts
+    them instead of building new ones, and the CHECK constraint lets it skip the validation scan.
+    """
+    table = f"{partition_name(season)}_new"
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"CREATE TABLE {table} (LIKE {PARENT} INCLUDING DEFAULTS)")
+    for source_table in source_tables:
+        copy_events(cur, source_table, target=table, where="s.season_year = %s", params=(season,))
+    cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_season CHECK (season_year IS NOT NULL AND season_year = {int(season)})")
+
+    # Indexes are built once over the loaded rows instead of maintained row by row
+    cur.execute("""
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = %s
+    """, (PARENT,))
+    indexes = []
+    for i, (name, definition) in enumerate(cur.fetchall()):
+        temporary = f"{table}_{i}"
+        definition = re.sub(r" INDEX \S+ ON (ONLY )?\S+ USING ", f" INDEX {temporary} ON {table} USING ", definition, count=1)
+        cur.execute(definition)
+        indexes.append((temporary, f"{partition_name(season)}_{name}"))
+    cur.execute(f"ANALYZE {table}")
+    return table, indexes
+
+
+def swap_partition(cur, season, table, indexes):
+    """Replace the season's partition (if any) with a table from build_partition"""
+    name = partition_name(season)
+    if season in attached_partitions(cur):
+        cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+        cur.execute(f"DROP TABLE {name}")
+    cur.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {table} FOR VALUES IN ({int(season)})")
+    cur.execute(f"ALTER TABLE {table} RENAME TO {name}")
+    cur.execute(f"ALTER TABLE {name} RENAME CONSTRAINT {table}_season TO {name}_season")
+    for temporary, final in indexes:
+        cur.execute(f"ALTER INDEX {temporary} RENAME TO {final}")
+
+
+def drop_foreign_keys(cur, table):
+    """Drop a detached partition's foreign keys so the rows it references can go"""
+    cur.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", (table,))
+    for (constraint,) in cur.fetchall():
+        cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{constraint}"')
+
+
+def detach_partition(cur, season, drop=False):
+    """
+    Take a season out of play_by_play_events, returns the detached table name (None if dropped)
+    A kept partition is renamed <partition>_detached and no longer references games or players.
+    """
+    name = partition_name(season)
+    if season not in attached_partitions(cur):
+        raise ValueError(f"season {season} has no partition")
+    cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+    if drop:
+        cur.execute(f"DROP TABLE {name}")
+        return None
+    drop_foreign_keys(cur, name)
+    cur.execute(f"ALTER TABLE {name} RENAME TO {name}_detached")
+    return f"{name}_detached"
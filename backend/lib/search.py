@@ -0,0 +1,38 @@
+# Search dictionary (search_names, see create_tables.sql): one row per player and team
+# with its event count, rebuilt from the encoded events after every load. A player counts
+# an event whether they made the play (player_id) or received it (player_2_id); their team
+# is the one they have the most events with.
+
+PLAYER_NAMES_INSERT = """
+    INSERT INTO search_names (kind, name, search_key, team_name, event_count)
+    SELECT 'player', p.player_name, lower(p.player_name),
+           (ARRAY_AGG(t.team_name ORDER BY c.events DESC, t.team_name))[1],
+           SUM(c.events)
+    FROM (
+        SELECT player_id, team_id, COUNT(*) AS events
+        FROM (
+            SELECT player_id, team_id FROM play_by_play_events WHERE player_id IS NOT NULL
+            UNION ALL
+            SELECT player_2_id, team_id FROM play_by_play_events WHERE player_2_id IS NOT NULL
+        ) appearances
+        GROUP BY player_id, team_id
+    ) c
+    JOIN players p ON p.player_id = c.player_id
+    LEFT JOIN teams t ON t.team_id = c.team_id
+    GROUP BY p.player_name
+"""
+
+TEAM_NAMES_INSERT = """
+    INSERT INTO search_names (kind, name, search_key, team_name, event_count)
+    SELECT 'team', t.team_name, lower(t.team_name), NULL, COUNT(*)
+    FROM play_by_play_events e
+    JOIN teams t ON t.team_id = e.team_id
+    GROUP BY t.team_name
+"""
+
+
+def refresh_search_names(cur):
+    """Rebuild search_names inside the caller's transaction (names without events drop out)"""
+    cur.execute("TRUNCATE search_names")
+    cur.execute(PLAYER_NAMES_INSERT)
+    cur.execute(TEAM_NAMES_INSERT)
@@ -0,0 +1,215 @@
+from collections import deque
+from contextvars import ContextVar
+import bisect
+import hashlib
+import os
+import re
+import threading
+import time
+
+# Metrics configuration (override with environment variables)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))                         # statements slower than this are logged
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '1').lower() not in ('0', 'false', 'no')
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 60))  # seconds between EXPLAINs of one statement
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 100))               # slow queries kept for /api/metrics/queries
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Route template of the request being handled, so queries can be attributed to it
+current_route = ContextVar('current_route', default='-')
+
+
+class Histogram:
+    """Thread-safe Prometheus-style histogram with a fixed label set"""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for labelvalues, values in series:
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(labels, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels, ('le', '+Inf'))} {values[-1]}")
+            suffix = _labels(labels) if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return lines
+
+
+def _labels(pairs, *extra):
+    """{name="value",...} with values escaped per the text exposition format"""
+    escaped = []
+    for name, value in list(pairs) + list(extra):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Wall time per request',
+                             ('route', 'method', 'status'), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Serialized response body size (streamed bodies excluded)',
+                          ('route',), BYTE_BUCKETS)
+QUERY_DURATION = Histogram('db_query_duration_seconds', 'Execution time per SQL statement',
+                           ('route', 'query'), LATENCY_BUCKETS)
+QUERY_ROWS = Histogram('db_query_rows', 'Rows returned per SQL statement',
+                       ('route', 'query'), ROW_BUCKETS)
+POOL_ACQUIRE = Histogram('db_pool_acquire_seconds', 'Time spent waiting for a pooled connection',
+                         (), LATENCY_BUCKETS)
+HISTOGRAMS = [REQUEST_DURATION, RESPONSE_SIZE, QUERY_DURATION, QUERY_ROWS, POOL_ACQUIRE]
+
+
+class QueryLog:
+    """Per-statement totals plus a bounded log of slow executions (with EXPLAIN ANALYZE plans)"""
+
+    def __init__(self, size=SLOW_QUERY_LOG_SIZE):
+        self._statements = {}    # query id -> {"sql", "calls", "total_seconds", "max_seconds", "rows"}
+        self._slow = deque(maxlen=size)
+        self._explained_at = {}  # query id -> monotonic time of the last EXPLAIN
+        self._lock = threading.Lock()
+
+    def record(self, query_id, sql, seconds, rows):
+        with self._lock:
+            stats = self._statements.get(query_id)
+            if stats is None:
+                stats = self._statements[query_id] = {
+                    "query": query_id, "sql": sql, "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "rows": 0,
+                }
+            stats["calls"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rows"] += max(rows, 0)
+
+    def should_explain(self, query_id):
+        """True at most once per SLOW_QUERY_EXPLAIN_INTERVAL for a statement"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(query_id, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+                return False
+            self._explained_at[query_id] = now
+            return True
+
+    def add_slow(self, entry):
+        with self._lock:
+            self._slow.append(entry)
+
+    def snapshot(self):
+        """Statements ordered by total time (the ones costing the most first) and recent slow queries"""
+        with self._lock:
+            statements = [dict(stats) for stats in self._statements.values()]
+            slow = list(self._slow)
+        for stats in statements:
+            stats["avg_seconds"] = stats["total_seconds"] / stats["calls"]
+            for key in ("total_seconds", "max_seconds", "avg_seconds"):
+                stats[key] = round(stats[key], 6)
+        statements.sort(key=lambda stats: stats["total_seconds"], reverse=True)
+        return {"slow_query_ms": SLOW_QUERY_MS, "statements": statements, "slow_queries": slow[::-1]}
+
+
+query_log = QueryLog()
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always gets the same id"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    return re.sub(r'\s+', ' ', str(sql)).strip()
+
+
+def query_id(sql):
+    """Short stable id for a statement (parameters aren't part of it)"""
+    return hashlib.sha1(sql.encode()).hexdigest()[:10]
+
+
+def record_query(cursor, query, params, seconds, rows):
+    """
+    Record one executed statement; slow ones go to the slow query log
+    SELECTs run through a cursor also get their EXPLAIN ANALYZE plan (cursor=None skips it)
+    """
+    if not METRICS_ENABLED:
+        return
+    sql = normalize_sql(query)
+    qid = query_id(sql)
+    route = current_route.get()
+    QUERY_DURATION.observe(seconds, route, qid)
+    QUERY_ROWS.observe(max(rows, 0), route, qid)
+    query_log.record(qid, sql, seconds, rows)
+
+    if seconds * 1000 < SLOW_QUERY_MS:
+        return
+    entry = {
+        "query": qid,
+        "route": route,
+        "seconds": round(seconds, 6),
+        "rows": rows,
+        "sql": normalize_sql(cursor.mogrify(query, params)) if cursor is not None else sql,
+        "at": time.time(),
+        "plan": None,
+    }
+    # EXPLAIN ANALYZE runs the statement again, so only for reads and not every time
+    if (cursor is not None and SLOW_QUERY_EXPLAIN and sql.upper().startswith(('SELECT', 'WITH'))
+            and query_log.should_explain(qid)):
+        entry["plan"] = explain_analyze(cursor.connection, query, params)
+    print(f"Slow query {qid} on {route}: {seconds * 1000:.1f}ms, {rows} rows")
+    query_log.add_slow(entry)
+
+
+def explain_analyze(conn, query, params):
+    """EXPLAIN ANALYZE text for a statement, inside a savepoint so a failure can't abort the caller's transaction"""
+    try:
+        with conn.cursor() as explain:
+            explain.execute("SAVEPOINT explain_slow_query")
+            try:
+                explain.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                plan = "\n".join(row[0] for row in explain.fetchall())
+                explain.execute("RELEASE SAVEPOINT explain_slow_query")
+                return plan
+            except Exception:
+                explain.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                raise
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+
+def record_request(route, method, status, seconds, size):
+    """Record one finished request (size is None for streamed bodies)"""
+    if not METRICS_ENABLED:
+        return
+    REQUEST_DURATION.observe(seconds, route, method, str(status))
+    if size is not None:
+        RESPONSE_SIZE.observe(size, route)
+
+
+def render_metrics(gauges=None):
+    """Prometheus text exposition of every histogram plus extra {name: (help, value)} values (*_total are counters)"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, (documentation, value) in (gauges or {}).items():
+        kind = 'counter' if name.endswith('_total') else 'gauge'
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
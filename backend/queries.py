@@ -0,0 +1,1187 @@
+import base64
+import binascii
+import datetime
+import json
+
+# SQL and row helpers shared by the Flask app (app.py) and the ASGI app (asgi_app.py),
+# so both serve identical responses. Every statement uses %s placeholders, which
+# psycopg2 and psycopg 3 both accept.
+
+# Configuration
+MAX_LIMIT = 2000    # Don't let users request too much data//default is 2000
+RINK_LENGTH = 200   # x coordinates run 0-200
+RINK_WIDTH = 85     # y coordinates run 0-85
+DEFAULT_BIN_SIZE = 10
+NET_X, NET_Y = 189, 42.5   # the net a team shoots at (coordinates are in the attacking team's direction)
+SLOT = (154, 189, 20.5, 64.5)  # slot box x_min, x_max, y_min, y_max: top of the circles to the goal line, between the faceoff dots
+
+
+# Events feed
+# play_by_play is a view over the dictionary-encoded play_by_play_events table: list the
+# original columns explicitly (SELECT * would add the *_id keys) and filter on the keys
+# so the planner can use the integer indexes
+EVENTS_SELECT = "SELECT id, game_date, season_year, team_name, opp_team_name, venue, period, clock_seconds, situation_type, goals_for, goals_against, player_name, event, event_successful, x_coord, y_coord, event_type, player_name_2, x_coord_2, y_coord_2, event_detail_1, event_detail_2, event_detail_3 FROM play_by_play"
+
+# Keyset pagination helpers for /api/events
+# The feed is ordered by game_date DESC, period ASC, clock_seconds DESC, id ASC.
+# Negating period and id turns that into one direction, so "rows after the cursor"
+# is a single row comparison the idx_events_feed* indexes can seek to. NULL keys
+# (rows loaded without a date, period or clock) are COALESCE'd to values that sort
+# last, so the comparison never goes NULL and the cursor always has a value to carry.
+FEED_NULL_DATE = datetime.date.min
+FEED_NULL_PERIOD = 32767
+FEED_NULL_CLOCK = -1
+FEED_KEYS = (f"COALESCE(game_date, DATE '{FEED_NULL_DATE.isoformat()}')", f"(-COALESCE(period, {FEED_NULL_PERIOD}))",
+             f"COALESCE(clock_seconds, {FEED_NULL_CLOCK})", "(-id)")
+EVENTS_ORDER_BY = " ORDER BY " + ", ".join(f"{key} DESC" for key in FEED_KEYS)
+EVENTS_AFTER_CURSOR = f" AND ({', '.join(FEED_KEYS)}) < (%s, %s, %s, %s)"
+
+def encode_cursor(event):
+    """Turn the sort key of the last row on a page into an opaque token"""
+    game_date = event['game_date'] if event['game_date'] is not None else FEED_NULL_DATE
+    period = event['period'] if event['period'] is not None else FEED_NULL_PERIOD
+    clock_seconds = event['clock_seconds'] if event['clock_seconds'] is not None else FEED_NULL_CLOCK
+    key = [game_date.isoformat(), period, clock_seconds, event['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor, returns params for EVENTS_AFTER_CURSOR (raises ValueError if malformed)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        game_date, period, clock_seconds, event_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not all(isinstance(v, int) for v in (period, clock_seconds, event_id)):
+            raise ValueError("cursor values must be integers")
+        return [datetime.date.fromisoformat(game_date), -period, clock_seconds, -event_id]
+    except (binascii.Error, json.JSONDecodeError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+def page_params(args):
+    """limit, offset and cursor params for /api/events (raises ValueError with the message for the client)"""
+    try:
+        limit = int(args.get('limit', 2000))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be numbers")
+    
+    # Check limits
+    if limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    
+    if offset < 0:
+        raise ValueError("offset cannot be negative")
+    
+    cursor_token = args.get('cursor')
+    cursor_params = None
+    if cursor_token:
+        if offset:
+            raise ValueError("use either cursor or offset, not both")
+        try:
+            cursor_params = decode_cursor(cursor_token)
+        except ValueError:
+            raise ValueError("invalid cursor")
+    return limit, offset, cursor_params
+
+def season_param(args):
+    """?season= as an int (None when absent); raises ValueError with the message for the client"""
+    season = args.get('season')
+    try:
+        return int(season) if season else None
+    except ValueError:
+        raise ValueError("season must be a number")
+
+def events_query(team, player, event_type, cursor_params, limit, offset, season=None):
+    """(query, params) for one page of /api/events"""
+    query = EVENTS_SELECT + " WHERE 1=1" #the 1=1 is a boolean operator that is always true (makes it easier to add filters)
+    params = [] #params is a list of parameters to the query
+    
+    if team:
+        query += " AND team_id = (SELECT team_id FROM teams WHERE team_name = %s)" #adds a filter for the team name
+        params.append(team) #adds the team name to the list of parameters
+    
+    if player:
+        query += " AND player_id = (SELECT player_id FROM players WHERE player_name = %s)" #adds a filter for the player name
+        params.append(player) #adds the player name to the list of parameters
+    
+    if event_type:
+        query += " AND event_id = (SELECT event_id FROM events WHERE event = %s)" #adds a filter for the event type
+        params.append(event_type) #adds the event type to the list of parameters
+    
+    if season is not None:
+        query += " AND season_year = %s" #only that season's partition is read
+        params.append(season)
+    
+    if cursor_params:
+        query += EVENTS_AFTER_CURSOR #only rows that sort after the previous page
+        params.extend(cursor_params)
+    
+    query += EVENTS_ORDER_BY + " LIMIT %s OFFSET %s"
+    params.extend([limit, offset]) #adds the limit and offset to the list of parameters
+    return query, params
+
+
+# Teams and players (per-game totals are precomputed at ingest, see lib/aggregates.py)
+TEAMS_QUERY = "SELECT DISTINCT team_name FROM team_game_stats ORDER BY team_name"
+
+PLAYERS_QUERY = """
+    SELECT 
+        player_name,
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+
+        -- Goals (Shot that is successful = true)
+        SUM(goals) as goals,
+
+        -- Successful Plays (passes)
+        SUM(successful_passes) as successful_plays,
+
+        -- Shots (unsuccessful, event_successful = false)
+        SUM(shots) as shots
+
+    FROM player_game_stats
+    WHERE player_name IS NOT NULL
+"""
+
+PLAYERS_GROUP_BY = """
+    GROUP BY player_name, team_name
+    ORDER BY player_name ASC
+"""
+
+def players_query(team):
+    """(query, params) for /api/players, optionally limited to one team"""
+    query = PLAYERS_QUERY
+    params = []
+    if team:
+        query += " AND team_name = %s"
+        params.append(team)
+    return query + PLAYERS_GROUP_BY, params
+
+PLAYER_SUMMARY_QUERY = """
+    SELECT 
+        player_name,
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+        SUM(total_events) as total_events,
+
+        -- Goals
+        SUM(goals) as goals,
+
+        -- Shots on goal (unsuccessful)
+        SUM(shots) as shots,
+
+        -- Successful passes
+        SUM(successful_passes) as successful_passes,
+
+        -- Incomplete passes
+        SUM(incomplete_passes) as incomplete_passes,
+
+        -- Other events
+        SUM(faceoff_wins) as faceoff_wins,
+        SUM(puck_recoveries) as puck_recoveries,
+        SUM(takeaways) as takeaways,
+        SUM(zone_entries) as zone_entries,
+        SUM(dump_ins_outs) as dump_ins_outs,
+        SUM(penalties) as penalties
+
+    FROM player_game_stats
+    WHERE player_name = %s
+    GROUP BY player_name, team_name
+"""
+
+# PLAYER_SUMMARY_QUERY for a list of players (/api/batch), rows tagged with batch_key
+PLAYER_SUMMARY_BATCH_QUERY = """
+    SELECT 
+        player_name AS batch_key,
+        player_name,
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+        SUM(total_events) as total_events,
+
+        -- Goals
+        SUM(goals) as goals,
+
+        -- Shots on goal (unsuccessful)
+        SUM(shots) as shots,
+
+        -- Successful passes
+        SUM(successful_passes) as successful_passes,
+
+        -- Incomplete passes
+        SUM(incomplete_passes) as incomplete_passes,
+
+        -- Other events
+        SUM(faceoff_wins) as faceoff_wins,
+        SUM(puck_recoveries) as puck_recoveries,
+        SUM(takeaways) as takeaways,
+        SUM(zone_entries) as zone_entries,
+        SUM(dump_ins_outs) as dump_ins_outs,
+        SUM(penalties) as penalties
+
+    FROM player_game_stats
+    WHERE player_name = ANY(%s)
+    GROUP BY player_name, team_name
+"""
+
+# Shots and passes with coordinates for the shot chart
+PLAYER_EVENTS_QUERY = """
+    SELECT 
+        period,
+        clock_seconds,
+        event,
+        event_successful,
+        x_coord,
+        y_coord,
+        opp_team_name,
+        event_type,
+        player_name_2,
+        x_coord_2,
+        y_coord_2
+    FROM play_by_play
+    WHERE player_name = %s 
+    AND x_coord IS NOT NULL 
+    AND event IN ('Shot', 'Play')
+    ORDER BY game_date DESC
+"""
+
+# PLAYER_EVENTS_QUERY for a list of players (/api/batch), rows tagged with batch_key
+PLAYER_EVENTS_BATCH_QUERY = """
+    SELECT 
+        player_name AS batch_key,
+        period,
+        clock_seconds,
+        event,
+        event_successful,
+        x_coord,
+        y_coord,
+        opp_team_name,
+        event_type,
+        player_name_2,
+        x_coord_2,
+        y_coord_2
+    FROM play_by_play
+    WHERE player_name = ANY(%s) 
+    AND x_coord IS NOT NULL 
+    AND event IN ('Shot', 'Play')
+    ORDER BY game_date DESC
+"""
+
+# Game-by-game breakdown (one precomputed row per game)
+PLAYER_GAMES_QUERY = """
+    SELECT 
+        game_date,
+        opp_team_name,
+        total_events,
+        goals,
+        shots,
+        successful_passes as passes,
+        score_for,
+        score_against
+    FROM player_game_stats
+    WHERE player_name = %s
+    ORDER BY game_date DESC
+"""
+
+# PLAYER_GAMES_QUERY for a list of players (/api/batch), rows tagged with batch_key
+PLAYER_GAMES_BATCH_QUERY = """
+    SELECT 
+        player_name AS batch_key,
+        game_date,
+        opp_team_name,
+        total_events,
+        goals,
+        shots,
+        successful_passes as passes,
+        score_for,
+        score_against
+    FROM player_game_stats
+    WHERE player_name = ANY(%s)
+    ORDER BY game_date DESC
+"""
+
+TEAMS_STATS_QUERY = """
+    SELECT 
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+
+        -- Goals (Shot that is successful = true)
+        SUM(goals) as goals,
+
+        -- Shots on goal (unsuccessful)
+        SUM(shots) as shots,
+
+        -- Successful Plays (passes)
+        SUM(successful_passes) as passes
+
+    FROM team_game_stats
+    WHERE team_name IS NOT NULL
+    GROUP BY team_name
+    ORDER BY team_name ASC
+"""
+
+TEAM_SUMMARY_QUERY = """
+    SELECT 
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+        SUM(total_events) as total_events,
+
+        -- Goals
+        SUM(goals) as goals,
+
+        -- Shots on goal (unsuccessful)
+        SUM(shots) as shots,
+
+        -- Successful passes
+        SUM(successful_passes) as passes,
+
+        -- Other events
+        SUM(faceoff_wins) as faceoff_wins,
+        SUM(puck_recoveries) as puck_recoveries,
+        SUM(takeaways) as takeaways,
+        SUM(zone_entries) as zone_entries,
+        SUM(dump_ins_outs) as dump_ins_outs,
+        SUM(penalties) as penalties
+
+
+    FROM team_game_stats
+    WHERE team_name = %s
+    GROUP BY team_name
+"""
+
+# TEAM_SUMMARY_QUERY for a list of teams (/api/batch), rows tagged with batch_key
+TEAM_SUMMARY_BATCH_QUERY = """
+    SELECT 
+        team_name AS batch_key,
+        team_name,
+        COUNT(DISTINCT game_date) as games_played,
+        SUM(total_events) as total_events,
+
+        -- Goals
+        SUM(goals) as goals,
+
+        -- Shots on goal (unsuccessful)
+        SUM(shots) as shots,
+
+        -- Successful passes
+        SUM(successful_passes) as passes,
+
+        -- Other events
+        SUM(faceoff_wins) as faceoff_wins,
+        SUM(puck_recoveries) as puck_recoveries,
+        SUM(takeaways) as takeaways,
+        SUM(zone_entries) as zone_entries,
+        SUM(dump_ins_outs) as dump_ins_outs,
+        SUM(penalties) as penalties
+
+
+    FROM team_game_stats
+    WHERE team_name = ANY(%s)
+    GROUP BY team_name
+"""
+
+# Shots and passes with coordinates for the shot chart
+TEAM_EVENTS_QUERY = """
+    SELECT 
+        period,
+        clock_seconds,
+        event,
+        event_successful,
+        x_coord,
+        y_coord,
+        player_name,
+        opp_team_name,
+        event_type,
+        player_name_2,
+        x_coord_2,
+        y_coord_2
+    FROM play_by_play
+    WHERE team_name = %s 
+    AND x_coord IS NOT NULL 
+    AND event IN ('Shot', 'Play')
+    ORDER BY game_date DESC
+"""
+
+# TEAM_EVENTS_QUERY for a list of teams (/api/batch), rows tagged with batch_key
+TEAM_EVENTS_BATCH_QUERY = """
+    SELECT 
+        team_name AS batch_key,
+        period,
+        clock_seconds,
+        event,
+        event_successful,
+        x_coord,
+        y_coord,
+        player_name,
+        opp_team_name,
+        event_type,
+        player_name_2,
+        x_coord_2,
+        y_coord_2
+    FROM play_by_play
+    WHERE team_name = ANY(%s) 
+    AND x_coord IS NOT NULL 
+    AND event IN ('Shot', 'Play')
+    ORDER BY game_date DESC
+"""
+
+# Game-by-game breakdown (one precomputed row per game)
+TEAM_GAMES_QUERY = """
+    SELECT 
+        game_date,
+        opp_team_name,
+        total_events,
+        goals,
+        shots,
+        successful_passes as passes,
+        score_for,
+        score_against
+    FROM team_game_stats
+    WHERE team_name = %s
+    ORDER BY game_date DESC
+"""
+
+# TEAM_GAMES_QUERY for a list of teams (/api/batch), rows tagged with batch_key
+TEAM_GAMES_BATCH_QUERY = """
+    SELECT 
+        team_name AS batch_key,
+        game_date,
+        opp_team_name,
+        total_events,
+        goals,
+        shots,
+        successful_passes as passes,
+        score_for,
+        score_against
+    FROM team_game_stats
+    WHERE team_name = ANY(%s)
+    ORDER BY game_date DESC
+"""
+
+TEAM_AVERAGES_QUERY = """
+    SELECT 
+        COUNT(DISTINCT player_name) as total_players,
+        AVG(goals_per_player)::float8 as avg_goals,
+        AVG(shots_per_player)::float8 as avg_shots,
+        AVG(shooting_pct) as avg_shooting_pct,
+        AVG(pass_completion_pct) as avg_pass_completion_pct
+    FROM (
+        SELECT 
+            player_name,
+            SUM(goals) as goals_per_player,
+            SUM(shots) as shots_per_player,
+            CASE 
+                WHEN (SUM(goals) + SUM(shots)) > 0
+                THEN (SUM(goals)::float / (SUM(goals) + SUM(shots))) * 100
+                ELSE 0
+            END as shooting_pct,
+            CASE 
+                WHEN (SUM(successful_passes) + SUM(incomplete_passes)) > 0
+                THEN (SUM(successful_passes)::float / (SUM(successful_passes) + SUM(incomplete_passes))) * 100
+                ELSE 0
+            END as pass_completion_pct
+        FROM player_game_stats
+        WHERE team_name = %s AND player_name IS NOT NULL
+        GROUP BY player_name
+    ) player_stats
+"""
+
+
+# Games
+# Final scores are precomputed per game at ingest (see lib/normalize.py)
+GAMES_QUERY = """
+    SELECT 
+        g.game_id,
+        g.game_date,
+        h.team_name,
+        a.team_name AS opp_team_name,
+        g.home_goals AS goals_for,
+        g.away_goals AS goals_against
+    FROM games g
+    JOIN teams h ON h.team_id = g.home_team_id
+    JOIN teams a ON a.team_id = g.away_team_id
+    ORDER BY g.game_date DESC, g.game_id
+"""
+
+# One games row with team names, for /api/games/<game_id>
+GAMES_SELECT = """
+    SELECT g.game_id, g.game_date, g.season_year, h.team_name AS home_team, a.team_name AS away_team,
+           g.home_goals, g.away_goals, g.periods, g.event_count, g.first_event_id, g.last_event_id
+    FROM games g
+    JOIN teams h ON h.team_id = g.home_team_id
+    JOIN teams a ON a.team_id = g.away_team_id
+"""
+
+# A single game's events: play order within the game is period ASC, clock DESC
+GAME_EVENTS_QUERY = EVENTS_SELECT + " WHERE game_id = {game_id}"
+GAME_ORDER_BY = " ORDER BY period ASC, clock_seconds DESC, id ASC"
+GAME_LAST_EVENT = " ORDER BY period DESC, clock_seconds ASC, id DESC LIMIT 1"
+GAME_BY_DATE_AND_TEAM = """(
+    SELECT g.game_id FROM games g
+    JOIN teams h ON h.team_id = g.home_team_id
+    JOIN teams a ON a.team_id = g.away_team_id
+    WHERE g.game_date = %s AND %s IN (h.team_name, a.team_name)
+)"""
+
+def build_game_info(first_event, final_event, team_name):
+    """Game info from the first event, final score from the last one"""
+    game_info = {
+        "game_date": first_event['game_date'],
+        "team_name": first_event['team_name'] if first_event['team_name'] == team_name else first_event['opp_team_name'],
+        "opp_team_name": first_event['opp_team_name'] if first_event['team_name'] == team_name else first_event['team_name'],
+        "venue": first_event['venue'],
+        "season_year": first_event['season_year']
+    }
+    
+    # Get final score
+    game_info['goals_for'] = final_event['goals_for']
+    game_info['goals_against'] = final_event['goals_against']
+    return game_info
+
+
+# Possessions and shot chains (precomputed at ingest, see chains.py and lib/analytics.py)
+TEAM_EXISTS_QUERY = "SELECT 1 FROM teams WHERE team_name = %s"
+PLAYER_EXISTS_QUERY = "SELECT 1 FROM players WHERE player_name = %s"
+
+POSSESSION_SELECT = """
+    SELECT possession_no, team_name, opp_team_name, period, start_clock, end_clock, duration,
+           event_count, passes, shots, goals, zone_entries, start_event, end_event,
+           first_event_id, last_event_id
+    FROM possessions
+"""
+GAME_POSSESSIONS_QUERY = POSSESSION_SELECT + " WHERE game_id = %s ORDER BY possession_no"
+
+SHOT_CHAIN_SELECT = """
+    SELECT shot_event_id, game_id, possession_no, game_date, team_name, opp_team_name, period, clock_seconds,
+           shooter, shot_type, goal, primary_assist, primary_pass_event_id, secondary_assist, secondary_pass_event_id,
+           zone_entry_player, zone_entry_type, zone_entry_event_id, seconds_from_entry, seconds_into_possession
+    FROM shot_chains
+"""
+GAME_SHOT_CHAINS_QUERY = SHOT_CHAIN_SELECT + " WHERE game_id = %s ORDER BY period, clock_seconds DESC, shot_event_id"
+
+# Totals over a set of possessions; divide by possessions for per-possession rates
+POSSESSION_TOTALS = """
+        COUNT(*) as possessions,
+        SUM(duration) as total_duration,
+        SUM(event_count) as total_events,
+        SUM(passes) as passes,
+        SUM(shots) as shots,
+        SUM(goals) as goals,
+        SUM(CASE WHEN shots > 0 THEN 1 ELSE 0 END) as possessions_with_shot,
+        SUM(CASE WHEN zone_entries > 0 THEN 1 ELSE 0 END) as possessions_with_entry
+"""
+
+TEAM_POSSESSIONS_QUERY = f"""
+    SELECT 
+        team_name,
+        COUNT(DISTINCT game_id) as games_played,
+        {POSSESSION_TOTALS}
+    FROM possessions
+    WHERE team_name = %s
+    GROUP BY team_name
+"""
+
+TEAM_POSSESSION_GAMES_QUERY = f"""
+    SELECT 
+        game_id,
+        game_date,
+        opp_team_name,
+        {POSSESSION_TOTALS}
+    FROM possessions
+    WHERE team_name = %s
+    GROUP BY game_id, game_date, opp_team_name
+    ORDER BY game_date DESC, game_id
+"""
+
+# Assist counts per player of a team (a pass can be the primary assist on one shot only)
+TEAM_ASSISTS_QUERY = """
+    SELECT 
+        player_name,
+        SUM(is_primary) as primary_assists,
+        SUM(1 - is_primary) as secondary_assists,
+        SUM(CASE WHEN goal AND is_primary = 1 THEN 1 ELSE 0 END) as primary_goal_assists,
+        SUM(CASE WHEN goal AND is_primary = 0 THEN 1 ELSE 0 END) as secondary_goal_assists
+    FROM (
+        SELECT primary_assist AS player_name, 1 AS is_primary, goal
+        FROM shot_chains WHERE team_name = %s AND primary_assist IS NOT NULL
+        UNION ALL
+        SELECT secondary_assist, 0, goal
+        FROM shot_chains WHERE team_name = %s AND secondary_assist IS NOT NULL
+    ) assists
+    GROUP BY player_name
+    ORDER BY primary_assists DESC, player_name ASC
+"""
+
+PLAYER_ASSISTS_QUERY = """
+    SELECT 
+        COALESCE(SUM(CASE WHEN primary_assist = %(player_name)s THEN 1 ELSE 0 END), 0) as primary_assists,
+        COALESCE(SUM(CASE WHEN secondary_assist = %(player_name)s THEN 1 ELSE 0 END), 0) as secondary_assists,
+        COALESCE(SUM(CASE WHEN primary_assist = %(player_name)s AND goal THEN 1 ELSE 0 END), 0) as primary_goal_assists,
+        COALESCE(SUM(CASE WHEN secondary_assist = %(player_name)s AND goal THEN 1 ELSE 0 END), 0) as secondary_goal_assists,
+        COALESCE(SUM(CASE WHEN shooter = %(player_name)s THEN 1 ELSE 0 END), 0) as shots,
+        COALESCE(SUM(CASE WHEN shooter = %(player_name)s AND primary_assist IS NOT NULL THEN 1 ELSE 0 END), 0) as assisted_shots,
+        COALESCE(SUM(CASE WHEN shooter = %(player_name)s AND zone_entry_event_id IS NOT NULL THEN 1 ELSE 0 END), 0) as shots_off_entry
+    FROM shot_chains
+    WHERE shooter = %(player_name)s OR primary_assist = %(player_name)s OR secondary_assist = %(player_name)s
+"""
+
+# Every shot the player took or set up, newest game first
+PLAYER_SHOT_CHAINS_QUERY = SHOT_CHAIN_SELECT + """
+    WHERE shooter = %(player_name)s OR primary_assist = %(player_name)s OR secondary_assist = %(player_name)s
+    ORDER BY game_date DESC, period, clock_seconds DESC, shot_event_id
+"""
+
+
+# Heatmap
+# One grouped pass: bin index per event, clamped onto the rink
+HEATMAP_QUERY = """
+    SELECT 
+        LEAST(GREATEST(FLOOR(x_coord / %s), 0), %s)::int as x_bin,
+        LEAST(GREATEST(FLOOR(y_coord / %s), 0), %s)::int as y_bin,
+        COUNT(*) as count,
+        SUM(CASE WHEN event_successful = true THEN 1 ELSE 0 END) as successful,
+
+        -- Vectors only for events with an end point
+        SUM(CASE WHEN x_coord_2 IS NOT NULL AND y_coord_2 IS NOT NULL THEN 1 ELSE 0 END) as vector_count,
+        COALESCE(SUM(CASE WHEN y_coord_2 IS NOT NULL THEN x_coord_2 - x_coord END), 0) as sum_dx,
+        COALESCE(SUM(CASE WHEN x_coord_2 IS NOT NULL THEN y_coord_2 - y_coord END), 0) as sum_dy
+    FROM play_by_play
+    WHERE x_coord IS NOT NULL AND y_coord IS NOT NULL
+"""
+
+def heatmap_params(args):
+    """bin_size, x_bins, y_bins, filters and vectors for /api/heatmap (raises ValueError with the message for the client)"""
+    try:
+        bin_size = int(args.get('bin', DEFAULT_BIN_SIZE))
+        period = args.get('period')
+        period = int(period) if period else None
+        season = args.get('season')
+        season = int(season) if season else None
+    except ValueError:
+        raise ValueError("bin, period and season must be numbers")
+    
+    if bin_size < 1 or bin_size > RINK_LENGTH:
+        raise ValueError(f"bin must be between 1 and {RINK_LENGTH}")
+    
+    x_bins = -(-RINK_LENGTH // bin_size)  # ceil, x = 200 lands in the last bin
+    y_bins = -(-RINK_WIDTH // bin_size)
+    vectors = args.get('vectors', '').lower() in ('1', 'true', 'yes')
+    filters = {
+        "team_name": args.get('team'),
+        "player_name": args.get('player'),
+        "event": args.get('event'),
+        "period": period,
+        "season_year": season,
+        "situation_type": args.get('situation_type')
+    }
+    return bin_size, x_bins, y_bins, filters, vectors
+
+def heatmap_query(filters, bin_size, x_bins, y_bins):
+    """(query, params) for /api/heatmap; filters maps play_by_play columns to values (None = any)"""
+    query = HEATMAP_QUERY
+    params = [bin_size, x_bins - 1, bin_size, y_bins - 1]
+    
+    for column, value in filters.items():
+        if value is not None and value != '':
+            query += f" AND {column} = %s"
+            params.append(value)
+    
+    query += " GROUP BY 1, 2 ORDER BY 1, 2"
+    return query, params
+
+def heatmap_bins(rows, vectors):
+    """Turn per-bin totals (from SQL or the memory store) into the response bins"""
+    bins = []
+    for row in rows:
+        item = {
+            "x_bin": row['x_bin'],
+            "y_bin": row['y_bin'],
+            "count": row['count'],
+            "successful": row['successful'],
+            "success_rate": round(row['successful'] / row['count'], 4) if row['count'] else None
+        }
+        if vectors:
+            # Average pass/shot vector (x2 - x, y2 - y) for events that have an end point
+            item["vector_count"] = row['vector_count']
+            item["avg_dx"] = round(float(row['sum_dx']) / row['vector_count'], 2) if row['vector_count'] else None
+            item["avg_dy"] = round(float(row['sum_dy']) / row['vector_count'], 2) if row['vector_count'] else None
+        bins.append(item)
+    return bins
+
+
+# Game timeline (/api/games/<id>/timeline)
+# Per-team totals in fixed clock buckets of one game, one window + GROUP BY pass.
+# Each event holds the puck until the next event of the period (the last one until
+# the end of the period), which gives possession seconds without the possessions table.
+# Regulation periods run PERIOD_SECONDS; an overtime's length is taken from its latest clock,
+# rounded up to the minute (a 5 minute overtime starts at 300), capped at PERIOD_SECONDS.
+PERIOD_SECONDS = 1200      # 20 minute periods, clock_seconds counts down from here
+REGULATION_PERIODS = 3
+DEFAULT_TIMELINE_BUCKET = 60
+MIN_TIMELINE_BUCKET = 10
+
+TIMELINE_QUERY = """
+    SELECT 
+        period,
+        period_seconds,
+        (period_seconds - GREATEST(clock_seconds, 1)) / %(bucket)s as bucket,
+        SUM(CASE WHEN venue = 'home' THEN 1 ELSE 0 END) as home_events,
+        SUM(CASE WHEN venue = 'away' THEN 1 ELSE 0 END) as away_events,
+        SUM(CASE WHEN venue = 'home' AND event = 'Shot' THEN 1 ELSE 0 END) as home_shots,
+        SUM(CASE WHEN venue = 'away' AND event = 'Shot' THEN 1 ELSE 0 END) as away_shots,
+        SUM(CASE WHEN venue = 'home' AND event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as home_goals,
+        SUM(CASE WHEN venue = 'away' AND event = 'Shot' AND event_successful = true THEN 1 ELSE 0 END) as away_goals,
+        SUM(CASE WHEN venue = 'home' THEN held_seconds ELSE 0 END) as home_possession_seconds,
+        SUM(CASE WHEN venue = 'away' THEN held_seconds ELSE 0 END) as away_possession_seconds,
+        -- Score as of the home side's last event in the bucket, like the games table's final score
+        (ARRAY_AGG(goals_for ORDER BY clock_seconds ASC, id DESC) FILTER (WHERE venue = 'home'))[1] as home_score,
+        (ARRAY_AGG(goals_against ORDER BY clock_seconds ASC, id DESC) FILTER (WHERE venue = 'home'))[1] as away_score
+    FROM (
+        SELECT id, period, clock_seconds, venue, event, event_successful, goals_for, goals_against,
+               clock_seconds - LEAD(clock_seconds, 1, 0) OVER (PARTITION BY period ORDER BY clock_seconds DESC, id) as held_seconds,
+               CASE WHEN period <= %(regulation_periods)s THEN %(period_seconds)s
+                    ELSE LEAST(GREATEST(CEIL(MAX(clock_seconds) OVER (PARTITION BY period) / 60.0)::int, 1) * 60, %(period_seconds)s)
+               END as period_seconds
+        FROM play_by_play
+        WHERE game_id = %(game_id)s
+    ) e
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 3
+"""
+
+def timeline_params(args):
+    """Bucket size in seconds for /api/games/<id>/timeline (raises ValueError with the message for the client)"""
+    try:
+        bucket = int(args.get('bucket', DEFAULT_TIMELINE_BUCKET))
+    except ValueError:
+        raise ValueError("bucket must be a number of seconds")
+    
+    if bucket < MIN_TIMELINE_BUCKET or bucket > PERIOD_SECONDS:
+        raise ValueError(f"bucket must be between {MIN_TIMELINE_BUCKET} and {PERIOD_SECONDS} seconds")
+    return bucket
+
+def period_length(period, max_clock):
+    """Seconds in a period, the period_seconds of TIMELINE_QUERY (max_clock: its latest clock_seconds)"""
+    if period <= REGULATION_PERIODS or max_clock is None:
+        return PERIOD_SECONDS
+    return min(max(-(-max_clock // 60), 1) * 60, PERIOD_SECONDS)
+
+def timeline_points(rows, bucket):
+    """Turn per-bucket totals (from SQL or the memory store) into timeline points"""
+    lengths = {row['period']: row['period_seconds'] for row in rows}
+    points = []
+    home_score = away_score = 0
+    for row in rows:
+        # Buckets without a home event keep the previous score
+        if row['home_score'] is not None:
+            home_score, away_score = row['home_score'], row['away_score']
+        start_clock = row['period_seconds'] - row['bucket'] * bucket
+        held = row['home_possession_seconds'] + row['away_possession_seconds']
+        # Periods without events count as full length
+        before = sum(lengths.get(period, PERIOD_SECONDS) for period in range(1, row['period']))
+        points.append({
+            **row,
+            "elapsed": before + row['bucket'] * bucket,
+            "start_clock": start_clock,
+            "end_clock": max(start_clock - bucket, 0),
+            "home_possession_share": round(row['home_possession_seconds'] / held, 4) if held else None,
+            "home_score": home_score,
+            "away_score": away_score
+        })
+    return points
+
+
+# Leaderboards (/api/leaderboards/<stat>) over player_split_stats (lib/leaderboards.py)
+# A page is a range read on the stat's index: (split, split_value, stat DESC, games_played, player_name)
+LEADERBOARD_STATS = ('goals', 'shots', 'shot_attempts', 'successful_passes', 'pass_completion_pct',
+                     'takeaways', 'faceoff_wins')
+LEADERBOARD_SPLITS = ('all', 'situation', 'strength', 'period')
+LEADERBOARD_COLUMNS = ['player_name', 'team_name', 'games_played', 'goals', 'shots', 'shot_attempts',
+                       'successful_passes', 'incomplete_passes', 'pass_completion_pct', 'takeaways', 'faceoff_wins']
+DEFAULT_LEADERBOARD_LIMIT = 25
+MAX_LEADERBOARD_LIMIT = 100
+
+LEADERBOARD_QUERY = f"""
+    SELECT {', '.join(LEADERBOARD_COLUMNS)}
+    FROM player_split_stats
+    WHERE split = %s AND split_value = %s AND games_played >= %s AND {{stat}} IS NOT NULL
+    ORDER BY {{stat}} DESC NULLS LAST, games_played ASC, player_name ASC
+    LIMIT %s OFFSET %s
+"""
+
+def leaderboard_params(stat, args):
+    """(split, split_value, min_games, limit, offset) for /api/leaderboards/<stat> (raises ValueError with the message for the client)"""
+    if stat not in LEADERBOARD_STATS:
+        raise ValueError(f"stat must be one of: {', '.join(LEADERBOARD_STATS)}")
+    
+    split = args.get('split', 'all')
+    if split not in LEADERBOARD_SPLITS:
+        raise ValueError(f"split must be one of: {', '.join(LEADERBOARD_SPLITS)}")
+    
+    split_value = args.get('value', '')
+    if split == 'all':
+        split_value = ''
+    elif not split_value:
+        raise ValueError(f"value is required for the {split} split")
+    
+    try:
+        min_games = int(args.get('min_games', 0))
+        limit = int(args.get('limit', DEFAULT_LEADERBOARD_LIMIT))
+        offset = int(args.get('offset', 0))
+        if split == 'period':
+            split_value = str(int(split_value))
+    except ValueError:
+        raise ValueError("min_games, limit, offset and a period value must be numbers")
+    
+    if limit < 1 or limit > MAX_LEADERBOARD_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LEADERBOARD_LIMIT}")
+    if offset < 0 or min_games < 0:
+        raise ValueError("offset and min_games cannot be negative")
+    return split, split_value, min_games, limit, offset
+
+def leaderboard_query(stat, split, split_value, min_games, limit, offset):
+    """(query, params) for one page of a leaderboard; stat must come from leaderboard_params"""
+    return LEADERBOARD_QUERY.format(stat=stat), [split, split_value, min_games, limit, offset]
+
+def leaderboard_rows(rows, offset):
+    """Number the rows of a page (ties keep the order of the index: fewer games first, then name)"""
+    return [{"rank": offset + i + 1, **row} for i, row in enumerate(rows)]
+
+
+# Head-to-head matchups over team_matchup_stats (lib/matchups.py): one row per team and
+# opponent, so a comparison is a primary key lookup for each side of the pair
+MATCHUP_COLUMNS = ['team_name', 'opp_team_name', 'games_played', 'total_events', 'goals', 'shots', 'shot_attempts',
+                   'shooting_pct', 'successful_passes', 'incomplete_passes', 'pass_completion_pct',
+                   'zone_entries', 'successful_zone_entries', 'faceoff_wins', 'takeaways',
+                   'located_shot_attempts', 'avg_shot_x', 'avg_shot_y', 'avg_shot_distance',
+                   'slot_shot_attempts', 'slot_goals']
+
+MATCHUP_SELECT = f"SELECT {', '.join(MATCHUP_COLUMNS)} FROM team_matchup_stats"
+MATCHUPS_QUERY = MATCHUP_SELECT + " ORDER BY team_name, opp_team_name"
+# Both directions of every matchup of a team (the opp_team_name index serves the second half)
+TEAM_MATCHUPS_QUERY = MATCHUP_SELECT + """
+    WHERE team_name = %(team_name)s OR opp_team_name = %(team_name)s
+    ORDER BY team_name, opp_team_name
+"""
+PAIR_MATCHUP_QUERY = MATCHUP_SELECT + """
+    WHERE (team_name, opp_team_name) IN ((%(team_name)s, %(opponent)s), (%(opponent)s, %(team_name)s))
+    ORDER BY team_name, opp_team_name
+"""
+
+def matchup_query(team_name, opponent=None):
+    """(query, params) for every opponent of team_name, or just the one pair"""
+    params = {"team_name": team_name, "opponent": opponent}
+    return (PAIR_MATCHUP_QUERY if opponent else TEAM_MATCHUPS_QUERY), params
+
+def matchup_pairs(rows, team_name):
+    """Pair up rows by opponent: the team's totals against it and its totals against the team"""
+    pairs = {}
+    for row in rows:
+        if row['team_name'] == team_name:
+            pairs.setdefault(row['opp_team_name'], {})['team'] = row
+        elif row['opp_team_name'] == team_name:
+            pairs.setdefault(row['team_name'], {})['opponent'] = row
+    return [{"opp_team_name": opponent, "team": sides.get('team'), "opponent": sides.get('opponent')}
+            for opponent, sides in sorted(pairs.items())]
+
+
+# Bulk export (/api/export/...): filtered events or a whole aggregate table as Arrow / Parquet
+# (see export.py). Text columns come out as dimension keys and are decoded by the client
+# through the dictionaries, so no per-row strings are built.
+EXPORT_FORMATS = ('arrow', 'parquet')
+
+# (column, expression over play_by_play_events e, type); a type naming a dimension table
+# means a dictionary-encoded string column keyed by that table's ids
+EXPORT_EVENT_COLUMNS = [
+    ('id', 'e.id', 'int32'),
+    ('game_date', 'e.game_date', 'date32'),
+    ('season_year', 'e.season_year', 'int16'),
+    ('team_name', 'e.team_id', 'teams'),
+    ('opp_team_name', 'e.opp_team_id', 'teams'),
+    ('venue', 'e.venue_id', 'labels'),
+    ('period', 'e.period', 'int16'),
+    ('clock_seconds', 'e.clock_seconds', 'int16'),
+    ('situation_type', 'e.situation_id', 'labels'),
+    ('goals_for', 'e.goals_for', 'int16'),
+    ('goals_against', 'e.goals_against', 'int16'),
+    ('player_name', 'e.player_id', 'players'),
+    ('event', 'e.event_id', 'events'),
+    ('event_successful', 'e.event_successful', 'bool'),
+    ('x_coord', 'e.x_coord', 'float64'),
+    ('y_coord', 'e.y_coord', 'float64'),
+    ('event_type', 'e.event_type_id', 'labels'),
+    ('player_name_2', 'e.player_2_id', 'players'),
+    ('x_coord_2', 'e.x_coord_2', 'float64'),
+    ('y_coord_2', 'e.y_coord_2', 'float64'),
+    ('event_detail_1', 'e.event_detail_1_id', 'labels'),
+    ('event_detail_2', 'e.event_detail_2_id', 'labels'),
+    ('event_detail_3', 'e.event_detail_3_id', 'labels'),
+    ('game_id', 'e.game_id', 'int32'),
+]
+
+# Dimension table -> query for its (id, value) pairs
+EXPORT_DICTIONARIES = {
+    'teams': "SELECT team_id, team_name FROM teams",
+    'players': "SELECT player_id, player_name FROM players",
+    'events': "SELECT event_id, event FROM events",
+    'labels': "SELECT label_id, label FROM labels",
+}
+
+# Rows come in storage order (season partition by partition): sorting would cost the
+# whole-table sort the export is meant to avoid
+EXPORT_EVENTS_SELECT = f"""
+    SELECT {', '.join(expression for _, expression, _ in EXPORT_EVENT_COLUMNS)}
+    FROM play_by_play_events e
+    WHERE 1=1
+"""
+
+EXPORT_TABLES = {
+    'games': GAMES_SELECT + " ORDER BY g.game_id",
+    'player_game_stats': "SELECT * FROM player_game_stats ORDER BY player_name, team_name, game_date",
+    'team_game_stats': "SELECT * FROM team_game_stats ORDER BY team_name, game_date",
+    'possessions': "SELECT * FROM possessions ORDER BY game_id, possession_no",
+    'shot_chains': "SELECT * FROM shot_chains ORDER BY game_id, shot_event_id",
+    'player_split_stats': "SELECT * FROM player_split_stats ORDER BY split, split_value, player_name, team_name",
+    'team_matchup_stats': MATCHUPS_QUERY,
+}
+
+def export_params(args):
+    """(format, filters) for /api/export/events; filters are play_by_play columns plus a game_date range (raises ValueError with the message for the client)"""
+    export_format = args.get('format', 'arrow')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    try:
+        date_from = datetime.date.fromisoformat(args['date_from']) if args.get('date_from') else None
+        date_to = datetime.date.fromisoformat(args['date_to']) if args.get('date_to') else None
+    except ValueError:
+        raise ValueError("date_from and date_to must be dates (YYYY-MM-DD)")
+    
+    filters = {
+        "team_name": args.get('team') or None,
+        "player_name": args.get('player') or None,
+        "event": args.get('event') or None,
+        "season_year": season_param(args),
+        "date_from": date_from,
+        "date_to": date_to
+    }
+    return export_format, filters
+
+def export_events_query(filters):
+    """(query, params) for the filtered events export, same filters as events_query plus a date range"""
+    query = EXPORT_EVENTS_SELECT
+    params = []
+    conditions = {
+        "team_name": " AND e.team_id = (SELECT team_id FROM teams WHERE team_name = %s)",
+        "player_name": " AND e.player_id = (SELECT player_id FROM players WHERE player_name = %s)",
+        "event": " AND e.event_id = (SELECT event_id FROM events WHERE event = %s)",
+        "season_year": " AND e.season_year = %s",
+        "date_from": " AND e.game_date >= %s",
+        "date_to": " AND e.game_date <= %s",
+    }
+    for name, condition in conditions.items():
+        if filters[name] is not None:
+            query += condition
+            params.append(filters[name])
+    return query, params
+
+
+# Search / autocomplete (/api/search) over the search_names dictionary (lib/search.py)
+# Ranked by match quality (name prefix, word prefix, substring, then fuzzy) and then by
+# activity, so "poul" finds Poulin before a rarely seen namesake.
+DEFAULT_SEARCH_LIMIT = 8
+MAX_SEARCH_LIMIT = 25
+MAX_SEARCH_LENGTH = 100
+SEARCH_KINDS = ('player', 'team')
+FUZZY_THRESHOLD = 0.6  # pg_trgm's default word_similarity_threshold (the <% operator)
+
+SEARCH_QUERY = """
+    SELECT kind, name, team_name, event_count
+    FROM (
+        SELECT 
+            kind, name, team_name, event_count,
+            CASE
+                WHEN search_key LIKE %(prefix)s THEN 0
+                WHEN ' ' || search_key LIKE %(word_prefix)s THEN 1
+                WHEN search_key LIKE %(contains)s THEN 2
+                ELSE 3
+            END as match_rank,
+            word_similarity(%(q)s, search_key) as score
+        FROM search_names
+        WHERE (search_key LIKE %(contains)s OR %(q)s <%% search_key)
+        AND (%(kind)s::varchar IS NULL OR kind = %(kind)s)
+    ) matches
+    ORDER BY match_rank, score DESC, event_count DESC, name
+    LIMIT %(limit)s
+"""
+
+def like_escape(text):
+    """text with LIKE wildcards escaped (backslash is the default escape character)"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_params(args):
+    """(q, kind, limit) for /api/search, q lowercased and trimmed (raises ValueError with the message for the client)"""
+    q = ' '.join(args.get('q', '').lower().split())
+    kind = args.get('type') or None
+    try:
+        limit = int(args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be a number")
+    
+    if kind is not None and kind not in SEARCH_KINDS:
+        raise ValueError(f"type must be one of: {', '.join(SEARCH_KINDS)}")
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    if len(q) > MAX_SEARCH_LENGTH:
+        raise ValueError(f"q must be at most {MAX_SEARCH_LENGTH} characters")
+    return q, kind, limit
+
+def search_query_params(q, kind, limit):
+    """Named parameters for SEARCH_QUERY"""
+    escaped = like_escape(q)
+    return {
+        "q": q,
+        "kind": kind,
+        "limit": limit,
+        "prefix": escaped + '%',
+        "word_prefix": '% ' + escaped + '%',
+        "contains": '%' + escaped + '%'
+    }
+
+
+# Batch endpoint (/api/batch)
+# Sub-queries of one kind share a single statement over all their names (= ANY(%s)),
+# with every row tagged by batch_key so it can be handed back to the right sub-query
+MAX_BATCH_QUERIES = 50
+
+# Sub-query type -> optional parts it can include (the summary is always returned)
+BATCH_TYPES = {
+    "player": {"games", "events", "team_averages"},
+    "team": {"games", "events", "averages"},
+    "team_averages": set(),
+}
+BATCH_DEFAULT_INCLUDE = {"player": ["games", "events"], "team": ["games", "events"], "team_averages": []}
+
+# What the averages query returns for a team with no players
+EMPTY_TEAM_AVERAGES = {"total_players": 0, "avg_goals": None, "avg_shots": None,
+                       "avg_shooting_pct": None, "avg_pass_completion_pct": None}
+
+# TEAM_AVERAGES_QUERY per team, for the requested teams and the teams of the requested players
+TEAM_AVERAGES_BATCH_QUERY = """
+    SELECT 
+        team_name AS batch_key,
+        COUNT(DISTINCT player_name) as total_players,
+        AVG(goals_per_player)::float8 as avg_goals,
+        AVG(shots_per_player)::float8 as avg_shots,
+        AVG(shooting_pct) as avg_shooting_pct,
+        AVG(pass_completion_pct) as avg_pass_completion_pct
+    FROM (
+        SELECT 
+            team_name,
+            player_name,
+            SUM(goals) as goals_per_player,
+            SUM(shots) as shots_per_player,
+            CASE 
+                WHEN (SUM(goals) + SUM(shots)) > 0
+                THEN (SUM(goals)::float / (SUM(goals) + SUM(shots))) * 100
+                ELSE 0
+            END as shooting_pct,
+            CASE 
+                WHEN (SUM(successful_passes) + SUM(incomplete_passes)) > 0
+                THEN (SUM(successful_passes)::float / (SUM(successful_passes) + SUM(incomplete_passes))) * 100
+                ELSE 0
+            END as pass_completion_pct
+        FROM player_game_stats
+        WHERE player_name IS NOT NULL
+        AND (team_name = ANY(%s)
+             OR team_name IN (SELECT team_name FROM player_game_stats WHERE player_name = ANY(%s)))
+        GROUP BY team_name, player_name
+    ) player_stats
+    GROUP BY team_name
+"""
+
+def batch_params(body):
+    """Validated {key: {"type", "name", "include"}} from a /api/batch body (raises ValueError with the message for the client)"""
+    if not isinstance(body, dict) or not isinstance(body.get('queries'), dict):
+        raise ValueError('body must be a JSON object with a "queries" object')
+    
+    queries = body['queries']
+    if not queries:
+        raise ValueError("queries cannot be empty")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise ValueError(f"at most {MAX_BATCH_QUERIES} queries per batch")
+    
+    subqueries = {}
+    for key, sub in queries.items():
+        if not isinstance(sub, dict) or sub.get('type') not in BATCH_TYPES:
+            raise ValueError(f"{key}: type must be one of {', '.join(BATCH_TYPES)}")
+        if not isinstance(sub.get('name'), str) or not sub['name']:
+            raise ValueError(f"{key}: name is required")
+        include = sub.get('include', BATCH_DEFAULT_INCLUDE[sub['type']])
+        if not isinstance(include, list) or not set(include) <= BATCH_TYPES[sub['type']]:
+            allowed = ', '.join(sorted(BATCH_TYPES[sub['type']])) or 'nothing'
+            raise ValueError(f"{key}: include can only list {allowed}")
+        subqueries[key] = {"type": sub['type'], "name": sub['name'], "include": set(include)}
+    return subqueries
+
+def batch_statements(subqueries):
+    """(section, query, params) for every statement a batch needs, at most one per section"""
+    def names(kind, part=None):
+        return sorted({sub['name'] for sub in subqueries.values()
+                       if sub['type'] == kind and (part is None or part in sub['include'])})
+    
+    statements = []
+    for kind, summary, games, events in (
+            ('player', PLAYER_SUMMARY_BATCH_QUERY, PLAYER_GAMES_BATCH_QUERY, PLAYER_EVENTS_BATCH_QUERY),
+            ('team', TEAM_SUMMARY_BATCH_QUERY, TEAM_GAMES_BATCH_QUERY, TEAM_EVENTS_BATCH_QUERY)):
+        for section, query, selected in ((f"{kind}_summary", summary, names(kind)),
+                                         (f"{kind}_games", games, names(kind, 'games')),
+                                         (f"{kind}_events", events, names(kind, 'events'))):
+            if selected:
+                statements.append((section, query, (selected,)))
+    
+    average_teams = sorted(set(names('team', 'averages')) | set(names('team_averages')))
+    average_players = names('player', 'team_averages')
+    if average_teams or average_players:
+        statements.append(("team_averages", TEAM_AVERAGES_BATCH_QUERY, (average_teams, average_players)))
+    return statements
+
+def group_batch_rows(rows):
+    """{batch_key: [rows without batch_key]}, keeping the statement's row order"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.pop('batch_key'), []).append(row)
+    return grouped
+
+def batch_results(subqueries, rows):
+    """(results, errors) keyed like the request, from {section: {name: [rows]}}"""
+    def section(name, key):
+        return rows.get(name, {}).get(key, [])
+    
+    def averages(team_name):
+        found = section('team_averages', team_name)
+        return found[0] if found else dict(EMPTY_TEAM_AVERAGES)
+    
+    results = {}
+    errors = {}
+    for key, sub in subqueries.items():
+        kind, name, include = sub['type'], sub['name'], sub['include']
+        if kind == 'team_averages':
+            results[key] = averages(name)
+            continue
+        
+        summary = section(f"{kind}_summary", name)
+        if not summary:
+            errors[key] = {"error": f"{kind.capitalize()} not found", "status": 404}
+            continue
+        
+        # Same shape as /api/players/<name> and /api/teams/<name>, minus parts not asked for
+        result = {kind: summary[0]}
+        if 'games' in include:
+            result['games'] = section(f"{kind}_games", name)
+        if 'events' in include:
+            result['events'] = section(f"{kind}_events", name)
+            result['events_count'] = len(result['events'])
+        if 'team_averages' in include:
+            result['team_averages'] = averages(summary[0]['team_name'])
+        if 'averages' in include:
+            result['averages'] = averages(name)
+        results[key] = result
+    return results, errors
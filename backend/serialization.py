@@ -0,0 +1,77 @@
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from functools import lru_cache
+from werkzeug.http import http_date
+import datetime
+import numpy as np
+import os
+
+try:
+    import orjson
+except ImportError:  # Optional: without it the app keeps Flask's json module
+    orjson = None
+
+# JSON serializer: "orjson" (default when installed) or "stdlib" for Flask's own provider.
+# Both send compact, key-sorted UTF-8 with the same values. Queries return floats rather than
+# NUMERIC, so nothing goes through a Python hook per value except dates (below) and NumPy
+# arrays orjson can't take as is. One difference remains: orjson writes NaN as null, the stdlib
+# as a bare NaN (not valid JSON), so payloads must carry None for missing floats.
+JSON_SERIALIZER = os.getenv('JSON_SERIALIZER', 'orjson' if orjson is not None else 'stdlib')
+
+# Date format: "http" (default) keeps what Flask has always sent ("Sat, 12 Feb 2022 00:00:00 GMT"),
+# formatted in Python once per distinct date. "iso" sends "2022-02-12", which orjson writes natively.
+JSON_DATES = os.getenv('JSON_DATES', 'http')
+if JSON_DATES not in ('http', 'iso'):
+    raise RuntimeError("JSON_DATES must be http or iso")
+
+
+@lru_cache(maxsize=8192)
+def format_date(value):
+    """Dates repeat on every row of a game, so each one is formatted once"""
+    return http_date(value)
+
+
+def json_default(value):
+    """Types orjson hands back: DATE in the http format, NumPy values, and any stray NUMERIC (as Flask sends it)"""
+    if isinstance(value, datetime.date):  # datetime too, a subclass
+        return format_date(value) if JSON_DATES == 'http' else value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (np.ndarray, np.generic)):  # arrays orjson can't take as is (e.g. memmap slices)
+        return value.tolist()
+    return DefaultJSONProvider.default(value)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson (in Rust) straight to bytes"""
+
+    if orjson is not None:
+        OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if JSON_DATES == 'http':
+            OPTIONS |= orjson.OPT_PASSTHROUGH_DATETIME  # orjson would write ISO dates itself
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=json_default, option=self.OPTIONS)
+
+    def dumps(self, obj, **kwargs):
+        # Formatting arguments (indent, separators) are ignored: output is always compact
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """jsonify without the str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def configure_json(app):
+    """Install the configured serializer on app"""
+    if JSON_SERIALIZER == 'orjson':
+        if orjson is None:
+            raise RuntimeError("JSON_SERIALIZER=orjson needs the orjson package")
+        app.json = OrjsonProvider(app)
+    else:
+        app.json.default = json_default  # same dates as orjson, plus NumPy values
+        app.json.ensure_ascii = False  # raw UTF-8 like orjson, not \u escapes
@@ -0,0 +1,38 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# Tests run against the in-memory backend (DATA_BACKEND=memory) on the bundled CSV, no Postgres needed.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(BACKEND_DIR, '..', 'misc', 'pxp_womens_oly_2022_v2.csv')
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DATA_BACKEND', 'memory')
+os.environ.setdefault('MEMORY_STORE_CSV', CSV_PATH)
+os.environ.setdefault('WARMUP_ENABLED', '0')
+
+from csv_schema import CSV_READ_OPTIONS, coerce_chunk  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture(scope='session')
+def store(app):
+    from app import memory_store
+    return memory_store
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def pbp():
+    """The CSV typed the way the loaders type it, what play_by_play holds"""
+    return coerce_chunk(pd.read_csv(CSV_PATH, **CSV_READ_OPTIONS))
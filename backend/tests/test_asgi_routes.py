@@ -0,0 +1,46 @@
+import ast
+import os
+
+# asgi_app.py serves app.py's Postgres read routes. Its routes are read from the source
+# (quart needn't be installed) and compared with app.url_map.
+ASGI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'asgi_app.py')
+
+# Routes only app.py has (see the header of asgi_app.py)
+APP_ONLY_ROUTES = {
+    '/api/ready',
+    '/api/cache/stats',
+    '/metrics',
+    '/api/metrics/queries',
+    '/api/export/events',
+    '/api/export/<table_name>',
+    '/api/games/<int:game_id>/tracking',
+    '/api/games/<int:game_id>/tracking/frames',
+    '/api/games/<int:game_id>/tracking/events/<int:event_id>',
+}
+
+
+def asgi_routes():
+    """{rule: methods} from the @app.route decorators of asgi_app.py"""
+    routes = {}
+    for node in ast.walk(ast.parse(open(ASGI_PATH).read())):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if isinstance(decorator, ast.Call) and getattr(decorator.func, 'attr', None) == 'route':
+                methods = {k.arg: ast.literal_eval(k.value) for k in decorator.keywords}.get('methods', ['GET'])
+                routes[ast.literal_eval(decorator.args[0])] = set(methods)
+    return routes
+
+
+def flask_routes(app):
+    return {rule.rule: rule.methods - {'HEAD', 'OPTIONS'}
+            for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+
+
+def test_asgi_routes_match_app(app):
+    expected = {rule: methods for rule, methods in flask_routes(app).items() if rule not in APP_ONLY_ROUTES}
+    assert asgi_routes() == expected
+
+
+def test_app_only_routes_exist(app):
+    assert APP_ONLY_ROUTES <= set(flask_routes(app))
@@ -0,0 +1,51 @@
+import re
+import pytest
+import queries
+from queries import batch_params, batch_statements
+
+# Each *_BATCH_QUERY is its single-name query over a list of names plus batch_key
+
+
+def select_list(query):
+    columns = re.search(r"SELECT(.*?)\bFROM\b", query, re.S).group(1)
+    return [line.strip().rstrip(',') for line in columns.splitlines()
+            if line.strip() and not line.strip().startswith('--')]
+
+
+@pytest.mark.parametrize("name, column", [
+    ('PLAYER_SUMMARY', 'player_name'), ('PLAYER_GAMES', 'player_name'), ('PLAYER_EVENTS', 'player_name'),
+    ('TEAM_SUMMARY', 'team_name'), ('TEAM_GAMES', 'team_name'), ('TEAM_EVENTS', 'team_name'),
+])
+def test_batch_query_matches_single_query(name, column):
+    single = getattr(queries, f"{name}_QUERY")
+    batch = getattr(queries, f"{name}_BATCH_QUERY")
+    assert select_list(batch) == [f"{column} AS batch_key"] + select_list(single)
+    assert f"{column} = ANY(%s)" in batch and f"{column} = %s" not in batch
+
+
+def test_batch_statements_one_per_section():
+    subqueries = batch_params({"queries": {
+        "a": {"type": "player", "name": "Sarah Nurse"},
+        "b": {"type": "player", "name": "Marie-Philip Poulin", "include": ["team_averages"]},
+        "c": {"type": "team", "name": "Olympic (Women) - Canada", "include": ["averages"]},
+    }})
+    statements = {section: params for section, _, params in batch_statements(subqueries)}
+    assert statements == {
+        "player_summary": (["Marie-Philip Poulin", "Sarah Nurse"],),
+        "player_games": (["Sarah Nurse"],),
+        "player_events": (["Sarah Nurse"],),
+        "team_summary": (["Olympic (Women) - Canada"],),
+        "team_averages": (["Olympic (Women) - Canada"], ["Marie-Philip Poulin"]),
+    }
+
+
+def test_batch_route(client):
+    response = client.post('/api/batch', json={"queries": {
+        "team": {"type": "team", "name": "Olympic (Women) - Canada", "include": []},
+        "missing": {"type": "player", "name": "Nobody"},
+    }})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["results"]["team"]["team"]["team_name"] == "Olympic (Women) - Canada"
+    assert body["errors"]["missing"]["status"] == 404
+    assert client.post('/api/batch', json={"queries": {}}).status_code == 400
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from queries import NET_X, NET_Y, SLOT, heatmap_bins, matchup_pairs, timeline_points
+
+# The memory store (columnar.py) answers the same routes as the SQL in queries.py and
+# lib/*.py. These checks recompute a few of those queries with pandas straight from the
+# SQL definitions (COUNTER_COLUMNS, PLAYERS_QUERY, TEAM_AVERAGES_QUERY, MATCHUPS_INSERT)
+# and compare, so the two backends can't drift apart unnoticed.
+
+
+def counters(df):
+    shot, play = df['event'] == 'Shot', df['event'] == 'Play'
+    success = df['event_successful'] == True  # noqa: E712 (NULL counts as neither)
+    failure = df['event_successful'] == False  # noqa: E712
+    return df.assign(goals=shot & success, shots=shot & failure,
+                     successful_passes=play & success, incomplete_passes=play & failure)
+
+
+@pytest.fixture(scope='module')
+def player_games(pbp):
+    """player_game_stats"""
+    rows = counters(pbp.dropna(subset=['player_name', 'team_name', 'opp_team_name']))
+    return rows.groupby(['player_name', 'team_name', 'game_date', 'opp_team_name'])[
+        ['goals', 'shots', 'successful_passes', 'incomplete_passes']].sum().reset_index()
+
+
+def test_players(store, player_games):
+    expected = player_games.groupby(['player_name', 'team_name']).agg(
+        games_played=('game_date', 'nunique'), goals=('goals', 'sum'),
+        successful_plays=('successful_passes', 'sum'), shots=('shots', 'sum')).reset_index()
+    expected = sorted(expected.to_dict('records'), key=lambda r: (r['player_name'], r['team_name']))
+    actual = sorted(store.players(), key=lambda r: (r['player_name'], r['team_name']))
+    assert actual == expected
+
+
+def test_team_averages(store, player_games):
+    for team_name, games in player_games.groupby('team_name'):
+        players = games.groupby('player_name')[['goals', 'shots', 'successful_passes', 'incomplete_passes']].sum()
+        attempts = players['goals'] + players['shots']
+        passes = players['successful_passes'] + players['incomplete_passes']
+        actual = store.team_averages(team_name)
+        assert actual['total_players'] == len(players)
+        assert actual['avg_goals'] == pytest.approx(players['goals'].mean())
+        assert actual['avg_shots'] == pytest.approx(players['shots'].mean())
+        assert actual['avg_shooting_pct'] == pytest.approx(
+            (players['goals'] / attempts * 100).where(attempts > 0, 0).mean())
+        assert actual['avg_pass_completion_pct'] == pytest.approx(
+            (players['successful_passes'] / passes * 100).where(passes > 0, 0).mean())
+
+
+def test_matchups(store, pbp):
+    rows = pbp.dropna(subset=['team_name', 'opp_team_name'])
+    shots = rows[(rows['event'] == 'Shot') & rows['x_coord'].notna() & rows['y_coord'].notna()]
+    x_min, x_max, y_min, y_max = SLOT
+    matchups = store.matchups()
+    assert len(matchups) == rows.groupby(['team_name', 'opp_team_name']).ngroups
+    for row in matchups:
+        pair = rows[(rows['team_name'] == row['team_name']) & (rows['opp_team_name'] == row['opp_team_name'])]
+        pair_shots = shots[(shots['team_name'] == row['team_name']) & (shots['opp_team_name'] == row['opp_team_name'])]
+        success = pair['event_successful'] == True  # noqa: E712
+        assert row['total_events'] == len(pair)
+        assert row['goals'] == int(((pair['event'] == 'Shot') & success).sum())
+        assert row['shot_attempts'] == int((pair['event'] == 'Shot').sum())
+        assert row['located_shot_attempts'] == len(pair_shots)
+        in_slot = pair_shots['x_coord'].between(x_min, x_max) & pair_shots['y_coord'].between(y_min, y_max)
+        assert row['slot_shot_attempts'] == int(in_slot.sum())
+        # ROUND(AVG(...), 2): equal up to the last rounded digit
+        distance = np.sqrt((NET_X - pair_shots['x_coord']) ** 2 + (NET_Y - pair_shots['y_coord']) ** 2)
+        assert row['avg_shot_x'] == pytest.approx(pair_shots['x_coord'].mean(), abs=0.0051)
+        assert row['avg_shot_distance'] == pytest.approx(distance.mean(), abs=0.0051)
+
+    # Both directions of every pair, as /api/teams/<team_name>/matchups pairs them
+    canada = 'Olympic (Women) - Canada'
+    for pair in matchup_pairs(store.matchups(canada), canada):
+        assert pair['team']['team_name'] == canada and pair['opponent']['team_name'] == pair['opp_team_name']
+
+
+def test_timeline_covers_every_event(store):
+    for game_id in np.unique(store.game_ids).tolist()[:3]:
+        game, events = store.game(game_id)
+        points = timeline_points(store.timeline(game_id, 60), 60)
+        assert sum(p['home_events'] + p['away_events'] for p in points) == sum(e['venue'] in ('home', 'away') for e in events)
+        assert [p['elapsed'] for p in points] == sorted(p['elapsed'] for p in points)
+
+
+def test_heatmap_counts_located_events(store, pbp):
+    filters = {"team_name": None, "player_name": None, "event": None, "period": None,
+               "season_year": None, "situation_type": None}
+    bins = heatmap_bins(store.heatmap(filters, 10, 20, 9), vectors=False)
+    located = pbp['x_coord'].notna() & pbp['y_coord'].notna()
+    assert sum(b['count'] for b in bins) == int(located.sum())
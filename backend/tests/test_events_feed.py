@@ -0,0 +1,79 @@
+import base64
+import datetime
+import json
+import pytest
+from columnar import ColumnStore
+from queries import FEED_NULL_CLOCK, FEED_NULL_DATE, FEED_NULL_PERIOD, decode_cursor, encode_cursor, page_params
+
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    event = {"game_date": datetime.date(2022, 2, 8), "period": 2, "clock_seconds": 754, "id": 1234}
+    assert decode_cursor(encode_cursor(event)) == [datetime.date(2022, 2, 8), -2, 754, -1234]
+
+
+def test_cursor_null_keys():
+    event = {"game_date": None, "period": None, "clock_seconds": None, "id": 7}
+    assert decode_cursor(encode_cursor(event)) == [FEED_NULL_DATE, -FEED_NULL_PERIOD, FEED_NULL_CLOCK, -7]
+
+
+@pytest.mark.parametrize("bad", [
+    "not a cursor!",
+    token(["2022-02-08", 1, 100]),
+    token(["2022-02-08", "1", 100, 5]),
+    token(["08/02/2022", 1, 100, 5]),
+    token({"game_date": "2022-02-08"}),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_invalid_cursor(bad, client):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+    with pytest.raises(ValueError, match="invalid cursor"):
+        page_params({"cursor": bad})
+    assert client.get('/api/events', query_string={"cursor": bad}).status_code == 400
+
+
+def test_cursor_and_offset_conflict(client):
+    response = client.get('/api/events', query_string={"cursor": token(["2022-02-08", 1, 100, 5]), "offset": 10})
+    assert response.status_code == 400
+
+
+@pytest.fixture(scope='module')
+def null_store(pbp):
+    """A few games with some dates, periods and clocks blanked out"""
+    df = pbp.head(400).copy()
+    df.loc[df.index[5:15], 'game_date'] = None
+    df.loc[df.index[100:110], 'period'] = None
+    df.loc[df.index[200:210], 'clock_seconds'] = None
+    df.loc[df.index[300:302], ['game_date', 'period', 'clock_seconds']] = None
+    return ColumnStore(df)
+
+
+def test_cursor_pages_match_offset_pages(null_store):
+    everything = null_store.events(limit=1000)
+    assert len(everything) == 400
+
+    for limit in (1, 7, 50):
+        seen, cursor_params = [], None
+        while True:
+            page = null_store.events(limit=limit, cursor_params=cursor_params)
+            seen.extend(page)
+            if len(page) < limit:
+                break
+            cursor_params = decode_cursor(encode_cursor(page[-1]))
+        assert [e['id'] for e in seen] == [e['id'] for e in everything]
+
+
+def test_null_keys_sort_last(null_store):
+    feed = null_store.events(limit=1000)
+    dates = [e['game_date'] for e in feed]
+    first_null = dates.index(None)
+    assert all(d is not None for d in dates[:first_null]) and all(d is None for d in dates[first_null:])
+    # Within a date, a NULL period comes after the numbered ones
+    dated = [e for e in feed if e['game_date'] is not None]
+    for previous, event in zip(dated, dated[1:]):
+        if previous['game_date'] == event['game_date'] and previous['period'] is None:
+            assert event['period'] is None
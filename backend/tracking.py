@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+from queries import PERIOD_SECONDS
+
+# Broadcast tracking data: per-frame player and puck positions, written per game by
+# lib/load_tracking.py as plain NumPy column files under TRACKING_DIR/<game_id>/ and read
+# back memory-mapped, so a frame range is a slice of each column (no copy, no SQL).
+#
+# Frames are ordered by game time (period, then clock counting down, then clip and source
+# frame). Frame columns have one value per frame; position columns one value per tracked
+# object per frame, the rows of frame i being frame_rows[i]:frame_rows[i + 1]. Each frame
+# is linked to the nearest play-by-play event of its period (event_id, event_gap =
+# seconds from that event to the frame).
+
+TRACKING_DIR = os.getenv('TRACKING_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracking_data'))
+
+FRAME_COLUMNS = {
+    'clip': np.int16,             # source file the frame came from, in load order
+    'source_frame_id': np.int32,  # frame number within its clip
+    'period': np.int8,
+    'clock_seconds': np.float32,
+    'elapsed': np.float64,        # seconds since the start of the game, what ranges are searched on
+    'event_id': np.int32,         # nearest play_by_play event in the period (-1 if none)
+    'event_gap': np.float32,      # NaN if none (null in the API)
+}
+POSITION_COLUMNS = {
+    'track_id': np.int32,
+    'team': np.int8,              # index into the game's teams, -1 for the puck / unassigned tracks
+    'jersey_number': np.int16,    # -1 if unknown
+    'x': np.float32,              # as given in the source files
+    'y': np.float32,
+}
+EVENT_COLUMNS = {'event_ids': np.int32, 'event_elapsed': np.float64}  # the game's events, by id
+
+DEFAULT_TRACKING_FRAMES = 300
+MAX_TRACKING_FRAMES = 3000
+DEFAULT_EVENT_WINDOW = 2.0  # seconds of frames either side of an event
+MAX_EVENT_WINDOW = 30.0
+
+
+def elapsed_seconds(period, clock_seconds):
+    """Game time for (period, clock counting down from PERIOD_SECONDS)"""
+    return (np.asarray(period, dtype=np.float64) - 1) * PERIOD_SECONDS + (PERIOD_SECONDS - np.asarray(clock_seconds, dtype=np.float64))
+
+
+def link_events(frame_period, frame_elapsed, events):
+    """(event_id, event_gap) of the nearest event in the same period for every frame; events has id, period, clock_seconds"""
+    event_id = np.full(len(frame_elapsed), -1, dtype=np.int32)
+    event_gap = np.full(len(frame_elapsed), np.nan, dtype=np.float32)
+    for period in np.unique(frame_period):
+        in_period = events[events['period'] == period]
+        if in_period.empty:
+            continue
+        # Play order: clock DESC, id ASC, so the earlier event wins a tie
+        in_period = in_period.sort_values(['clock_seconds', 'id'], ascending=[False, True])
+        times = elapsed_seconds(in_period['period'].to_numpy(), in_period['clock_seconds'].to_numpy())
+        ids = in_period['id'].to_numpy()
+        rows = np.flatnonzero(frame_period == period)
+        t = frame_elapsed[rows]
+        after = np.clip(np.searchsorted(times, t, side='right'), 0, len(times) - 1)
+        before = np.clip(after - 1, 0, len(times) - 1)
+        nearest = np.where(np.abs(t - times[before]) <= np.abs(times[after] - t), before, after)
+        event_id[rows] = ids[nearest]
+        event_gap[rows] = t - times[nearest]
+    return event_id, event_gap
+
+
+def build_game(positions, events):
+    """
+    Frame, position and event columns for one game
+    positions: one row per tracked object per frame with clip, source_frame_id, period, clock_seconds,
+    track_id, team_name (None for the puck), jersey_number, x, y. events: the game's id, period, clock_seconds.
+    """
+    teams = sorted(positions['team_name'].dropna().unique())
+    elapsed = elapsed_seconds(positions['period'].to_numpy(), positions['clock_seconds'].to_numpy())
+    order = np.lexsort((positions['track_id'].to_numpy(), positions['source_frame_id'].to_numpy(),
+                        positions['clip'].to_numpy(), elapsed))
+    positions = positions.iloc[order]
+    elapsed = elapsed[order]
+
+    clip = positions['clip'].to_numpy()
+    source_frame_id = positions['source_frame_id'].to_numpy()
+    new_frame = np.ones(len(positions), dtype=bool)
+    new_frame[1:] = (clip[1:] != clip[:-1]) | (source_frame_id[1:] != source_frame_id[:-1])
+    starts = np.flatnonzero(new_frame)
+
+    frame_period = positions['period'].to_numpy()[starts]
+    event_id, event_gap = link_events(frame_period, elapsed[starts], events)
+    frames = {
+        'clip': clip[starts],
+        'source_frame_id': source_frame_id[starts],
+        'period': frame_period,
+        'clock_seconds': positions['clock_seconds'].to_numpy()[starts],
+        'elapsed': elapsed[starts],
+        'event_id': event_id,
+        'event_gap': event_gap,
+    }
+    team = positions['team_name'].map({name: i for i, name in enumerate(teams)}).fillna(-1)
+    rows = {
+        'track_id': positions['track_id'].to_numpy(),
+        'team': team.to_numpy(),
+        'jersey_number': positions['jersey_number'].fillna(-1).to_numpy(),
+        'x': positions['x'].to_numpy(),
+        'y': positions['y'].to_numpy(),
+    }
+    by_id = events.sort_values('id')
+    event_columns = {
+        'event_ids': by_id['id'].to_numpy(),
+        'event_elapsed': elapsed_seconds(by_id['period'].to_numpy(), by_id['clock_seconds'].to_numpy()),
+    }
+    return teams, frames, np.append(starts, len(positions)), rows, event_columns
+
+
+def write_game(game_id, teams, frames, frame_rows, rows, events, sources=()):
+    """Write a game's columns to TRACKING_DIR/<game_id>, replacing any earlier load of it"""
+    os.makedirs(TRACKING_DIR, exist_ok=True)
+    target = os.path.join(TRACKING_DIR, str(game_id))
+    staging = os.path.join(TRACKING_DIR, f".{game_id}.{uuid.uuid4().hex}")
+    os.makedirs(staging)
+    columns = [(frames, FRAME_COLUMNS), (rows, POSITION_COLUMNS), (events, EVENT_COLUMNS)]
+    for values, dtypes in columns:
+        for name, dtype in dtypes.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(values[name], dtype=dtype))
+    np.save(os.path.join(staging, "frame_rows.npy"), np.asarray(frame_rows, dtype=np.int64))
+    meta = {"game_id": game_id, "teams": list(teams), "frame_count": len(frames['elapsed']),
+            "row_count": len(rows['x']), "sources": [os.path.basename(s) for s in sources]}
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # Swap the whole directory in; readers holding the old files keep their mappings
+    if os.path.exists(target):
+        retired = f"{staging}.old"
+        os.rename(target, retired)
+        os.rename(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.rename(staging, target)
+    return meta
+
+
+class TrackingGame:
+    """One game's tracking columns, memory-mapped read-only"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        names = list(FRAME_COLUMNS) + list(POSITION_COLUMNS) + list(EVENT_COLUMNS) + ['frame_rows']
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in names}
+
+    @property
+    def frame_count(self):
+        return self.meta['frame_count']
+
+    def summary(self):
+        """Game-level description: teams, size and the stretches of each period that are covered"""
+        period, clock = self.columns['period'], self.columns['clock_seconds']
+        periods = []
+        for value in np.unique(period):
+            rows = np.flatnonzero(period == value)
+            periods.append({"period": int(value), "frames": len(rows),
+                            "clock_from": float(clock[rows[0]]), "clock_to": float(clock[rows[-1]]),
+                            "first_frame": int(rows[0]), "last_frame": int(rows[-1])})
+        return {**self.meta, "periods": periods}
+
+    def clock_range(self, period, clock_from, clock_to):
+        """[start, stop) of the frames in period with clock_from >= clock >= clock_to"""
+        elapsed = self.columns['elapsed']
+        start = np.searchsorted(elapsed, elapsed_seconds(period, clock_from), side='left')
+        stop = np.searchsorted(elapsed, elapsed_seconds(period, clock_to), side='right')
+        return int(start), int(max(stop, start))
+
+    def event_range(self, event_id, before, after):
+        """[start, stop) of the frames from before seconds ahead of the event to after seconds past it, None for an unknown event"""
+        ids = self.columns['event_ids']
+        pos = np.searchsorted(ids, event_id)
+        if pos >= len(ids) or ids[pos] != event_id:
+            return None
+        at = self.columns['event_elapsed'][pos]
+        elapsed = self.columns['elapsed']
+        return int(np.searchsorted(elapsed, at - before, side='left')), int(np.searchsorted(elapsed, at + after, side='right'))
+
+    def frames(self, start, stop, limit):
+        """Columnar payload for frames [start, stop), at most limit of them; columns are views of the mapped files"""
+        start = min(start, self.frame_count)
+        stop = max(min(stop, self.frame_count), start)
+        end = min(stop, start + limit)
+        offsets = self.columns['frame_rows'][start:end + 1]
+        first_row, last_row = int(offsets[0]), int(offsets[-1])
+        frames = {name: np.asarray(self.columns[name][start:end]) for name in FRAME_COLUMNS if name != 'elapsed'}
+        gap = frames['event_gap']
+        if np.isnan(gap).any():
+            # Frames of a period with no events have no gap: null, not NaN (which isn't valid JSON)
+            frames['event_gap'] = [None if np.isnan(v) else v for v in gap.tolist()]
+        frames['frame'] = np.arange(start, end)
+        frames['row_start'] = np.asarray(offsets[:-1]) - first_row
+        return {
+            "teams": self.meta['teams'],
+            "frames": frames,
+            "positions": {name: np.asarray(self.columns[name][first_row:last_row]) for name in POSITION_COLUMNS},
+            "count": end - start,
+            "next_frame": end if end < stop else None,
+        }
+
+
+_games = {}
+_games_lock = threading.Lock()
+
+
+def open_game(game_id):
+    """The mapped TrackingGame for game_id, or None if it has no tracking data; reopened after a reload"""
+    path = os.path.join(TRACKING_DIR, str(game_id))
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+    with _games_lock:
+        cached = _games.get(game_id)
+        if cached is None or cached[0] != inode:
+            cached = (inode, TrackingGame(path))
+            _games[game_id] = cached
+        return cached[1]
+
+
+def frame_range_params(args):
+    """(period, clock_from, clock_to, frame_from, frame_to, limit) for a tracking frame range (raises ValueError with the message for the client)"""
+    try:
+        period = args.get('period')
+        period = int(period) if period else None
+        clock_from = float(args.get('clock_from', PERIOD_SECONDS))
+        clock_to = float(args.get('clock_to', 0))
+        frame_from = int(args.get('frame_from', 0))
+        frame_to = args.get('frame_to')
+        frame_to = int(frame_to) if frame_to else None
+        limit = int(args.get('limit', DEFAULT_TRACKING_FRAMES))
+    except ValueError:
+        raise ValueError("period, clock_from, clock_to, frame_from, frame_to and limit must be numbers")
+
+    if limit < 1 or limit > MAX_TRACKING_FRAMES:
+        raise ValueError(f"limit must be between 1 and {MAX_TRACKING_FRAMES}")
+    if frame_from < 0 or (frame_to is not None and frame_to < frame_from):
+        raise ValueError("frame_from must be >= 0 and frame_to >= frame_from")
+    if clock_from < clock_to:
+        raise ValueError("clock_from must be >= clock_to (the clock counts down)")
+    return period, clock_from, clock_to, frame_from, frame_to, limit
+
+
+def event_window_params(args):
+    """(before, after, limit) for the frames around an event (raises ValueError with the message for the client)"""
+    try:
+        before = float(args.get('before', DEFAULT_EVENT_WINDOW))
+        after = float(args.get('after', DEFAULT_EVENT_WINDOW))
+        limit = int(args.get('limit', MAX_TRACKING_FRAMES))
+    except ValueError:
+        raise ValueError("before, after and limit must be numbers")
+
+    if not (0 <= before <= MAX_EVENT_WINDOW and 0 <= after <= MAX_EVENT_WINDOW):
+        raise ValueError(f"before and after must be between 0 and {MAX_EVENT_WINDOW:g} seconds")
+    if limit < 1 or limit > MAX_TRACKING_FRAMES:
+        raise ValueError(f"limit must be between 1 and {MAX_TRACKING_FRAMES}")
+    return before, after, limit
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import os
+import threading
+import time
+
+# Cache warming: once a worker has loaded the app (gunicorn's post_worker_init, see gunicorn.conf.py),
+# replay the hot requests through the app itself so their responses land in this worker's
+# response cache (compressed for the encoding the frontend asks for) and the pool has
+# open connections. /api/ready answers 503 until that's done, so a load balancer only
+# sends users to warm workers.
+
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1').lower() not in ('0', 'false', 'no')
+# Comma-separated paths warmed first; the detail pages of the top players / teams follow
+WARMUP_PATHS = [path.strip() for path in os.getenv(
+    'WARMUP_PATHS', '/api/teams,/api/teams/stats,/api/players,/api/games'
+).split(',') if path.strip()]
+WARMUP_TOP_PLAYERS = int(os.getenv('WARMUP_TOP_PLAYERS', 20))
+WARMUP_TOP_TEAMS = int(os.getenv('WARMUP_TOP_TEAMS', 10))
+WARMUP_CONCURRENCY = int(os.getenv('WARMUP_CONCURRENCY', 4))
+# What Node's fetch sends from the Next.js proxy routes, so the compressed copy it gets is precomputed
+WARMUP_ACCEPT_ENCODING = os.getenv('WARMUP_ACCEPT_ENCODING', 'gzip, deflate, br')
+
+
+def player_page_batch(player_name):
+    """The /api/batch body the player page sends (getPlayerPage in frontend/lib/api.ts)"""
+    return {"queries": {"player": {"type": "player", "name": player_name,
+                                   "include": ["games", "events", "team_averages"]}}}
+
+_state = {"status": "pending", "pid": None, "started_at": None, "duration": None, "warmed": 0, "failed": []}
+_state_lock = threading.Lock()
+
+
+def warmup_status():
+    """Warming state of this process; ready is what /api/ready reports"""
+    with _state_lock:
+        state = dict(_state, failed=list(_state["failed"]))
+    if state["pid"] != os.getpid():
+        # Nothing started in this process (a fork of a warmed parent starts over)
+        state.update(status="pending", started_at=None, duration=None, warmed=0, failed=[])
+    if not WARMUP_ENABLED:
+        state["status"] = "disabled"
+    state["ready"] = state["status"] in ("ready", "disabled")
+    state["pid"] = os.getpid()
+    return state
+
+
+def _warm(app, request):
+    """
+    Replay a GET path, or a (path, JSON body) POST, with a fresh client (test clients aren't
+    shared across threads), True on a 200
+    """
+    client = app.test_client()
+    headers = {"Accept-Encoding": WARMUP_ACCEPT_ENCODING}
+    if isinstance(request, tuple):
+        path, body = request
+        response = client.post(path, json=body, headers=headers)
+    else:
+        response = client.get(request, headers=headers)
+    return response.status_code == 200
+
+
+def _warm_all(app, requests):
+    with ThreadPoolExecutor(max_workers=max(WARMUP_CONCURRENCY, 1)) as executor:
+        for request, ok in zip(requests, executor.map(lambda request: _warm(app, request), requests)):
+            with _state_lock:
+                if ok:
+                    _state["warmed"] += 1
+                else:
+                    _state["failed"].append(request if isinstance(request, str) else request[0])
+
+
+def detail_paths(app):
+    """
+    The requests the frontend makes for the top players' pages (goals, then shots and passes)
+    and the top teams' (games played): a player page is one /api/batch POST, a team page its
+    detail and its filtered players list
+    """
+    client = app.test_client()
+    requests = []
+    players = client.get('/api/players')
+    if players.status_code == 200:
+        top = sorted(players.get_json()['players'],
+                     key=lambda p: (-p['goals'], -p['shots'], -p['successful_plays'], p['player_name']))
+        requests += [('/api/batch', player_page_batch(p['player_name'])) for p in top[:WARMUP_TOP_PLAYERS]]
+    teams = client.get('/api/teams/stats')
+    if teams.status_code == 200:
+        top = sorted(teams.get_json()['teams'], key=lambda t: (-t['games_played'], t['team_name']))
+        for team in top[:WARMUP_TOP_TEAMS]:
+            requests += [f"/api/teams/{quote(team['team_name'], safe='')}",
+                         f"/api/players?team={quote(team['team_name'], safe='')}"]
+    return requests
+
+
+def run_warmup(app):
+    """Warm WARMUP_PATHS, then the top detail pages, all in parallel; marks this process ready when done"""
+    with _state_lock:
+        _state.update(status="warming", pid=os.getpid(), started_at=time.time(), duration=None, warmed=0, failed=[])
+    start = time.perf_counter()
+    try:
+        # The lists first: the detail paths are read from their (now cached) responses
+        _warm_all(app, WARMUP_PATHS)
+        _warm_all(app, detail_paths(app))
+    except Exception as e:
+        # A failed warmup still leaves a working (just cold) worker, don't keep it out of rotation
+        print(f"Error warming caches: {e}")
+    with _state_lock:
+        _state.update(status="ready", duration=round(time.perf_counter() - start, 3))
+    print(f"Warmed {_state['warmed']} responses in {_state['duration']}s (pid {os.getpid()}, {len(_state['failed'])} failed)")
+
+
+def start_warmup(app):
+    """Warm in a background thread so the worker can answer /api/ready meanwhile"""
+    if not WARMUP_ENABLED:
+        return None
+    with _state_lock:
+        _state.update(status="warming", pid=os.getpid())
+    thread = threading.Thread(target=run_warmup, args=(app,), name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
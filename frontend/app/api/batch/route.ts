@@ -0,0 +1,19 @@
+import { NextRequest, NextResponse } from "next/server";
+import { flaskFetch } from "@/lib/flask-client";
+
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+    const data = await flaskFetch("/api/batch", {
+      method: "POST",
+      body: JSON.stringify(body),
+    });
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error("Error running batch:", error);
+    return NextResponse.json(
+      { error: "Failed to run batch" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,26 @@
+import { NextRequest, NextResponse } from "next/server";
+import { flaskFetch } from "@/lib/flask-client";
+
+interface RouteParams {
+  params: Promise<{
+    stat: string;
+  }>;
+}
+
+export async function GET(request: NextRequest, { params }: RouteParams) {
+  try {
+    const { stat } = await params;
+    // split, value, min_games, limit and offset pass straight through
+    const query = request.nextUrl.searchParams.toString();
+    const data = await flaskFetch(
+      `/api/leaderboards/${encodeURIComponent(stat)}${query ? `?${query}` : ""}`
+    );
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error("Error fetching leaderboard:", error);
+    return NextResponse.json(
+      { error: "Failed to fetch leaderboard" },
+      { status: 500 }
+    );
+  }
+}
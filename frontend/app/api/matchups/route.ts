@@ -0,0 +1,15 @@
+import { NextResponse } from "next/server";
+import { flaskFetch } from "@/lib/flask-client";
+
+export async function GET() {
+  try {
+    const data = await flaskFetch("/api/matchups");
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error("Error fetching matchups:", error);
+    return NextResponse.json(
+      { error: "Failed to fetch matchups" },
+      { status: 500 }
+    );
+  }
+}
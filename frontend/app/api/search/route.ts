@@ -0,0 +1,22 @@
+import { NextRequest, NextResponse } from "next/server";
+import { flaskFetch } from "@/lib/flask-client";
+
+export async function GET(request: NextRequest) {
+  try {
+    const searchParams = request.nextUrl.searchParams;
+
+    // Pass the search text and options straight through
+    const params = new URLSearchParams();
+    params.set("q", searchParams.get("q") || "");
+    const type = searchParams.get("type");
+    const limit = searchParams.get("limit");
+    if (type) params.set("type", type);
+    if (limit) params.set("limit", limit);
+
+    const data = await flaskFetch(`/api/search?${params.toString()}`);
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error("Error searching:", error);
+    return NextResponse.json({ error: "Failed to search" }, { status: 500 });
+  }
+}
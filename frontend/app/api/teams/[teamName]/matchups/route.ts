@@ -0,0 +1,24 @@
+import { NextRequest, NextResponse } from "next/server";
+import { flaskFetch } from "@/lib/flask-client";
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ teamName: string }> }
+) {
+  try {
+    const { teamName: teamNameParam } = await params;
+    const teamName = decodeURIComponent(teamNameParam);
+    // opponent passes straight through
+    const query = request.nextUrl.searchParams.toString();
+    const data = await flaskFetch(
+      `/api/teams/${encodeURIComponent(teamName)}/matchups${query ? `?${query}` : ""}`
+    );
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error("Error fetching team matchups:", error);
+    return NextResponse.json(
+      { error: "Failed to fetch team matchups" },
+      { status: 500 }
+    );
+  }
+}
@@ -3,7 +3,7 @@
 import { useParams } from "next/navigation";
 import { useState, useEffect } from "react";
 import Link from "next/link";
-import { getPlayerDetail, getTeamAverages } from "@/lib/api";
+import { getPlayerPage } from "@/lib/api";
 import { PlayerDetailResponse, TeamAverages } from "@/lib/types";
 import { cleanTeamName, getInitials } from "@/lib/utils";
 import { Avatar, AvatarFallback } from "@/components/ui/avatar";
@@ -20,13 +20,12 @@ export default function PlayerDetailPage() {
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    getPlayerDetail(playerName)
+    // Player detail and team averages come back from one batch request
+    getPlayerPage(playerName)
       .then((playerData) => {
         setData(playerData);
-        // Fetch team averages after we have player data
-        return getTeamAverages(playerData.player.team_name);
+        setTeamAverages(playerData.team_averages);
       })
-      .then(setTeamAverages)
       .catch((err) => {
         console.error(err);
         setError("Failed to load player data");
@@ -1,11 +1,20 @@
 import {
+  BatchQuery,
+  BatchResponse,
   EventsResponse,
   GameDetailResponse,
   GamesResponse,
+  LeaderboardResponse,
+  LeaderboardSplit,
+  LeaderboardStat,
+  MatchupsResponse,
   PlayerDetailResponse,
+  PlayerPageResponse,
   PlayersResponse,
+  SearchResponse,
   TeamAverages,
   TeamDetailResponse,
+  TeamMatchupsResponse,
   TeamsResponse,
 } from "./types";
 
@@ -109,3 +118,91 @@ export async function getGameDetail(
   if (!response.ok) throw new Error("Failed to fetch game details");
   return response.json();
 }
+
+//this is used to run several player/team queries in one request
+export async function getBatch(
+  queries: Record<string, BatchQuery>
+): Promise<BatchResponse> {
+  const response = await fetch("/api/batch", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ queries }),
+  });
+  if (!response.ok) throw new Error("Failed to run batch");
+  return response.json();
+}
+
+//this is used to get a player's details and their team's averages in one request
+export async function getPlayerPage(
+  playerName: string
+): Promise<PlayerPageResponse> {
+  const data = await getBatch({
+    player: {
+      type: "player",
+      name: playerName,
+      include: ["games", "events", "team_averages"],
+    },
+  });
+  if (data.errors.player) throw new Error(data.errors.player.error);
+  return data.results.player as PlayerPageResponse;
+}
+
+//this is used to autocomplete player and team names
+export async function searchNames(
+  query: string,
+  type?: "player" | "team",
+  limit?: number
+): Promise<SearchResponse> {
+  const params = new URLSearchParams({ q: query });
+  if (type) params.set("type", type);
+  if (limit) params.set("limit", String(limit));
+
+  const response = await fetch(`/api/search?${params.toString()}`);
+  if (!response.ok) throw new Error("Failed to search");
+  return response.json();
+}
+
+//this is used to get one page of a leaderboard, optionally for one split
+export async function getLeaderboard(
+  stat: LeaderboardStat,
+  options: {
+    split?: LeaderboardSplit;
+    value?: string;
+    minGames?: number;
+    limit?: number;
+    offset?: number;
+  } = {}
+): Promise<LeaderboardResponse> {
+  const params = new URLSearchParams();
+  if (options.split) params.set("split", options.split);
+  if (options.value) params.set("value", options.value);
+  if (options.minGames) params.set("min_games", String(options.minGames));
+  if (options.limit) params.set("limit", String(options.limit));
+  if (options.offset) params.set("offset", String(options.offset));
+
+  const response = await fetch(
+    `/api/leaderboards/${encodeURIComponent(stat)}?${params.toString()}`
+  );
+  if (!response.ok) throw new Error("Failed to fetch leaderboard");
+  return response.json();
+}
+
+//this is used to get the whole head-to-head matrix
+export async function getMatchups(): Promise<MatchupsResponse> {
+  const response = await fetch("/api/matchups");
+  if (!response.ok) throw new Error("Failed to fetch matchups");
+  return response.json();
+}
+
+//this is used to compare a team with one opponent, or with every opponent it has played
+export async function getTeamMatchups(
+  teamName: string,
+  opponent?: string
+): Promise<TeamMatchupsResponse> {
+  const query = opponent ? `?opponent=${encodeURIComponent(opponent)}` : "";
+  const response = await fetch(
+    `/api/teams/${encodeURIComponent(teamName)}/matchups${query}`
+  );
+  if (!response.ok) throw new Error("Failed to fetch team matchups");
+  return response.json();
+}
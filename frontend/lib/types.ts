@@ -30,6 +30,7 @@ export interface EventsResponse {
   count: number;
   limit: number;
   offset: number;
+  next_cursor: string | null;
 }
 
 export interface Player {
@@ -177,6 +178,7 @@ export interface TeamAverages {
 
 // Game stats
 export interface Game {
+  game_id: number;
   game_date: string;
   team_name: string;
   opp_team_name: string;
@@ -205,3 +207,122 @@ export interface GameDetailResponse {
   events: PlayByPlayEvent[];
   count: number;
 }
+
+// Batch requests (several sub-queries answered by one backend call)
+export interface BatchQuery {
+  type: "player" | "team" | "team_averages";
+  name: string;
+  include?: string[];
+}
+
+export interface BatchError {
+  error: string;
+  status: number;
+}
+
+export interface BatchResponse {
+  results: Record<string, unknown>;
+  errors: Record<string, BatchError>;
+  count: number;
+}
+
+// Player page: detail plus the averages of the player's team
+export interface PlayerPageResponse extends PlayerDetailResponse {
+  team_averages: TeamAverages;
+}
+
+// Leaderboards (precomputed per split at ingest)
+export type LeaderboardStat =
+  | "goals"
+  | "shots"
+  | "shot_attempts"
+  | "successful_passes"
+  | "pass_completion_pct"
+  | "takeaways"
+  | "faceoff_wins";
+
+export type LeaderboardSplit = "all" | "situation" | "strength" | "period";
+
+export interface LeaderboardEntry {
+  rank: number;
+  player_name: string;
+  team_name: string;
+  games_played: number;
+  goals: number;
+  shots: number;
+  shot_attempts: number;
+  successful_passes: number;
+  incomplete_passes: number;
+  pass_completion_pct: number | null;
+  takeaways: number;
+  faceoff_wins: number;
+}
+
+export interface LeaderboardResponse {
+  stat: LeaderboardStat;
+  split: LeaderboardSplit;
+  value: string;
+  min_games: number;
+  leaders: LeaderboardEntry[];
+  count: number;
+  limit: number;
+  offset: number;
+  next_offset: number | null;
+}
+
+// Head-to-head matchups (precomputed per team and opponent at ingest)
+export interface MatchupStats {
+  team_name: string;
+  opp_team_name: string;
+  games_played: number;
+  total_events: number;
+  goals: number;
+  shots: number;
+  shot_attempts: number;
+  shooting_pct: number | null;
+  successful_passes: number;
+  incomplete_passes: number;
+  pass_completion_pct: number | null;
+  zone_entries: number;
+  successful_zone_entries: number;
+  faceoff_wins: number;
+  takeaways: number;
+  located_shot_attempts: number;
+  avg_shot_x: number | null;
+  avg_shot_y: number | null;
+  avg_shot_distance: number | null;
+  slot_shot_attempts: number;
+  slot_goals: number;
+}
+
+export interface MatchupsResponse {
+  teams: string[];
+  matchups: MatchupStats[];
+  count: number;
+}
+
+export interface TeamMatchup {
+  opp_team_name: string;
+  team: MatchupStats | null; // the team against this opponent
+  opponent: MatchupStats | null; // the opponent against the team
+}
+
+export interface TeamMatchupsResponse {
+  team_name: string;
+  matchups: TeamMatchup[];
+  count: number;
+}
+
+// Name search (autocomplete)
+export interface SearchResult {
+  kind: "player" | "team";
+  name: string;
+  team_name: string | null;
+  event_count: number;
+}
+
+export interface SearchResponse {
+  query: string;
+  results: SearchResult[];
+  count: number;
+}